@@ -9,10 +9,31 @@ Features:
 3. Search by keyword
 4. Generate statistics
 5. Export filtered results
+
+Built for logs bigger than RAM:
+- The file is memory-mapped; the OS pages it in and out as needed
+- Precompiled regexes scan it in C; level and keyword filters are part of
+  the pattern, so lines that don't match never reach Python
+- Entries are compact __slots__ objects, created only for lines a query returns
+- load_file() makes a single pass: statistics plus a sparse time index
+  (first timestamp and byte offset of every ~64 KB block), so
+  filter_by_date() binary-searches to the start of the range instead of
+  reading from the top
+
+Run with --benchmark to analyze a 2,000,000-line log:
+    python 03_log_analyzer.py --benchmark
 """
 
+import mmap
 import os
-from datetime import datetime
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime
 from contextlib import contextmanager
 
 print("=" * 50)
@@ -20,59 +41,222 @@ print("LOG FILE ANALYZER")
 print("=" * 50)
 
 # Sample log format: [2024-01-15 10:30:45] [INFO] Message here
+# The patterns work on bytes, so they scan the mmap without decoding it
+ENTRY_FORMAT = rb"^\[([^\]\n]+)\] \[(%s)\] ([^\r\n]*%s[^\r\n]*)"
+ENTRY_PATTERN = re.compile(ENTRY_FORMAT % (rb"\w+", b""), re.MULTILINE)
+# For statistics: (timestamp, level) per entry, and ("", "") for any other
+# non-blank line
+SCAN_PATTERN = re.compile(rb"^(?:\[([^\]\n]+)\] \[(\w+)\] |(?=[ \t]*\S))", re.MULTILINE)
 
 class LogEntry:
     """Represents a single log entry"""
     
+    # No per-instance __dict__: roughly a third of the memory per entry
+    __slots__ = ("timestamp", "level", "message")
+    
     def __init__(self, timestamp, level, message):
         self.timestamp = timestamp
         self.level = level
         self.message = message
     
+    @classmethod
+    def from_match(cls, match):
+        timestamp, level, message = match.groups()
+        return cls(timestamp.decode(), level.decode(), message.decode("utf-8", "replace"))
+    
     def __str__(self):
         return f"[{self.timestamp}] [{self.level}] {self.message}"
 
 class LogAnalyzer:
     """Analyzes log files"""
     
-    def __init__(self):
-        self.entries = []
+    def __init__(self, block_size=64 * 1024):
+        self.filename = None
+        self.block_size = block_size  # bytes of log per index point
+        self.index_times = []    # first timestamp in each block...
+        self.index_offsets = []  # ...and the byte offset where the block starts
+        self.in_order = True     # False if timestamps ever go backwards
+        self.entry_count = 0
+        self._stats = None
     
     def parse_line(self, line):
-        """Parse a log line into LogEntry"""
-        # TODO: Implement parsing
-        # Format: [2024-01-15 10:30:45] [INFO] Message
-        pass
+        """Parse a log line into LogEntry (None if it isn't one)"""
+        if isinstance(line, str):
+            line = line.encode()
+        match = ENTRY_PATTERN.match(line)
+        return LogEntry.from_match(match) if match else None
+    
+    @contextmanager
+    def _mapped(self):
+        """The loaded file as a read-only memory map"""
+        if self.filename is None:
+            raise RuntimeError("No log file loaded - call load_file() first")
+        
+        with open(self.filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""  # an empty file can't be mapped
+                return
+            # Not closed explicitly: match objects still held by the caller
+            # keep it alive, and it is unmapped once the last one is gone
+            yield mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def _matches(self, pattern=ENTRY_PATTERN, start=0):
+        """Yield a match for every entry pattern finds, from byte offset start"""
+        with self._mapped() as mm:
+            yield from pattern.finditer(mm, start)
+    
+    def _blocks(self, mm):
+        """Split mm into (start, end) spans of about block_size, on line boundaries"""
+        start, size = 0, len(mm)
+        while start < size:
+            end = start + self.block_size
+            if end >= size:
+                end = size
+            else:
+                end = mm.rfind(b"\n", start, end) + 1
+                if end <= start:  # a line longer than a block
+                    end = mm.find(b"\n", start + self.block_size) + 1 or size
+            yield start, end
+            start = end
     
     def load_file(self, filename):
-        """Load and parse a log file"""
-        # TODO: Implement with error handling
-        pass
+        """Scan a log file once: statistics plus the sparse time index"""
+        try:
+            with open(filename, "rb"):
+                pass
+        except OSError as e:
+            print(f"❌ Cannot read {filename}: {e}")
+            return False
+        
+        self.filename = filename
+        index_times, index_offsets = [], []
+        counts = Counter()
+        first = last = None
+        in_order = True
+        
+        with self._mapped() as mm:
+            for start, end in self._blocks(mm):
+                # findall runs the whole block in C; zip splits the columns
+                found = SCAN_PATTERN.findall(mm, start, end)
+                if not found:
+                    continue
+                times, levels = zip(*found)
+                counts.update(levels)
+                if b"" in levels:  # drop the malformed lines
+                    times = [t for t in times if t]
+                    if not times:
+                        continue
+                
+                if in_order and (list(times) != sorted(times)
+                                 or (last is not None and times[0] < last)):
+                    in_order = False
+                if first is None:
+                    first = times[0]
+                last = times[-1]
+                
+                # Every entry before start is earlier than times[0] (if in order)
+                index_times.append(times[0])
+                index_offsets.append(start)
+        
+        malformed = counts.pop(b"", 0)
+        total = sum(counts.values())
+        self.index_times, self.index_offsets = index_times, index_offsets
+        self.in_order = in_order
+        self.entry_count = total
+        self._stats = {
+            "total": total,
+            "by_level": {level.decode(): n for level, n in counts.most_common()},
+            "malformed_lines": malformed,
+            "first_timestamp": first.decode() if first else None,
+            "last_timestamp": last.decode() if last else None,
+            "in_order": in_order,
+        }
+        return True
+    
+    def entries(self):
+        """Yield every entry in the file, one at a time"""
+        for match in self._matches():
+            yield LogEntry.from_match(match)
     
     def filter_by_level(self, level):
-        """Return entries matching level"""
-        # TODO: Implement
-        pass
+        """Yield entries matching level"""
+        # The level is part of the pattern, so the regex engine skips the
+        # other lines in C and we only build entries for lines we keep
+        pattern = re.compile(ENTRY_FORMAT % (re.escape(level.upper().encode()), b""),
+                             re.MULTILINE)
+        for match in self._matches(pattern):
+            yield LogEntry.from_match(match)
+    
+    @staticmethod
+    def _bound(value, end=False):
+        """A datetime, date or "YYYY-MM-DD[ HH:MM:SS]" string as comparable bytes"""
+        if isinstance(value, datetime):
+            value = value.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(value, date):
+            value = value.isoformat()
+        if len(value) == 10:  # a whole day
+            value += " 23:59:59" if end else " 00:00:00"
+        return value.encode()
     
     def filter_by_date(self, start_date, end_date):
-        """Return entries within date range"""
-        # TODO: Implement
-        pass
+        """Yield entries within date range (both ends included)"""
+        start, end = self._bound(start_date), self._bound(end_date, end=True)
+        
+        offset = 0
+        if self.in_order and self.index_times:
+            # Start from the last block whose first entry is before start:
+            # every entry in range comes after it, everything earlier is
+            # skipped without being read
+            slot = bisect_left(self.index_times, start) - 1
+            if slot >= 0:
+                offset = self.index_offsets[slot]
+        
+        for match in self._matches(start=offset):
+            timestamp = match.group(1)
+            if timestamp < start:
+                continue
+            if timestamp > end:
+                if self.in_order:
+                    break
+                continue
+            yield LogEntry.from_match(match)
     
-    def search(self, keyword):
-        """Search entries by keyword"""
-        # TODO: Implement
-        pass
+    def search(self, keyword, case_sensitive=False):
+        """Yield entries whose message contains keyword"""
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        pattern = re.compile(ENTRY_FORMAT % (rb"\w+", re.escape(keyword.encode())), flags)
+        for match in self._matches(pattern):
+            yield LogEntry.from_match(match)
     
     def get_statistics(self):
-        """Return log statistics"""
-        # TODO: Return count by level, time range, etc.
-        pass
+        """Return log statistics (gathered by load_file's single pass)"""
+        if self._stats is None:
+            return None
+        stats = dict(self._stats)
+        if stats["first_timestamp"]:
+            # Any bracketed text parses as a timestamp; only ISO ones
+            # (fractional seconds included) give a time span
+            try:
+                first = datetime.fromisoformat(stats["first_timestamp"])
+                last = datetime.fromisoformat(stats["last_timestamp"])
+                stats["time_span"] = str(last - first)
+            except ValueError:
+                pass
+        stats["index_points"] = len(self.index_times)
+        return stats
     
     def export_filtered(self, entries, filename):
-        """Export filtered entries to file"""
-        # TODO: Implement
-        pass
+        """Export filtered entries to file; entries can be any iterable"""
+        count = 0
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(f"{entry}\n")
+                    count += 1
+        except OSError as e:
+            print(f"❌ Export failed: {e}")
+            return None
+        return count
 
 @contextmanager
 def log_analyzer_session(filename):
@@ -82,7 +266,7 @@ def log_analyzer_session(filename):
         analyzer.load_file(filename)
         yield analyzer
     finally:
-        print(f"Processed {len(analyzer.entries)} entries")
+        print(f"Processed {analyzer.entry_count} entries")
 
 # Create sample log for testing
 def create_sample_log():
@@ -106,12 +290,131 @@ def main():
     # Create sample log
     create_sample_log()
     
-    # TODO: Demonstrate analyzer features
-    print("Implement LogAnalyzer features!")
+    with log_analyzer_session("sample.log") as analyzer:
+        print("\n--- Statistics ---")
+        for key, value in analyzer.get_statistics().items():
+            print(f"  {key}: {value}")
+        
+        print("\n--- Errors ---")
+        for entry in analyzer.filter_by_level("error"):
+            print(f"  {entry}")
+        
+        print("\n--- 10:31:00 to 10:32:00 ---")
+        for entry in analyzer.filter_by_date("2024-01-15 10:31:00", "2024-01-15 10:32:00"):
+            print(f"  {entry}")
+        
+        print("\n--- Search 'connect' ---")
+        for entry in analyzer.search("connect"):
+            print(f"  {entry}")
+        
+        count = analyzer.export_filtered(analyzer.filter_by_level("WARNING"), "warnings.log")
+        print(f"\nExported {count} warnings to warnings.log")
+        print(f"Parsed line: {analyzer.parse_line('[2024-01-15 10:30:45] [INFO] Hello')}")
+        print(f"Bad line:    {analyzer.parse_line('not a log line')}")
     
     # Cleanup
-    if os.path.exists("sample.log"):
-        os.remove("sample.log")
+    for filename in ("sample.log", "warnings.log"):
+        if os.path.exists(filename):
+            os.remove(filename)
+
+def create_large_log(filename, n_lines):
+    """Write n_lines of log, a few per second, in time order"""
+    levels = [b"INFO"] * 7 + [b"DEBUG", b"WARNING", b"ERROR"]
+    start = datetime(2024, 1, 1).timestamp()
+    with open(filename, "wb") as f:
+        chunk = []
+        stamp, stamp_second = b"", None
+        for i in range(n_lines):
+            second = int(start + i // 4)
+            if second != stamp_second:
+                stamp = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S").encode()
+                stamp_second = second
+            chunk.append(b"[%s] [%s] Request %d handled by worker %d\n"
+                         % (stamp, levels[i % 10], i, i % 16))
+            if len(chunk) == 10_000:
+                f.write(b"".join(chunk))
+                chunk.clear()
+        f.write(b"".join(chunk))
+
+def load_all(filename):
+    """The load-everything approach: a list with an object per line"""
+    pattern = re.compile(r"\[(.*?)\] \[(\w+)\] (.*)")
+    entries = []
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            match = pattern.match(line.rstrip("\n"))
+            if match:
+                entries.append({"timestamp": match.group(1), "level": match.group(2),
+                                "message": match.group(3)})
+    return entries
+
+def benchmark(n_lines=2_000_000):
+    """Streaming + sparse index vs. loading every entry into a list"""
+    print("\n" + "=" * 50)
+    print(f"BENCHMARK: {n_lines:,}-line log")
+    print("=" * 50)
+    
+    filename = os.path.join(tempfile.gettempdir(), "benchmark.log")
+    create_large_log(filename, n_lines)
+    size = os.path.getsize(filename)
+    print(f"Log file: {size / 1e6:.0f} MB")
+    
+    # Middle-of-the-day window: one minute of traffic
+    window = ("2024-01-01 03:00:00", "2024-01-01 03:00:59")
+    
+    def peak_memory(func):
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    
+    try:
+        analyzer = LogAnalyzer()
+        start = time.perf_counter()
+        analyzer.load_file(filename)
+        stream_load = time.perf_counter() - start
+        start = time.perf_counter()
+        stream_hits = sum(1 for _ in analyzer.filter_by_date(*window))
+        stream_date = time.perf_counter() - start
+        start = time.perf_counter()
+        stream_errors = sum(1 for _ in analyzer.filter_by_level("ERROR"))
+        stream_level = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        entries = load_all(filename)
+        by_level = Counter(e["level"] for e in entries)
+        list_load = time.perf_counter() - start
+        start = time.perf_counter()
+        list_hits = [e for e in entries if window[0] <= e["timestamp"] <= window[1]]
+        list_date = time.perf_counter() - start
+        list_errors = sum(1 for e in entries if e["level"] == "ERROR")
+        assert len(list_hits) == stream_hits and list_errors == stream_errors
+        assert by_level == analyzer.get_statistics()["by_level"]
+        del entries, list_hits
+        
+        print(f"\n{'':<24}{'load everything':>16}{'streaming':>12}")
+        print(f"{'Load + statistics':<24}{list_load:>15.2f}s{stream_load:>11.2f}s")
+        print(f"{'filter_by_date (1 min)':<24}{list_date * 1000:>14.1f}ms{stream_date * 1000:>10.1f}ms"
+              f"   ({stream_hits} entries)")
+        print(f"{'filter_by_level(ERROR)':<24}{'(in memory)':>16}{stream_level:>11.2f}s"
+              f"   ({stream_errors:,} entries)")
+        
+        # Peak memory on a tenth of the log (tracemalloc slows things down)
+        small = filename + ".small"
+        create_large_log(small, n_lines // 10)
+        list_peak = peak_memory(lambda: load_all(small))
+        stream_peak = peak_memory(lambda: LogAnalyzer().load_file(small))
+        os.remove(small)
+        print(f"\nPeak memory, {n_lines // 10:,} lines: load everything "
+              f"{list_peak / 1e6:.0f} MB, streaming {stream_peak / 1e6:.2f} MB")
+        print(f"Sparse index: {len(analyzer.index_times):,} points "
+              f"(one per {analyzer.block_size // 1024} KB of log)")
+    finally:
+        os.remove(filename)
 
 if __name__ == "__main__":
-    main()
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        main()
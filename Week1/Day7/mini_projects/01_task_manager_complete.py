@@ -20,11 +20,18 @@ Features:
 4. Delete tasks
 5. Search tasks
 6. Statistics dashboard
-7. Persistent storage with JSON
+7. Persistent storage with JSON (append-only journal + atomic snapshots)
+
+Run with --benchmark to time saving changes to 100,000 tasks:
+    python 01_task_manager_complete.py --benchmark
 """
 
 import json
 import os
+import shutil
+import sys
+import tempfile
+import time
 from datetime import datetime
 
 # ========== CONFIGURATION ==========
@@ -32,6 +39,7 @@ from datetime import datetime
 class Config:
     """Application configuration"""
     DATA_FILE = "task_manager_data.json"
+    COMPACT_EVERY = 500  # journal entries between full snapshots
     PRIORITIES = ["high", "medium", "low"]
     STATUSES = ["pending", "completed"]
     
@@ -49,54 +57,150 @@ class Config:
 # ========== DATA LAYER ==========
 
 class TaskStorage:
-    """Handles all data persistence operations"""
+    """
+    Handles all data persistence operations.
+    
+    Two files:
+    - the snapshot (filename): every task as JSON, replaced atomically
+    - the journal (filename + ".journal"): one JSON line per add, update
+      or delete since that snapshot
+    
+    A change only appends a short line to the journal instead of
+    rewriting every task. Once the journal holds `compact_every` entries,
+    the tasks are written to a fresh snapshot and the journal starts over.
+    Loading reads the snapshot and replays the journal on top of it.
+    """
     
-    def __init__(self, filename):
+    def __init__(self, filename, compact_every=500, fsync=False):
         self.filename = filename
+        self.journal_name = f"{filename}.journal"
+        self.compact_every = compact_every
+        self.fsync = fsync  # True: survive power loss, not just a crash, at ~ms per change
+        self.pending = 0    # journal entries since the last snapshot
+        self._journal = None
     
     def load(self):
-        """Load tasks from JSON file"""
+        """Load tasks as a dict {id: task}, in creation order"""
+        tasks = {}
         try:
-            if not os.path.exists(self.filename):
-                return []
-            
-            with open(self.filename, "r") as f:
-                data = json.load(f)
-                return data.get("tasks", [])
+            if os.path.exists(self.filename):
+                with open(self.filename, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                tasks = {task["id"]: task for task in data.get("tasks", [])}
         except json.JSONDecodeError as e:
             print(f"⚠️ Warning: Data file corrupted - {e}")
-            return []
         except IOError as e:
             print(f"❌ Error reading file: {e}")
-            return []
+        
+        try:
+            self.pending = self._replay(tasks)
+        except IOError as e:
+            print(f"❌ Error reading journal: {e}")
+        return tasks
+    
+    def _replay(self, tasks):
+        """Apply the journal to tasks; returns the number of entries applied"""
+        if not os.path.exists(self.journal_name):
+            return 0
+        
+        applied = 0
+        good_bytes = 0
+        with open(self.journal_name, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    self._apply(tasks, json.loads(line))
+                except ValueError:
+                    # A write cut short by a crash: drop it, and cut it off
+                    # the file so new entries don't get glued onto it
+                    print("⚠️ Warning: Ignoring incomplete journal entry")
+                    break
+                good_bytes += len(line)
+                applied += 1
+        
+        if good_bytes < os.path.getsize(self.journal_name):
+            with open(self.journal_name, "r+b") as f:
+                f.truncate(good_bytes)
+        return applied
+    
+    @staticmethod
+    def _apply(tasks, entry):
+        """
+        Apply one journal entry. Replaying an entry twice gives the same
+        result, so a crash between snapshot and journal reset is harmless.
+        """
+        op = entry["op"]
+        if op == "add":
+            tasks[entry["task"]["id"]] = entry["task"]
+        elif op == "update":
+            task = tasks.get(entry["id"])
+            if task is not None:
+                task.update(entry["fields"])
+        elif op == "delete":
+            tasks.pop(entry["id"], None)
+    
+    def append(self, entry, tasks):
+        """Journal one change; compacts into a snapshot every `compact_every` entries"""
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_name, "a", encoding="utf-8")
+            self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+        except IOError as e:
+            print(f"❌ Error writing journal: {e}")
+            return False
+        
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            return self.save(tasks)
+        return True
+    
+    def _write_atomic(self, filename, tasks):
+        """Write a snapshot to a temp file, then rename it over filename"""
+        data = {
+            "version": "2.0",
+            "updated_at": datetime.now().isoformat(),
+            "tasks": list(tasks.values())
+        }
+        temp_name = f"{filename}.tmp"
+        with open(temp_name, "w", encoding="utf-8") as f:
+            # dumps() runs the C encoder in one go; dump() streams through
+            # the pure-Python one, several times slower
+            f.write(json.dumps(data, separators=(",", ":")))
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers see either the old file or the new one, never half of each
+        os.replace(temp_name, filename)
     
     def save(self, tasks):
-        """Save tasks to JSON file"""
+        """Snapshot all tasks and start a new, empty journal"""
         try:
-            data = {
-                "version": "1.0",
-                "updated_at": datetime.now().isoformat(),
-                "tasks": tasks
-            }
-            with open(self.filename, "w") as f:
-                json.dump(data, f, indent=2)
+            self._write_atomic(self.filename, tasks)
+            self.close()
+            # Everything in the journal is in the snapshot now
+            open(self.journal_name, "w").close()
+            self.pending = 0
             return True
         except IOError as e:
             print(f"❌ Error saving file: {e}")
             return False
     
-    def backup(self):
-        """Create a backup of the data file"""
-        if os.path.exists(self.filename):
-            backup_name = f"{self.filename}.backup"
-            try:
-                with open(self.filename, "r") as src:
-                    with open(backup_name, "w") as dst:
-                        dst.write(src.read())
-                return True
-            except IOError:
-                return False
-        return False
+    def backup(self, tasks):
+        """Write the current tasks to filename.backup, atomically"""
+        try:
+            self._write_atomic(f"{self.filename}.backup", tasks)
+            return True
+        except IOError:
+            return False
+    
+    def close(self):
+        """Close the journal file"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
 
 # ========== TASK MODEL ==========
 
@@ -150,9 +254,9 @@ class TaskManager:
     """Main task management logic"""
     
     def __init__(self):
-        self.storage = TaskStorage(Config.DATA_FILE)
-        self.tasks = self.storage.load()
-        Task.set_id_counter(self.tasks)
+        self.storage = TaskStorage(Config.DATA_FILE, Config.COMPACT_EVERY)
+        self.tasks = self.storage.load()  # {id: task}
+        Task.set_id_counter(self.tasks.values())
     
     def add(self, title, description="", priority="medium", due_date=None):
         """Add a new task"""
@@ -163,17 +267,14 @@ class TaskManager:
         
         # Create and save
         task = Task.create(title, description, priority, due_date)
-        self.tasks.append(task)
-        self.storage.save(self.tasks)
+        self.tasks[task["id"]] = task
+        self.storage.append({"op": "add", "task": task}, self.tasks)
         
         return True, task
     
     def get(self, task_id):
         """Get task by ID"""
-        for task in self.tasks:
-            if task["id"] == task_id:
-                return task
-        return None
+        return self.tasks.get(task_id)
     
     def update(self, task_id, **updates):
         """Update task fields"""
@@ -188,11 +289,13 @@ class TaskManager:
             updates["priority"] = updates["priority"].lower()
         
         # Apply updates
-        for key, value in updates.items():
-            if key in task and value is not None:
-                task[key] = value
+        fields = {
+            key: value for key, value in updates.items()
+            if key in task and value is not None
+        }
+        task.update(fields)
         
-        self.storage.save(self.tasks)
+        self.storage.append({"op": "update", "id": task_id, "fields": fields}, self.tasks)
         return True, task
     
     def complete(self, task_id):
@@ -204,9 +307,9 @@ class TaskManager:
         if task["status"] == "completed":
             return True, "Already completed"
         
-        task["status"] = "completed"
-        task["completed_at"] = datetime.now().isoformat()
-        self.storage.save(self.tasks)
+        fields = {"status": "completed", "completed_at": datetime.now().isoformat()}
+        task.update(fields)
+        self.storage.append({"op": "update", "id": task_id, "fields": fields}, self.tasks)
         
         return True, task
     
@@ -216,14 +319,14 @@ class TaskManager:
         if not task:
             return False, "Task not found"
         
-        self.tasks.remove(task)
-        self.storage.save(self.tasks)
+        del self.tasks[task_id]
+        self.storage.append({"op": "delete", "id": task_id}, self.tasks)
         
         return True, task
     
     def list(self, status=None, priority=None, sort_by="created_at"):
         """List tasks with optional filters and sorting"""
-        result = self.tasks.copy()
+        result = list(self.tasks.values())
         
         # Filter by status
         if status:
@@ -248,7 +351,7 @@ class TaskManager:
         """Search tasks by title or description"""
         query = query.lower()
         return [
-            t for t in self.tasks
+            t for t in self.tasks.values()
             if query in t["title"].lower() or query in t["description"].lower()
         ]
     
@@ -258,11 +361,11 @@ class TaskManager:
             return None
         
         total = len(self.tasks)
-        completed = sum(1 for t in self.tasks if t["status"] == "completed")
+        completed = sum(1 for t in self.tasks.values() if t["status"] == "completed")
         pending = total - completed
         
         by_priority = {
-            p: sum(1 for t in self.tasks if t["priority"] == p)
+            p: sum(1 for t in self.tasks.values() if t["priority"] == p)
             for p in Config.PRIORITIES
         }
         
@@ -530,8 +633,79 @@ class TaskManagerCLI:
                 print("  👋 Goodbye!\n")
                 break
 
+# ========== BENCHMARK ==========
+
+def benchmark(n_tasks=100_000, n_changes=200):
+    """Rewriting the whole file per change vs. journaling the change"""
+    print("=" * 60)
+    print(f"BENCHMARK: {n_changes} changes to {n_tasks:,} tasks")
+    print("=" * 60)
+    
+    folder = tempfile.mkdtemp()
+    Config.DATA_FILE = os.path.join(folder, "tasks.json")
+    try:
+        manager = TaskManager()
+        for i in range(n_tasks):
+            task = Task.create(f"Task {i}", "Benchmark task", Config.PRIORITIES[i % 3])
+            manager.tasks[task["id"]] = task
+        start = time.perf_counter()
+        manager.storage.save(manager.tasks)
+        snapshot = time.perf_counter() - start
+        print(f"\nSnapshot: {os.path.getsize(Config.DATA_FILE) / 1e6:.1f} MB "
+              f"in {snapshot * 1000:.0f} ms")
+        ids = list(manager.tasks)[::n_tasks // n_changes][:n_changes]
+        
+        # Before: every change re-dumped every task with indent=2
+        old_file = os.path.join(folder, "old.json")
+        tasks = list(manager.tasks.values())
+        samples = 5
+        start = time.perf_counter()
+        for _ in range(samples):
+            with open(old_file, "w") as f:
+                json.dump({"version": "1.0", "updated_at": datetime.now().isoformat(),
+                           "tasks": tasks}, f, indent=2)
+        rewrite = (time.perf_counter() - start) / samples
+        print(f"  Full rewrite per change: {rewrite * 1000:8.2f} ms "
+              f"({os.path.getsize(old_file) / 1e6:.1f} MB written)")
+        
+        # After: a journal line per change, a snapshot every COMPACT_EVERY
+        start = time.perf_counter()
+        for task_id in ids:
+            manager.complete(task_id)
+        journaled = (time.perf_counter() - start) / len(ids)
+        print(f"  Journaled change:        {journaled * 1000:8.3f} ms "
+              f"({os.path.getsize(manager.storage.journal_name)} bytes of journal)")
+        amortized = journaled + snapshot / Config.COMPACT_EVERY
+        print(f"  + snapshot every {Config.COMPACT_EVERY}:   {amortized * 1000:8.3f} ms per change")
+        print(f"  Speedup: {rewrite / amortized:,.0f}x")
+        
+        # Lookup by id: linear scan vs. dict
+        start = time.perf_counter()
+        for task_id in ids:
+            next(t for t in tasks if t["id"] == task_id)
+        scan = (time.perf_counter() - start) / len(ids)
+        start = time.perf_counter()
+        for task_id in ids:
+            manager.get(task_id)
+        lookup = (time.perf_counter() - start) / len(ids)
+        print(f"\n  get() by scanning: {scan * 1e6:8.1f} µs")
+        print(f"  get() from dict:   {lookup * 1e6:8.3f} µs")
+        
+        # A restart sees every journaled change
+        manager.storage.close()
+        reloaded = TaskManager()
+        assert reloaded.tasks == manager.tasks
+        print(f"\n  Reloaded {len(reloaded.tasks):,} tasks "
+              f"({reloaded.storage.pending} journal entries replayed) ✓")
+        reloaded.storage.close()
+    finally:
+        shutil.rmtree(folder)
+
 # ========== MAIN ENTRY POINT ==========
 
 if __name__ == "__main__":
-    app = TaskManagerCLI()
-    app.run()
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        app = TaskManagerCLI()
+        app.run()
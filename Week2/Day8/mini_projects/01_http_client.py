@@ -8,9 +8,22 @@ This project applies:
 - Status code handling
 - JSON parsing
 - Error handling
+- Keep-alive connection pooling, gzip and bounded reads
+
+Run with --benchmark to compare transports against a local server:
+    python 01_http_client.py --benchmark
 """
 
+import gzip
+import http.client
 import json
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError, URLError
 
@@ -18,18 +31,169 @@ print("=" * 60)
 print("Mini Project 1: Simple HTTP Client")
 print("=" * 60)
 
+class BodyTooLarge(Exception):
+    """The response body (after decompression) is over the size limit"""
+
+
+def read_body(response, max_bytes, chunk_size=64 * 1024):
+    """
+    Read a response body in chunks, un-gzipping it on the fly.
+    
+    Stops with BodyTooLarge as soon as more than max_bytes have been
+    decoded, so a huge (or gzip-bombed) response never sits in memory.
+    """
+    encoding = (response.headers.get('Content-Encoding') or '').lower()
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+    chunks = []
+    size = 0
+    while True:
+        raw = response.read(chunk_size)
+        chunk = raw
+        if decoder is not None:
+            # Decode at most one byte past the limit: enough to know it's too big
+            chunk = decoder.decompress(raw, max_bytes - size + 1) if raw else decoder.flush()
+        if chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise BodyTooLarge(f"Response body exceeds {max_bytes:,} bytes")
+            chunks.append(chunk)
+        if not raw:
+            return b''.join(chunks)
+
+
+class UrllibTransport:
+    """One urlopen() per request: a new TCP (and TLS) handshake every time"""
+    
+    def __init__(self):
+        self.connections_opened = 0
+    
+    def request(self, method, url, headers, body, timeout, max_body_size):
+        req = Request(url, data=body, headers=headers, method=method)
+        self.connections_opened += 1
+        try:
+            response = urlopen(req, timeout=timeout)
+        except HTTPError as e:
+            response = e  # 4xx/5xx: still has a status, headers and body
+        with response:
+            return (response.status, response.reason, dict(response.headers),
+                    read_body(response, max_body_size))
+    
+    def close(self):
+        pass
+
+
+class PooledTransport:
+    """
+    Persistent http.client connections, pooled per (scheme, host, port).
+    
+    A connection goes back to its pool once its response has been read
+    in full, and the next request to that host reuses it (HTTP/1.1
+    keep-alive), skipping the TCP/TLS setup. Redirects are not followed.
+    If the server has dropped a reused connection, idempotent requests are
+    retried once on a new one; POST/PATCH errors are raised instead.
+    """
+    
+    # Errors meaning a pooled connection was closed by the server while idle
+    STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError,
+                    ConnectionAbortedError, BrokenPipeError)
+    # Safe to resend: the server may have acted on a request it dropped
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'})
+    
+    def __init__(self, max_idle_per_host=4):
+        self.max_idle_per_host = max_idle_per_host
+        self._pools = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+    
+    def _acquire(self, key, timeout):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop(), True
+            self.connections_opened += 1
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+    
+    def _release(self, key, conn):
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.max_idle_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+    
+    def request(self, method, url, headers, body, timeout, max_body_size):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            except self.STALE_ERRORS:
+                conn.close()
+                if reused and method.upper() in self.IDEMPOTENT_METHODS:
+                    continue  # the server dropped an idle connection: retry on a fresh one
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            
+            try:
+                data = read_body(response, max_body_size)
+            except BaseException:
+                conn.close()  # unread bytes left: the connection can't be reused
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, response.reason, dict(response.headers), data
+    
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+
 class SimpleHTTPClient:
     """
     A simple command-line HTTP client for testing APIs.
+    
+    transport defaults to a PooledTransport (keep-alive connections);
+    history keeps only the last history_size results.
     """
     
-    def __init__(self):
-        self.history = []
+    def __init__(self, transport=None, history_size=100, max_body_size=10 * 1024 * 1024,
+                 accept_gzip=True, timeout=30):
+        self.transport = transport if transport is not None else PooledTransport()
+        self.history = deque(maxlen=history_size)
+        self.max_body_size = max_body_size
+        self.timeout = timeout
         self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json',
             'User-Agent': 'SimpleHTTPClient/1.0'
         }
+        if accept_gzip:
+            self.headers['Accept-Encoding'] = 'gzip'
+    
+    def close(self):
+        """Close any pooled connections"""
+        self.transport.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
     
     def set_header(self, key, value):
         """Set a custom header"""
@@ -54,10 +218,6 @@ class SimpleHTTPClient:
         """Internal method to make HTTP requests"""
         request_data = json.dumps(data).encode() if data else None
         
-        req = Request(url, data=request_data, method=method)
-        for key, value in self.headers.items():
-            req.add_header(key, value)
-        
         result = {
             'method': method,
             'url': url,
@@ -69,27 +229,25 @@ class SimpleHTTPClient:
         }
         
         try:
-            with urlopen(req, timeout=30) as response:
-                result['status'] = response.status
-                result['response_headers'] = dict(response.headers)
-                
-                body = response.read().decode()
-                try:
-                    result['response_body'] = json.loads(body)
-                except json.JSONDecodeError:
-                    result['response_body'] = body
-                    
-        except HTTPError as e:
-            result['status'] = e.code
-            result['error'] = e.reason
+            status, reason, headers, body = self.transport.request(
+                method, url, self.headers, request_data,
+                self.timeout, self.max_body_size)
+            result['status'] = status
+            result['response_headers'] = headers
+            if status >= 400:
+                result['error'] = reason
+            
+            text = body.decode('utf-8', errors='replace')
             try:
-                body = e.read().decode()
-                result['response_body'] = json.loads(body)
-            except:
-                result['response_body'] = str(e)
+                result['response_body'] = json.loads(text)
+            except json.JSONDecodeError:
+                result['response_body'] = text
                 
-        except URLError as e:
-            result['error'] = f"Connection Error: {e.reason}"
+        except BodyTooLarge as e:
+            result['error'] = str(e)
+            
+        except (URLError, OSError, http.client.HTTPException) as e:
+            result['error'] = f"Connection Error: {getattr(e, 'reason', e)}"
             
         except Exception as e:
             result['error'] = str(e)
@@ -163,7 +321,7 @@ class SimpleHTTPClient:
     def show_history(self):
         """Show request history"""
         print("\n📜 Request History:")
-        for i, req in enumerate(self.history[-10:], 1):
+        for i, req in enumerate(list(self.history)[-10:], 1):
             status = req.get('status', 'Error')
             print(f"  {i}. {req['method']} {req['url']} → {status}")
 
@@ -288,7 +446,87 @@ def interactive_mode():
             print(f"❌ Error: {e}")
 
 
+class LocalAPIHandler(BaseHTTPRequestHandler):
+    """Stand-in API for the benchmark: small JSON replies, keep-alive, gzip"""
+    
+    protocol_version = 'HTTP/1.1'  # keep-alive (HTTP/1.0 closes every connection)
+    disable_nagle_algorithm = True
+    
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        if self.path.startswith('/big'):
+            self._reply(200, {'data': 'x' * 5_000_000})
+        elif self.path.startswith('/missing'):
+            self._reply(404, {'detail': 'Not found'})
+        else:
+            self._reply(200, {'id': 1, 'path': self.path, 'ok': True})
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._reply(201, {'received': json.loads(self.rfile.read(length) or b'null')})
+    
+    def log_message(self, format, *args):
+        pass  # keep the benchmark output readable
+
+
+def start_local_server():
+    """Run LocalAPIHandler on a free port in a background thread"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LocalAPIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark(n_requests=2000):
+    """Requests/sec for urlopen-per-request vs pooled keep-alive connections"""
+    server, base_url = start_local_server()
+    print(f"\n🏁 Benchmark: {n_requests:,} GET requests to a local http.server ({base_url})\n")
+    
+    rates = {}
+    for name, transport in [('urlopen per request', UrllibTransport()),
+                            ('pooled keep-alive', PooledTransport())]:
+        with SimpleHTTPClient(transport=transport, history_size=50) as client:
+            client.get(f"{base_url}/warmup")
+            start = time.perf_counter()
+            for i in range(n_requests):
+                result = client.get(f"{base_url}/items/{i}")
+                assert result['status'] == 200, result
+            rates[name] = n_requests / (time.perf_counter() - start)
+            print(f"  {name:22} {rates[name]:>8,.0f} req/s   "
+                  f"({transport.connections_opened:,} TCP connections)")
+    print(f"\n  Speedup: {rates['pooled keep-alive'] / rates['urlopen per request']:.1f}x")
+    
+    with SimpleHTTPClient(max_body_size=1024 * 1024) as client:
+        print(f"\n  History holds the last {client.history.maxlen} results")
+        result = client.get(f"{base_url}/big")
+        print(f"  GET /big with a 1 MB cap → {result['error']}")
+        result = client.get(f"{base_url}/missing")
+        print(f"  GET /missing → {result['status']} {result['error']}: {result['response_body']}")
+        result = client.post(f"{base_url}/echo", {'name': 'Ada'})
+        print(f"  POST /echo (gzip reply: {result['response_headers'].get('Content-Encoding')}) "
+              f"→ {result['status']} {result['response_body']}")
+        print(f"  Connections opened for all three: {client.transport.connections_opened}")
+    server.shutdown()
+    server.server_close()
+
+
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+    
     # Run demo
     demo()
     
@@ -8,9 +8,23 @@ This project applies:
 - Parsing JSON responses
 - Handling API pagination
 - Displaying data in formatted output
+- Concurrent fetching with retries and a conditional-request cache
+
+Run with --local to try fetch_many() against a local stand-in server:
+    python 02_api_data_fetcher.py --local
 """
 
+import hashlib
 import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError, URLError
 
@@ -18,36 +32,161 @@ print("=" * 60)
 print("Mini Project 2: API Data Fetcher")
 print("=" * 60)
 
+class ResponseCache:
+    """
+    JSON responses on disk, keyed by URL, together with the ETag and
+    Last-Modified validators needed for conditional requests.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.json')
+    
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, url, etag, last_modified, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': last_modified,
+                           'data': data}, f)
+            os.replace(tmp_path, self._path(url))  # readers never see half a file
+        except BaseException:
+            os.unlink(tmp_path)  # don't leave the partial temp file behind
+            raise
+
+
 class APIDataFetcher:
     """
     Fetch and display data from public APIs.
+    
+    Every fetch retries transient failures (connection errors, 429 and
+    5xx) with jittered exponential backoff. With a cache_dir, responses
+    carrying an ETag or Last-Modified header are stored on disk and
+    revalidated with If-None-Match / If-Modified-Since; a 304 reply
+    returns the cached data without downloading it again.
     """
     
-    def __init__(self):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, cache_dir=None, max_workers=8, per_host_limit=4,
+                 max_retries=3, backoff=0.2, max_backoff=5.0, timeout=10):
         self.base_headers = {
             'Accept': 'application/json',
             'User-Agent': 'APIDataFetcher/1.0'
         }
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
     
-    def _fetch(self, url):
-        """Fetch data from URL"""
+    def _host_slot(self, url):
+        """Semaphore allowing per_host_limit requests at a time to url's host"""
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return slot
+    
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt + 1"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # "Full jitter": spreads retries out so clients don't retry in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+    
+    def _request(self, url, cached):
         req = Request(url)
         for key, value in self.base_headers.items():
             req.add_header(key, value)
+        if cached:
+            if cached.get('etag'):
+                req.add_header('If-None-Match', cached['etag'])
+            if cached.get('last_modified'):
+                req.add_header('If-Modified-Since', cached['last_modified'])
+        
+        with self._host_slot(url):
+            with urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+    
+    def _fetch(self, url):
+        """Fetch data from URL"""
+        cached = self.cache.get(url) if self.cache else None
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                status, headers, body = self._request(url, cached)
+                data = json.loads(body.decode())
+                etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+                if self.cache and (etag or last_modified):
+                    self.cache.put(url, etag, last_modified, data)
+                return {'success': True, 'status': status, 'data': data,
+                        'url': url, 'cached': False, 'attempts': attempt + 1}
+            except HTTPError as e:
+                e.close()
+                if e.code == 304 and cached:
+                    return {'success': True, 'status': 304, 'data': cached['data'],
+                            'url': url, 'cached': True, 'attempts': attempt + 1}
+                error = f"HTTP {e.code}: {e.reason}"
+                retryable = e.code in self.RETRY_STATUSES
+                retry_after = e.headers.get('Retry-After') if e.headers else None
+            except URLError as e:
+                error, retryable = f"Connection error: {e.reason}", True
+            except (TimeoutError, ConnectionError) as e:
+                error, retryable = f"Connection error: {e}", True
+            except Exception as e:
+                error, retryable = str(e), False
+            
+            if not retryable or attempt >= self.max_retries:
+                return {'success': False, 'error': error, 'url': url, 'attempts': attempt + 1}
+            time.sleep(self._backoff_delay(attempt, retry_after))
+            attempt += 1
+    
+    def fetch_many(self, urls):
+        """
+        Fetch URLs concurrently, yielding each result dict as soon as it
+        completes - completion order, not input order (see result['url']).
         
+        At most max_workers requests run at once and at most
+        per_host_limit per host. urls can be any iterable: only a window
+        of 2 * max_workers is queued at a time.
+        """
+        urls = iter(urls)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {pool.submit(self._fetch, url) for url in islice(urls, 2 * self.max_workers)}
         try:
-            with urlopen(req, timeout=10) as response:
-                return {
-                    'success': True,
-                    'status': response.status,
-                    'data': json.loads(response.read().decode())
-                }
-        except HTTPError as e:
-            return {'success': False, 'error': f"HTTP {e.code}: {e.reason}"}
-        except URLError as e:
-            return {'success': False, 'error': f"Connection error: {e.reason}"}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Refill the window before handing the result to the caller
+                    for url in islice(urls, 1):
+                        pending.add(pool.submit(self._fetch, url))
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()  # the caller stopped early
+            pool.shutdown()
+    
+    def fetch_posts_for_users(self, user_ids):
+        """Fetch several users' posts concurrently; returns {user_id: result}"""
+        urls = {f"https://jsonplaceholder.typicode.com/users/{user_id}/posts": user_id
+                for user_id in user_ids}
+        return {urls[result['url']]: result for result in self.fetch_many(urls)}
     
     def fetch_json_placeholder_users(self):
         """Fetch users from JSONPlaceholder API"""
@@ -260,7 +399,129 @@ def demo():
     print("Try exploring more APIs!")
 
 
+def start_local_api(delay=0.05):
+    """
+    Stand-in API on a free local port, for trying fetch_many() offline:
+    
+    /users/<id>/posts  posts with an ETag (304 on If-None-Match), after `delay`
+    /flaky/<id>        503 twice, then 200
+    /broken            always 500
+    
+    Returns (server, stats); stats counts /users requests and the most
+    concurrent ones seen per Host header.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    lock = threading.Lock()
+    stats = {'requests': 0, 'not_modified': 0, 'active': {}, 'max_active': {}, 'flaky': {}}
+    
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload, headers=()):
+            body = json.dumps(payload).encode() if payload is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def _work(self):
+            """Simulate `delay` of server work, tracking concurrency per Host"""
+            host = self.headers.get('Host', '').split(':')[0]
+            with lock:
+                stats['requests'] += 1
+                active = stats['active'][host] = stats['active'].get(host, 0) + 1
+                stats['max_active'][host] = max(stats['max_active'].get(host, 0), active)
+            time.sleep(delay)
+            with lock:
+                stats['active'][host] -= 1
+        
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if parts[0] == 'users' and len(parts) == 3:
+                self._work()
+                etag = f'"posts-{parts[1]}-v1"'
+                if self.headers.get('If-None-Match') == etag:
+                    with lock:
+                        stats['not_modified'] += 1
+                    self._send_json(304, None, [('ETag', etag)])
+                else:
+                    posts = [{'userId': int(parts[1]), 'id': i, 'title': f"Post {i}"}
+                             for i in range(1, 11)]
+                    self._send_json(200, posts, [('ETag', etag)])
+            elif parts[0] == 'flaky':
+                with lock:
+                    failures = stats['flaky'][self.path] = stats['flaky'].get(self.path, 0) + 1
+                if failures <= 2:
+                    self._send_json(503, {'detail': 'Try again'})
+                else:
+                    self._send_json(200, {'path': self.path})
+            elif parts[0] == 'broken':
+                self._send_json(500, {'detail': 'Always fails'})
+            else:
+                self._send_json(404, {'detail': 'Not found'})
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def local_demo():
+    """fetch_many() against the local stand-in API, with checks"""
+    server, stats = start_local_api(delay=0.05)
+    port = server.server_address[1]
+    # Two host names for the same server, so each gets its own limit
+    urls = [f"http://{host}:{port}/users/{user_id}/posts"
+            for user_id in range(1, 21) for host in ('127.0.0.1', 'localhost')]
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetcher = APIDataFetcher(cache_dir=cache_dir, max_workers=8, per_host_limit=3,
+                                 backoff=0.05)
+        
+        print(f"\n📥 {len(urls)} requests (50 ms each), one at a time...")
+        start = time.perf_counter()
+        sequential = [APIDataFetcher()._fetch(url) for url in urls[:10]]
+        per_request = (time.perf_counter() - start) / 10
+        print(f"   {per_request * 1000:.0f} ms per request → ~{per_request * len(urls):.1f}s for all {len(urls)}")
+        assert all(r['success'] for r in sequential)
+        
+        print(f"\n📥 Same {len(urls)} requests with fetch_many (8 workers, 3 per host)...")
+        for cached in (False, True):
+            start = time.perf_counter()
+            results = list(fetcher.fetch_many(urls))
+            elapsed = time.perf_counter() - start
+            assert len(results) == len(urls) and all(r['success'] for r in results)
+            assert {r['url'] for r in results} == set(urls)
+            hits = sum(r['cached'] for r in results)
+            label = "revalidated" if cached else "first fetch"
+            print(f"   {label:12} {elapsed:.2f}s, {hits} answered 304 from the disk cache")
+        first = [urlsplit(r['url']) for r in results[:4]]
+        print(f"   Completion order (first 4): {[u.hostname + u.path for u in first]}")
+        print(f"   Max concurrent requests per host: {stats['max_active']}")
+        assert max(stats['max_active'].values()) <= 3
+        
+        print("\n🔁 Retries with jittered backoff:")
+        retry_urls = [f"http://127.0.0.1:{port}/flaky/{i}" for i in range(3)]
+        retry_urls.append(f"http://127.0.0.1:{port}/broken")
+        for result in fetcher.fetch_many(retry_urls):
+            outcome = "✅ ok" if result['success'] else f"❌ {result['error']}"
+            print(f"   {urlsplit(result['url']).path:10} {outcome} after {result['attempts']} attempts")
+    
+    server.shutdown()
+    server.server_close()
+    print("\n✅ fetch_many checks passed")
+
+
 if __name__ == "__main__":
+    if "--local" in sys.argv:
+        local_demo()
+        sys.exit()
+    
     demo()
     
     # Additional demos you can try:
@@ -8,24 +8,69 @@ This project applies:
 - JSON data processing
 - Template patterns
 - HTML escaping for security
+- Streaming output for reports too big to build in memory
+
+Run with --benchmark to stream a 1,000,000-row report:
+    python 03_html_report_generator.py --benchmark
 """
 
+import io
 import json
 import html
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
 from datetime import datetime
 
 print("=" * 60)
 print("Mini Project 3: HTML Report Generator")
 print("=" * 60)
 
+class ChunkedWriter:
+    """
+    Collects small strings in a list and passes them on to a file-like
+    object in ~64 KB chunks, so writing a report row by row doesn't turn
+    into millions of tiny write() calls.
+    """
+    
+    def __init__(self, out, chunk_size=64 * 1024):
+        self.out = out
+        self.chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+    
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        if self._parts:
+            self.out.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+
 class HTMLReportGenerator:
     """
     Generate HTML reports from various data sources.
+    
+    The write_* methods stream HTML to any file-like object and accept
+    iterators, so a report can be bigger than memory. The generate_*
+    methods return the same HTML as a string.
     """
     
     def __init__(self, title="Report"):
         self.title = title
         self.styles = self._default_styles()
+        self._header_cache = (None, None, None)  # (title, styles, header html)
+    
+    @staticmethod
+    def _chunked(out):
+        return out if isinstance(out, ChunkedWriter) else ChunkedWriter(out)
     
     def _default_styles(self):
         """Return default CSS styles"""
@@ -136,8 +181,11 @@ class HTMLReportGenerator:
         return html.escape(str(text)) if text else ""
     
     def _generate_header(self):
-        """Generate HTML header"""
-        return f"""<!DOCTYPE html>
+        """Generate HTML header (built once, until title or styles change)"""
+        title, styles, header = self._header_cache
+        if title == self.title and styles is self.styles:
+            return header
+        header = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -148,6 +196,8 @@ class HTMLReportGenerator:
 <body>
 <div class="container">
 """
+        self._header_cache = (self.title, self.styles, header)
+        return header
     
     def _generate_footer(self):
         """Generate HTML footer"""
@@ -160,52 +210,63 @@ class HTMLReportGenerator:
 </body>
 </html>
 """
-    
-    def generate_table(self, headers, rows, title=None):
-        """Generate an HTML table"""
-        html_str = ""
+
+    def write_table(self, out, headers, rows, title=None):
+        """Stream an HTML table to out; rows can be any iterable, e.g. a generator"""
+        out = self._chunked(out)
+        escape = self._escape
         if title:
-            html_str += f"<h3>{self._escape(title)}</h3>\n"
+            out.write(f"<h3>{escape(title)}</h3>\n")
         
-        html_str += "<table>\n<thead>\n<tr>\n"
-        for header in headers:
-            html_str += f"  <th>{self._escape(header)}</th>\n"
-        html_str += "</tr>\n</thead>\n<tbody>\n"
+        out.write("<table>\n<thead>\n<tr>\n")
+        out.write("".join([f"  <th>{escape(header)}</th>\n" for header in headers]))
+        out.write("</tr>\n</thead>\n<tbody>\n")
         
+        write = out.write
         for row in rows:
-            html_str += "<tr>\n"
-            for cell in row:
-                html_str += f"  <td>{self._escape(cell)}</td>\n"
-            html_str += "</tr>\n"
+            write("<tr>\n" + "".join([f"  <td>{escape(cell)}</td>\n" for cell in row]) + "</tr>\n")
         
-        html_str += "</tbody>\n</table>\n"
-        return html_str
+        out.write("</tbody>\n</table>\n")
+        out.flush()
     
-    def generate_stat_boxes(self, stats):
-        """Generate statistic boxes"""
-        html_str = '<div class="card-grid">\n'
+    def generate_table(self, headers, rows, title=None):
+        """Generate an HTML table"""
+        buffer = io.StringIO()
+        self.write_table(buffer, headers, rows, title)
+        return buffer.getvalue()
+    
+    def write_stat_boxes(self, out, stats):
+        """Stream statistic boxes to out"""
+        out = self._chunked(out)
+        out.write('<div class="card-grid">\n')
         for stat in stats:
-            html_str += f"""
+            out.write(f"""
             <div class="stat-box">
                 <div class="number">{self._escape(stat['value'])}</div>
                 <div class="label">{self._escape(stat['label'])}</div>
             </div>
-            """
-        html_str += "</div>\n"
-        return html_str
+            """)
+        out.write("</div>\n")
+        out.flush()
     
-    def generate_bar_chart(self, data, title=None, max_value=None):
-        """Generate a simple horizontal bar chart"""
-        html_str = ""
+    def generate_stat_boxes(self, stats):
+        """Generate statistic boxes"""
+        buffer = io.StringIO()
+        self.write_stat_boxes(buffer, stats)
+        return buffer.getvalue()
+    
+    def write_bar_chart(self, out, data, title=None, max_value=None):
+        """Stream a simple horizontal bar chart to out"""
+        out = self._chunked(out)
         if title:
-            html_str += f"<h3>{self._escape(title)}</h3>\n"
+            out.write(f"<h3>{self._escape(title)}</h3>\n")
         
         if max_value is None:
             max_value = max(item['value'] for item in data) if data else 1
         
         for item in data:
             percentage = (item['value'] / max_value * 100) if max_value else 0
-            html_str += f"""
+            out.write(f"""
             <div class="chart-bar">
                 <div class="chart-bar-label">{self._escape(item['label'])}</div>
                 <div class="chart-bar-bg">
@@ -213,35 +274,71 @@ class HTMLReportGenerator:
                 </div>
                 <div class="chart-bar-value">{self._escape(str(item['value']))}</div>
             </div>
-            """
-        return html_str
+            """)
+        out.flush()
+    
+    def generate_bar_chart(self, data, title=None, max_value=None):
+        """Generate a simple horizontal bar chart"""
+        buffer = io.StringIO()
+        self.write_bar_chart(buffer, data, title, max_value)
+        return buffer.getvalue()
+    
+    def write_cards(self, out, items, template_func):
+        """Stream a card layout to out; items can be any iterable"""
+        out = self._chunked(out)
+        out.write('<div class="card-grid">\n')
+        for item in items:
+            out.write(f'<div class="card">\n{template_func(item)}\n</div>\n')
+        out.write("</div>\n")
+        out.flush()
     
     def generate_cards(self, items, template_func):
         """Generate card layout with custom template"""
-        html_str = '<div class="card-grid">\n'
-        for item in items:
-            html_str += f'<div class="card">\n{template_func(item)}\n</div>\n'
-        html_str += "</div>\n"
-        return html_str
+        buffer = io.StringIO()
+        self.write_cards(buffer, items, template_func)
+        return buffer.getvalue()
     
     def badge(self, text, style="info"):
         """Generate a badge"""
         return f'<span class="badge badge-{style}">{self._escape(text)}</span>'
     
-    def generate_report(self, sections):
-        """Generate complete report"""
-        html_str = self._generate_header()
-        html_str += f'<div class="report">\n'
-        html_str += f'<h1>{self._escape(self.title)}</h1>\n'
+    def write_report(self, out, sections):
+        """
+        Stream a complete report to out.
+        
+        A section's content is either an HTML string or a function that
+        writes it, e.g. lambda out: generator.write_table(out, headers, rows).
+        """
+        out = self._chunked(out)
+        out.write(self._generate_header())
+        out.write('<div class="report">\n')
+        out.write(f'<h1>{self._escape(self.title)}</h1>\n')
         
         for section in sections:
             if section.get('title'):
-                html_str += f'<h2>{self._escape(section["title"])}</h2>\n'
-            html_str += section.get('content', '') + "\n"
+                out.write(f'<h2>{self._escape(section["title"])}</h2>\n')
+            content = section.get('content', '')
+            if callable(content):
+                content(out)
+            else:
+                out.write(content)
+            out.write("\n")
         
-        html_str += '</div>\n'
-        html_str += self._generate_footer()
-        return html_str
+        out.write('</div>\n')
+        out.write(self._generate_footer())
+        out.flush()
+    
+    def generate_report(self, sections):
+        """Generate complete report"""
+        buffer = io.StringIO()
+        self.write_report(buffer, sections)
+        return buffer.getvalue()
+    
+    def save_report(self, filename, sections):
+        """Stream a complete report straight into a UTF-8 file"""
+        with open(filename, "w", encoding="utf-8") as f:
+            self.write_report(f, sections)
+        return filename
 
 
 def demo_user_report():
@@ -295,8 +392,6 @@ def demo_user_report():
     report_html = generator.generate_report(sections)
     
     # Save report using tempfile for cross-platform compatibility
-    import tempfile
-    import os
     filename = os.path.join(tempfile.gettempdir(), "user_report.html")
     with open(filename, "w") as f:
         f.write(report_html)
@@ -349,8 +444,6 @@ def demo_sales_report():
     report_html = generator.generate_report(sections)
     
     # Save report using tempfile for cross-platform compatibility
-    import tempfile
-    import os
     filename = os.path.join(tempfile.gettempdir(), "sales_report.html")
     with open(filename, "w") as f:
         f.write(report_html)
@@ -360,6 +453,92 @@ def demo_sales_report():
     return report_html
 
 
+def concat_table(generator, headers, rows, title=None):
+    """The original generate_table, building the HTML with += (for comparison)"""
+    html_str = ""
+    if title:
+        html_str += f"<h3>{generator._escape(title)}</h3>\n"
+    
+    html_str += "<table>\n<thead>\n<tr>\n"
+    for header in headers:
+        html_str += f"  <th>{generator._escape(header)}</th>\n"
+    html_str += "</tr>\n</thead>\n<tbody>\n"
+    
+    for row in rows:
+        html_str += "<tr>\n"
+        for cell in row:
+            html_str += f"  <td>{generator._escape(cell)}</td>\n"
+        html_str += "</tr>\n"
+    
+    html_str += "</tbody>\n</table>\n"
+    return html_str
+
+
+def benchmark(n_rows=1_000_000):
+    """Whole report as one string vs. streamed to a file, row by row"""
+    try:
+        import resource  # Unix only; elsewhere only tracemalloc is reported
+    except ImportError:
+        resource = None
+    
+    print("\n" + "=" * 60)
+    print(f"BENCHMARK: {n_rows:,}-row report")
+    print("=" * 60)
+    
+    headers = ["ID", "Email", "Status", "Orders"]
+    statuses = ["Active", "Inactive", "Pending"]
+    
+    def rows(n):
+        # A generator: the rows never exist in memory all at once
+        for i in range(n):
+            yield (i + 1, f"user{i}@example.com", statuses[i % 3], i % 97 + 1)
+    
+    generator = HTMLReportGenerator("Customer Export")
+    filename = os.path.join(tempfile.gettempdir(), "customer_export.html")
+    
+    def streamed(n):
+        sections = [{"title": "Customers",
+                     "content": lambda out: generator.write_table(out, headers, rows(n))}]
+        return generator.save_report(filename, sections)
+    
+    def in_memory(n):
+        sections = [{"title": "Customers",
+                     "content": concat_table(generator, headers, list(rows(n)))}]
+        report_html = generator.generate_report(sections)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(report_html)
+        return filename
+    
+    # Full size, untraced. ru_maxrss is the process high-water mark (KB on
+    # Linux), so the streamed run goes first, before anything big exists
+    print(f"\n{n_rows:,} rows:")
+    timings = {}
+    for name, build in [("streamed", streamed), ("+= string", in_memory)]:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+        start = time.perf_counter()
+        build(n_rows)
+        timings[name] = time.perf_counter() - start
+        if resource is None:
+            print(f"  {name:<10} {timings[name]:6.2f}s")
+            continue
+        grew = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024
+        print(f"  {name:<10} {timings[name]:6.2f}s   max RSS grew by {grew:6.1f} MB")
+    print(f"  File size: {os.path.getsize(filename) / 1e6:.1f} MB ({filename})")
+    
+    # Peak Python allocations on a smaller report (tracemalloc is slow)
+    small = n_rows // 10
+    print(f"\n{small:,} rows, tracemalloc peak:")
+    peaks = {}
+    for name, build in [("streamed", streamed), ("+= string", in_memory)]:
+        tracemalloc.start()
+        build(small)
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {name:<10} {peaks[name] / 1e6:8.2f} MB")
+    print(f"  {peaks['+= string'] / peaks['streamed']:.0f}x less memory when streamed")
+    os.remove(filename)
+
+
 def main():
     """Run demos"""
     print("\n🚀 HTML Report Generator Demo\n")
@@ -375,4 +554,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        main()
@@ -14,6 +14,7 @@ Requirements:
 
 2. Endpoints:
    - POST /users/ - Register new user
+   - POST /users/bulk - Register many users in one request
    - GET /users/ - List users with pagination and search
    - GET /users/me - Get current user (simulated)
    - GET /users/{user_id} - Get user by ID
@@ -27,15 +28,27 @@ Requirements:
    - Error handling with appropriate status codes
    - Search by username or email
    - Response models that hide sensitive data
+   - O(1) unique username/email checks, safe under concurrent requests
+   - Keyset (cursor) pagination, see pagination.py
+   - Per-client rate limiting (Week3/Day18/rate_limiting.py)
 
 Run with: uvicorn 02_user_api:app --reload
 """
 
-from fastapi import FastAPI, HTTPException, status, Query, Path
+from fastapi import FastAPI, HTTPException, status, Query, Path, Body, Response
 from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional, List
 from datetime import datetime
+import pathlib
 import re
+import sys
+import threading
+
+from pagination import InvalidCursor, KeysetPaginator, SortedIds
+
+# The rate limiters live with the Day 18 lesson
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "Day18"))
+from rate_limiting import RateLimitMiddleware, TokenBucketLimiter
 
 # ========== MODELS ==========
 
@@ -64,6 +77,13 @@ class UserUpdate(BaseModel):
         if v and not re.match(r'^[a-zA-Z0-9_]+$', v):
             raise ValueError('Username must be alphanumeric')
         return v.lower() if v else v
+    
+    @validator('username', 'email', 'full_name', pre=True)
+    def not_null(cls, v):
+        # Leave a field out to keep it; null would blank a required value
+        if v is None:
+            raise ValueError('may be omitted, but not null')
+        return v
 
 
 class UserResponse(BaseModel):
@@ -84,10 +104,70 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 100 requests per minute per client IP, with bursts of up to 100
+app.add_middleware(RateLimitMiddleware,
+                   limiter=TokenBucketLimiter(limit=100, period=60))
+
+MAX_BULK_USERS = 10_000
+
+
+class UniqueIndex:
+    """
+    Normalized field value -> user id.
+    
+    Replaces scanning users_db for duplicates: lookups are O(1), and values
+    are compared case-insensitively so "Alice@Example.com" and
+    "alice@example.com" count as the same email.
+    """
+    
+    def __init__(self, field: str):
+        self.field = field
+        self._ids = {}
+    
+    @staticmethod
+    def normalize(value: str) -> str:
+        return value.strip().casefold()
+    
+    def owner(self, value: Optional[str]) -> Optional[int]:
+        """Id of the user holding value, or None (None is never indexed)"""
+        if value is None:
+            return None
+        return self._ids.get(self.normalize(value))
+    
+    def is_taken(self, value: str, exclude_id: int = None) -> bool:
+        owner = self.owner(value)
+        return owner is not None and owner != exclude_id
+    
+    def add(self, user: dict) -> None:
+        if user[self.field] is not None:
+            self._ids[self.normalize(user[self.field])] = user["id"]
+    
+    def discard(self, user: dict) -> None:
+        if user[self.field] is None:
+            return
+        key = self.normalize(user[self.field])
+        if self._ids.get(key) == user["id"]:
+            del self._ids[key]
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
 # In-memory database
 users_db = {}
 next_id = 1
 
+# Unique indexes, kept in sync by insert_user/update_user_fields/remove_user.
+# FastAPI runs sync endpoints in a thread pool, so check-and-write sequences
+# hold db_lock to stop two requests claiming the same username at once.
+username_index = UniqueIndex("username")
+email_index = UniqueIndex("email")
+db_lock = threading.Lock()
+
+# Ordered ids for cursor pagination (also kept in sync by insert/remove)
+user_ids = SortedIds()
+user_paginator = KeysetPaginator("users.id")
+
 # Seed some data
 def seed_data():
     global next_id
@@ -96,7 +176,7 @@ def seed_data():
         {"username": "bob", "email": "bob@example.com", "full_name": "Bob Johnson", "password": "password123"},
     ]
     for user_data in sample_users:
-        users_db[next_id] = {
+        insert_user({
             "id": next_id,
             "username": user_data["username"],
             "email": user_data["email"],
@@ -104,11 +184,9 @@ def seed_data():
             "hashed_password": f"hashed_{user_data['password']}",
             "is_active": True,
             "created_at": datetime.utcnow()
-        }
+        })
         next_id += 1
 
-seed_data()
-
 
 # ========== HELPER FUNCTIONS ==========
 
@@ -123,23 +201,54 @@ def get_user_or_404(user_id: int):
 
 
 def check_username_exists(username: str, exclude_id: int = None):
-    """Check if username already exists."""
-    for uid, user in users_db.items():
-        if user["username"] == username and uid != exclude_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already registered"
-            )
+    """Check if username already exists (call with db_lock held)."""
+    if username_index.is_taken(username, exclude_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
 
 
 def check_email_exists(email: str, exclude_id: int = None):
-    """Check if email already exists."""
-    for uid, user in users_db.items():
-        if user["email"] == email and uid != exclude_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+    """Check if email already exists (call with db_lock held)."""
+    if email_index.is_taken(email, exclude_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+
+
+def insert_user(user: dict) -> dict:
+    """Store a user and index its username and email."""
+    users_db[user["id"]] = user
+    user_ids.add(user["id"])
+    username_index.add(user)
+    email_index.add(user)
+    return user
+
+
+def update_user_fields(user: dict, update_data: dict) -> dict:
+    """Apply changes to a stored user, re-indexing username/email."""
+    for index in (username_index, email_index):
+        if index.field in update_data:
+            index.discard(user)
+    user.update(update_data)
+    for index in (username_index, email_index):
+        if index.field in update_data:
+            index.add(user)
+    return user
+
+
+def remove_user(user_id: int) -> dict:
+    """Delete a user and drop it from the indexes."""
+    user = users_db.pop(user_id)
+    user_ids.discard(user_id)
+    username_index.discard(user)
+    email_index.discard(user)
+    return user
+
+
+seed_data()
 
 
 # ========== ENDPOINTS ==========
@@ -162,31 +271,88 @@ def create_user(user: UserCreate):
     """
     global next_id
     
-    check_username_exists(user.username)
-    check_email_exists(user.email)
+    # Check and insert atomically so concurrent requests can't both pass
+    with db_lock:
+        check_username_exists(user.username)
+        check_email_exists(user.email)
+        
+        new_user = insert_user({
+            "id": next_id,
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name,
+            "hashed_password": f"hashed_{user.password}",
+            "is_active": True,
+            "created_at": datetime.utcnow()
+        })
+        next_id += 1
     
-    new_user = {
-        "id": next_id,
-        "username": user.username,
-        "email": user.email,
-        "full_name": user.full_name,
-        "hashed_password": f"hashed_{user.password}",
-        "is_active": True,
-        "created_at": datetime.utcnow()
-    }
+    return new_user
+
+
+@app.post("/users/bulk", response_model=List[UserResponse], status_code=status.HTTP_201_CREATED, tags=["users"])
+def bulk_create_users(users: List[UserCreate] = Body(...)):
+    """
+    Register many users in one request (all or nothing).
     
-    users_db[next_id] = new_user
-    next_id += 1
+    Every user is checked against the existing users and against the rest
+    of the batch, and all conflicts are reported together. Nothing is
+    created unless the whole batch is valid.
     
-    return new_user
+    - **users**: List of users (at most MAX_BULK_USERS)
+    """
+    global next_id
+    
+    if len(users) > MAX_BULK_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_USERS} users per request"
+        )
+    
+    with db_lock:
+        errors = []
+        seen = {"username": {}, "email": {}}  # normalized value -> batch position
+        for position, user in enumerate(users):
+            for index in (username_index, email_index):
+                value = getattr(user, index.field)
+                key = index.normalize(value)
+                if index.owner(value) is not None:
+                    errors.append({"index": position, "field": index.field,
+                                   "error": f"{index.field.capitalize()} already registered"})
+                elif key in seen[index.field]:
+                    errors.append({"index": position, "field": index.field,
+                                   "error": f"Duplicate of item {seen[index.field][key]}"})
+                else:
+                    seen[index.field][key] = position
+        
+        if errors:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=errors)
+        
+        now = datetime.utcnow()
+        created = []
+        for user in users:
+            created.append(insert_user({
+                "id": next_id,
+                "username": user.username,
+                "email": user.email,
+                "full_name": user.full_name,
+                "hashed_password": f"hashed_{user.password}",
+                "is_active": True,
+                "created_at": now
+            }))
+            next_id += 1
+    
+    return created
 
 
 @app.get("/users/", response_model=List[UserResponse], tags=["users"])
 def get_users(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(10, ge=1, le=100, description="Max users to return"),
     search: Optional[str] = Query(None, min_length=2, description="Search in username or email"),
-    is_active: Optional[bool] = Query(None, description="Filter by active status")
+    is_active: Optional[bool] = Query(None, description="Filter by active status"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Previous-Cursor from a previous response")
 ):
     """
     Get all users with optional filtering and pagination.
@@ -195,7 +361,15 @@ def get_users(
     - **limit**: Maximum number of users to return
     - **search**: Search term for username or email
     - **is_active**: Filter by active status
+    - **cursor**: Continue from a previous page (skip is ignored)
+    
+    Cursors for the neighbouring pages are returned in the X-Next-Cursor and
+    X-Previous-Cursor headers. Unlike skip, a cursor costs the same on every
+    page and doesn't shift when users are created.
     """
+    if cursor is not None:
+        return get_users_page(response, cursor, limit, search, is_active)
+    
     users = list(users_db.values())
     
     # Filter by active status
@@ -211,7 +385,38 @@ def get_users(
         ]
     
     # Pagination
-    return users[skip: skip + limit]
+    page = users[skip: skip + limit]
+    if len(users) > skip + limit:
+        response.headers["X-Next-Cursor"] = user_paginator.encode_cursor(page[-1]["id"])
+    return page
+
+
+def get_users_page(response: Response, cursor: str, limit: int,
+                   search: Optional[str], is_active: Optional[bool]) -> list:
+    """Keyset version of get_users: walks ids after the cursor only."""
+    search_lower = search.lower() if search else None
+    
+    def matches(user_id: int) -> bool:
+        user = users_db[user_id]
+        if is_active is not None and user["is_active"] != is_active:
+            return False
+        return (search_lower is None
+                or search_lower in user["username"].lower()
+                or search_lower in user["email"].lower())
+    
+    try:
+        # Under db_lock so a concurrent delete can't pull ids out mid-walk
+        with db_lock:
+            page = user_paginator.paginate(user_ids, cursor, limit, matches)
+            users = [users_db[user_id] for user_id in page.ids]
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.previous_cursor:
+        response.headers["X-Previous-Cursor"] = page.previous_cursor
+    return users
 
 
 @app.get("/users/me", response_model=UserResponse, tags=["users"])
@@ -247,20 +452,18 @@ def update_user(
     
     - **user_id**: The ID of the user to update
     """
-    stored_user = get_user_or_404(user_id)
-    
     update_data = user_update.dict(exclude_unset=True)
     
-    if "username" in update_data:
-        check_username_exists(update_data["username"], exclude_id=user_id)
-    
-    if "email" in update_data:
-        check_email_exists(update_data["email"], exclude_id=user_id)
-    
-    for field, value in update_data.items():
-        stored_user[field] = value
-    
-    return stored_user
+    with db_lock:
+        stored_user = get_user_or_404(user_id)
+        
+        if "username" in update_data:
+            check_username_exists(update_data["username"], exclude_id=user_id)
+        
+        if "email" in update_data:
+            check_email_exists(update_data["email"], exclude_id=user_id)
+        
+        return update_user_fields(stored_user, update_data)
 
 
 @app.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["users"])
@@ -270,8 +473,9 @@ def delete_user(user_id: int = Path(..., gt=0)):
     
     - **user_id**: The ID of the user to delete
     """
-    get_user_or_404(user_id)
-    del users_db[user_id]
+    with db_lock:
+        get_user_or_404(user_id)
+        remove_user(user_id)
     return None
 
 
@@ -11,12 +11,17 @@ Features:
 - Custom validators
 - Error handling
 - Pagination and filtering
+- Indexed in-memory store (genre/stock sets, price ranges, n-gram search)
+- O(1) statistics maintained on every write
+- Keyset (cursor) pagination, see pagination.py
+- Per-client rate limiting (Week3/Day18/rate_limiting.py)
 - Response models
 - Proper status codes
 - API documentation
 
 Run with: uvicorn 03_bookstore_api:app --reload
 Test at: http://localhost:8000/docs
+Benchmark: python 03_bookstore_api.py --benchmark [num_books]
 """
 
 from fastapi import FastAPI, HTTPException, status, Query, Path
@@ -24,6 +29,23 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from fractions import Fraction
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+import heapq
+import math
+import pathlib
+import random
+import sys
+import threading
+import time
+
+from pagination import InvalidCursor, KeysetPaginator, SortedIds
+
+# The rate limiters live with the Day 18 lesson
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "Day18"))
+from rate_limiting import RateLimitMiddleware, TokenBucketLimiter
 
 # ========== ENUMS ==========
 
@@ -79,11 +101,360 @@ class BookResponse(BookBase):
 
 
 class PaginatedResponse(BaseModel):
-    """Paginated response wrapper."""
-    total: int
-    page: int
+    """Paginated response wrapper (total and page are null for cursor pages)."""
+    total: Optional[int]
+    page: Optional[int]
     per_page: int
     books: List[BookResponse]
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+
+# ========== INDEXED STORE ==========
+
+class BookStore:
+    """
+    In-memory book table with secondary indexes.
+    
+    A plain dict makes every list/search request walk all books. This keeps
+    the same id -> book mapping plus indexes that are updated on each write:
+    
+    - genre / in_stock: value -> set of ids
+    - price: parallel arrays of prices and ids sorted by (price, id), so a
+      min_price/max_price range is a slice of ids
+    - search: 3-gram -> array of ids over the lowercased title and author
+    
+    The /books/stats/summary aggregates are kept here too: counts come from
+    the index sizes, and stock/price totals are adjusted as books change.
+    
+    All writes must go through add/replace/update/delete so the indexes
+    stay in sync; never mutate a returned book dict directly.
+    """
+    
+    GRAM = 3
+    TEXT_FIELDS = ("title", "author")
+    
+    def __init__(self):
+        self._books = {}                  # id -> book dict (id order)
+        self.ids = SortedIds()            # for cursor pagination
+        self._by_genre = {}               # genre -> set of ids
+        self._by_stock = {True: set(), False: set()}
+        self._prices = array("d")         # sorted prices ...
+        self._price_ids = array("I")      # ... and their ids (ties by id)
+        self._text = {}                   # id -> "title\0author" lowercased
+        self._grams = {}                  # gram -> array of ids (append-only)
+        self._postings = 0                # ids stored in self._grams
+        self._stale = 0                   # postings left behind by edits/deletes
+        self._total_stock = 0
+        self._price_sum = Fraction(0)     # exact, so no drift after many edits
+        # FastAPI runs the sync endpoints on a threadpool: writes and reads
+        # that walk several indexes hold this (hold it yourself to combine
+        # calls, e.g. a lookup followed by a write)
+        self.lock = threading.RLock()
+    
+    def __contains__(self, book_id: int) -> bool:
+        return book_id in self._books
+    
+    def __len__(self) -> int:
+        return len(self._books)
+    
+    def __getitem__(self, book_id: int) -> dict:
+        return self._books[book_id]
+    
+    def get(self, book_id: int) -> Optional[dict]:
+        return self._books.get(book_id)
+    
+    def values(self):
+        return self._books.values()
+    
+    # ----- writes -----
+    
+    def add(self, book: dict) -> dict:
+        with self.lock:
+            book_id = book["id"]
+            if book_id in self._books:
+                raise KeyError(f"Book {book_id} already exists")
+            self._books[book_id] = book
+            self.ids.add(book_id)
+            self._index_fields(book)
+            self._index_price(book)
+            self._index_text(book)
+            return book
+    
+    def bulk_load(self, books) -> int:
+        """Add many books, sorting the price index once at the end"""
+        with self.lock:
+            count = 0
+            for book in books:
+                book_id = book["id"]
+                if book_id in self._books:
+                    raise KeyError(f"Book {book_id} already exists")
+                self._books[book_id] = book
+                self.ids.add(book_id)
+                self._index_fields(book)
+                self._index_text(book)
+                count += 1
+            entries = sorted((book["price"], book_id) for book_id, book in self._books.items())
+            self._prices = array("d", (price for price, _ in entries))
+            self._price_ids = array("I", (book_id for _, book_id in entries))
+            return count
+    
+    def replace(self, book_id: int, book: dict) -> dict:
+        with self.lock:
+            old = self._books[book_id]
+            self._unindex_fields(old)
+            self._unindex_price(old)
+            self._books[book_id] = book
+            self._index_fields(book)
+            self._index_price(book)
+            if self._text_of(book) != self._text[book_id]:
+                self._unindex_text(book_id)
+                self._index_text(book)
+                self._compact_grams()
+            return book
+    
+    def update(self, book_id: int, changes: dict) -> dict:
+        with self.lock:
+            book = self._books[book_id]
+            self._unindex_fields(book)
+            if "price" in changes:
+                self._unindex_price(book)
+            book.update(changes)
+            self._index_fields(book)
+            if "price" in changes:
+                self._index_price(book)
+            if any(field in changes for field in self.TEXT_FIELDS):
+                if self._text_of(book) != self._text[book_id]:
+                    self._unindex_text(book_id)
+                    self._index_text(book)
+                    self._compact_grams()
+            return book
+    
+    def delete(self, book_id: int) -> dict:
+        with self.lock:
+            book = self._books.pop(book_id)
+            self.ids.discard(book_id)
+            self._unindex_fields(book)
+            self._unindex_price(book)
+            self._unindex_text(book_id)
+            self._compact_grams()
+            return book
+    
+    # ----- reads -----
+    
+    def query(self, genre=None, in_stock=None, min_price=None, max_price=None,
+              offset: int = 0, limit: Optional[int] = None):
+        """
+        Return (total, books[offset:offset + limit]) for the filters, in id order.
+        
+        The smallest candidate set (a genre, a stock flag or a price range)
+        drives the scan; only the ids on the requested page are sorted out.
+        """
+        with self.lock:
+            end = None if limit is None else offset + limit
+            sets = []
+            if genre is not None:
+                sets.append(self._by_genre.get(genre, set()))
+            if in_stock is not None:
+                sets.append(self._by_stock[bool(in_stock)])
+            has_price = min_price is not None or max_price is not None
+            
+            if not sets and not has_price:
+                ids = islice(self._books, offset, end)
+                return len(self._books), [self._books[book_id] for book_id in ids]
+            
+            sets.sort(key=len)
+            if has_price:
+                lo = 0 if min_price is None else bisect_left(self._prices, min_price)
+                hi = (len(self._prices) if max_price is None
+                      else bisect_right(self._prices, max_price))
+            if not sets:
+                matched = self._price_ids[lo:hi]
+            elif has_price and hi - lo <= 8 * len(sets[0]):
+                # Set intersection runs in C, even over a somewhat larger range
+                matched = sets[0].intersection(self._price_ids[lo:hi], *sets[1:])
+            else:
+                matched = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+                if has_price:
+                    # Range is much wider than the set: check the few prices instead
+                    low = -math.inf if min_price is None else min_price
+                    high = math.inf if max_price is None else max_price
+                    books = self._books
+                    matched = [book_id for book_id in matched
+                               if low <= books[book_id]["price"] <= high]
+            
+            total = len(matched)
+            if end is None or end >= total:
+                page_ids = sorted(matched)[offset:]
+            else:
+                page_ids = heapq.nsmallest(end, matched)[offset:]
+            return total, [self._books[book_id] for book_id in page_ids]
+    
+    def matcher(self, genre=None, in_stock=None, min_price=None, max_price=None):
+        """Predicate on book ids for the filters, or None if there are none"""
+        checks = []
+        if genre is not None:
+            checks.append(self._by_genre.get(genre, set()).__contains__)
+        if in_stock is not None:
+            checks.append(self._by_stock[bool(in_stock)].__contains__)
+        if min_price is not None or max_price is not None:
+            low = -math.inf if min_price is None else min_price
+            high = math.inf if max_price is None else max_price
+            books = self._books
+            checks.append(lambda book_id: low <= books[book_id]["price"] <= high)
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda book_id: all(check(book_id) for check in checks)
+    
+    def search(self, q: str, limit: Optional[int] = None) -> List[dict]:
+        """Books whose title or author contains q (case-insensitive), in id order"""
+        with self.lock:
+            query = q.lower()
+            results = []
+            if "\0" in query:
+                return results
+            if len(query) < self.GRAM:
+                # Too short for the gram index; still skips per-book lower()
+                candidates = self._books
+            else:
+                postings = []
+                for i in range(len(query) - self.GRAM + 1):
+                    ids = self._grams.get(query[i:i + self.GRAM])
+                    if ids is None:
+                        return []
+                    postings.append(ids)
+                candidates = sorted(set(min(postings, key=len)))
+            
+            for book_id in candidates:
+                # Verifying the substring also drops stale postings
+                text = self._text.get(book_id)
+                if text is not None and query in text:
+                    results.append(self._books[book_id])
+                    if len(results) == limit:
+                        break
+            return results
+    
+    # ----- aggregates -----
+    
+    def stats(self) -> dict:
+        """Store statistics in O(number of genres)"""
+        with self.lock:
+            return self._stats_dict(
+                total_books=len(self._books),
+                total_stock=self._total_stock,
+                in_stock_count=len(self._by_stock[True]),
+                price_sum=self._price_sum,
+                genre_counts={genre: len(ids) for genre, ids in self._by_genre.items()}
+            )
+    
+    def recompute_stats(self) -> dict:
+        """The same statistics from a full walk over every book"""
+        with self.lock:
+            books = self._books.values()
+            genre_counts = {}
+            for book in books:
+                genre_counts[book["genre"]] = genre_counts.get(book["genre"], 0) + 1
+            return self._stats_dict(
+                total_books=len(self._books),
+                total_stock=sum(b["stock"] for b in books),
+                in_stock_count=sum(1 for b in books if b["in_stock"]),
+                price_sum=sum((Fraction(b["price"]) for b in books), Fraction(0)),
+                genre_counts=genre_counts
+            )
+    
+    def verify_stats(self) -> dict:
+        """Compare stats() with recompute_stats(); returns {field: (kept, actual)}"""
+        with self.lock:
+            kept, actual = self.stats(), self.recompute_stats()
+        return {
+            field: (kept.get(field), actual.get(field))
+            for field in kept.keys() | actual.keys()
+            if kept.get(field) != actual.get(field)
+        }
+    
+    @staticmethod
+    def _stats_dict(total_books, total_stock, in_stock_count, price_sum, genre_counts) -> dict:
+        if not total_books:
+            return {"message": "No books in the store"}
+        return {
+            "total_books": total_books,
+            "total_stock": total_stock,
+            "in_stock_count": in_stock_count,
+            "out_of_stock_count": total_books - in_stock_count,
+            "average_price": round(float(price_sum / total_books), 2),
+            "books_by_genre": genre_counts
+        }
+    
+    # ----- index maintenance -----
+    
+    def _index_fields(self, book: dict) -> None:
+        self._by_genre.setdefault(book["genre"], set()).add(book["id"])
+        self._by_stock[bool(book["in_stock"])].add(book["id"])
+        self._total_stock += book["stock"]
+        self._price_sum += Fraction(book["price"])
+    
+    def _unindex_fields(self, book: dict) -> None:
+        ids = self._by_genre[book["genre"]]
+        ids.discard(book["id"])
+        if not ids:
+            del self._by_genre[book["genre"]]
+        self._by_stock[bool(book["in_stock"])].discard(book["id"])
+        self._total_stock -= book["stock"]
+        self._price_sum -= Fraction(book["price"])
+    
+    def _price_slot(self, book: dict) -> int:
+        """Position of (price, id) in the price arrays"""
+        price = book["price"]
+        lo = bisect_left(self._prices, price)
+        hi = bisect_right(self._prices, price, lo)
+        return bisect_left(self._price_ids, book["id"], lo, hi)
+    
+    def _index_price(self, book: dict) -> None:
+        i = self._price_slot(book)
+        self._prices.insert(i, book["price"])
+        self._price_ids.insert(i, book["id"])
+    
+    def _unindex_price(self, book: dict) -> None:
+        i = self._price_slot(book)
+        if i < len(self._price_ids) and self._price_ids[i] == book["id"]:
+            del self._prices[i]
+            del self._price_ids[i]
+    
+    def _text_of(self, book: dict) -> str:
+        # \0 can't appear in a query, so matches never span both fields
+        return "\0".join(book[field].lower() for field in self.TEXT_FIELDS)
+    
+    def _index_text(self, book: dict) -> None:
+        book_id = book["id"]
+        text = self._text[book_id] = self._text_of(book)
+        grams = self._grams_of(text)
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                ids = self._grams[gram] = array("I")
+            ids.append(book_id)
+        self._postings += len(grams)
+    
+    def _grams_of(self, text: str) -> set:
+        n = self.GRAM
+        grams = {text[i:i + n] for i in range(len(text) - n + 1)}
+        return {gram for gram in grams if "\0" not in gram}
+    
+    def _unindex_text(self, book_id: int) -> None:
+        # Postings are append-only arrays: leave the old entries behind and
+        # let search() skip them
+        self._stale += len(self._grams_of(self._text.pop(book_id)))
+    
+    def _compact_grams(self) -> None:
+        """Rebuild the gram index once stale postings outnumber live ones"""
+        if self._stale <= 1000 or self._stale <= self._postings - self._stale:
+            return
+        self._grams = {}
+        self._postings = self._stale = 0
+        for book in self._books.values():
+            self._index_text(book)
 
 
 # ========== APP SETUP ==========
@@ -107,8 +478,13 @@ app = FastAPI(
     }
 )
 
-# In-memory database
-books_db = {}
+# 100 requests per minute per client IP, with bursts of up to 100
+app.add_middleware(RateLimitMiddleware,
+                   limiter=TokenBucketLimiter(limit=100, period=60))
+
+# In-memory database (indexed, see BookStore)
+books_db = BookStore()
+book_paginator = KeysetPaginator("books.id")
 next_id = 1
 
 
@@ -148,13 +524,13 @@ def seed_data():
     ]
     
     for book_data in sample_books:
-        books_db[next_id] = {
+        books_db.add({
             "id": next_id,
             **book_data,
             "in_stock": book_data["stock"] > 0,
             "created_at": datetime.utcnow(),
             "updated_at": None
-        }
+        })
         next_id += 1
 
 seed_data()
@@ -164,12 +540,13 @@ seed_data()
 
 def get_book_or_404(book_id: int) -> dict:
     """Get a book by ID or raise 404."""
-    if book_id not in books_db:
+    book = books_db.get(book_id)
+    if book is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Book with id {book_id} not found"
         )
-    return books_db[book_id]
+    return book
 
 
 # ========== ENDPOINTS ==========
@@ -195,7 +572,8 @@ def get_books(
     genre: Optional[Genre] = Query(None, description="Filter by genre"),
     in_stock: Optional[bool] = Query(None, description="Filter by stock availability"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
-    max_price: Optional[float] = Query(None, ge=0, description="Maximum price")
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    cursor: Optional[str] = Query(None, description="next_cursor/previous_cursor from a previous response")
 ):
     """
     Get all books with filtering and pagination.
@@ -206,33 +584,50 @@ def get_books(
     - **in_stock**: Filter by stock availability
     - **min_price**: Minimum price filter
     - **max_price**: Maximum price filter
-    """
-    books = list(books_db.values())
-    
-    # Apply filters
-    if genre:
-        books = [b for b in books if b["genre"] == genre]
-    
-    if in_stock is not None:
-        books = [b for b in books if b["in_stock"] == in_stock]
+    - **cursor**: Continue from a previous page (page is ignored)
     
-    if min_price is not None:
-        books = [b for b in books if b["price"] >= min_price]
-    
-    if max_price is not None:
-        books = [b for b in books if b["price"] <= max_price]
+    Cursor pages cost the same however deep they are and don't shift when
+    books are added, but they don't report total or page.
+    """
+    if cursor is not None:
+        # The matcher reads the indexes while paginate walks the ids
+        with books_db.lock:
+            try:
+                result = book_paginator.paginate(
+                    books_db.ids, cursor, per_page,
+                    books_db.matcher(genre, in_stock, min_price, max_price)
+                )
+            except InvalidCursor as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            books = [books_db[book_id] for book_id in result.ids]
+        return {
+            "total": None,
+            "page": None,
+            "per_page": per_page,
+            "books": books,
+            "next_cursor": result.next_cursor,
+            "previous_cursor": result.previous_cursor
+        }
     
-    # Calculate pagination
-    total = len(books)
+    # Filters are answered from the indexes; only the page is materialized
     start = (page - 1) * per_page
-    end = start + per_page
-    paginated_books = books[start:end]
+    total, paginated_books = books_db.query(
+        genre=genre,
+        in_stock=in_stock,
+        min_price=min_price,
+        max_price=max_price,
+        offset=start,
+        limit=per_page
+    )
     
+    has_more = total > start + per_page
     return {
         "total": total,
         "page": page,
         "per_page": per_page,
-        "books": paginated_books
+        "books": paginated_books,
+        "next_cursor": (book_paginator.encode_cursor(paginated_books[-1]["id"])
+                        if has_more and paginated_books else None)
     }
 
 
@@ -247,12 +642,7 @@ def search_books(
     - **q**: Search query (min 2 characters)
     - **limit**: Maximum number of results
     """
-    query = q.lower()
-    results = [
-        book for book in books_db.values()
-        if query in book["title"].lower() or query in book["author"].lower()
-    ]
-    return results[:limit]
+    return books_db.search(q, limit=limit)
 
 
 @app.post("/books/", response_model=BookResponse, status_code=status.HTTP_201_CREATED, tags=["books"])
@@ -270,22 +660,23 @@ def create_book(book: BookCreate):
     """
     global next_id
     
-    new_book = {
-        "id": next_id,
-        "title": book.title,
-        "author": book.author,
-        "genre": book.genre,
-        "price": book.price,
-        "isbn": book.isbn,
-        "description": book.description,
-        "stock": book.stock,
-        "in_stock": book.stock > 0,
-        "created_at": datetime.utcnow(),
-        "updated_at": None
-    }
-    
-    books_db[next_id] = new_book
-    next_id += 1
+    with books_db.lock:
+        new_book = {
+            "id": next_id,
+            "title": book.title,
+            "author": book.author,
+            "genre": book.genre,
+            "price": book.price,
+            "isbn": book.isbn,
+            "description": book.description,
+            "stock": book.stock,
+            "in_stock": book.stock > 0,
+            "created_at": datetime.utcnow(),
+            "updated_at": None
+        }
+        
+        books_db.add(new_book)
+        next_id += 1
     
     return new_book
 
@@ -310,24 +701,24 @@ def update_book(
     
     - **book_id**: The ID of the book to update
     """
-    get_book_or_404(book_id)
-    
-    updated_book = {
-        "id": book_id,
-        "title": book.title,
-        "author": book.author,
-        "genre": book.genre,
-        "price": book.price,
-        "isbn": book.isbn,
-        "description": book.description,
-        "stock": book.stock,
-        "in_stock": book.stock > 0,
-        "created_at": books_db[book_id]["created_at"],
-        "updated_at": datetime.utcnow()
-    }
-    
-    books_db[book_id] = updated_book
-    return updated_book
+    with books_db.lock:
+        stored_book = get_book_or_404(book_id)
+        
+        updated_book = {
+            "id": book_id,
+            "title": book.title,
+            "author": book.author,
+            "genre": book.genre,
+            "price": book.price,
+            "isbn": book.isbn,
+            "description": book.description,
+            "stock": book.stock,
+            "in_stock": book.stock > 0,
+            "created_at": stored_book["created_at"],
+            "updated_at": datetime.utcnow()
+        }
+        
+        return books_db.replace(book_id, updated_book)
 
 
 @app.patch("/books/{book_id}", response_model=BookResponse, tags=["books"])
@@ -340,20 +731,18 @@ def partial_update_book(
     
     - **book_id**: The ID of the book to update
     """
-    stored_book = get_book_or_404(book_id)
-    
     update_data = book.dict(exclude_unset=True)
     
-    for field, value in update_data.items():
-        stored_book[field] = value
-    
     # Update in_stock based on stock
     if "stock" in update_data:
-        stored_book["in_stock"] = stored_book["stock"] > 0
+        update_data["in_stock"] = update_data["stock"] > 0
     
-    stored_book["updated_at"] = datetime.utcnow()
+    update_data["updated_at"] = datetime.utcnow()
     
-    return stored_book
+    # Goes through the store so the indexes see the change
+    with books_db.lock:
+        get_book_or_404(book_id)
+        return books_db.update(book_id, update_data)
 
 
 @app.delete("/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["books"])
@@ -363,8 +752,9 @@ def delete_book(book_id: int = Path(..., gt=0)):
     
     - **book_id**: The ID of the book to delete
     """
-    get_book_or_404(book_id)
-    del books_db[book_id]
+    with books_db.lock:
+        get_book_or_404(book_id)
+        books_db.delete(book_id)
     return None
 
 
@@ -379,42 +769,151 @@ def restock_book(
     - **book_id**: The ID of the book to restock
     - **quantity**: Number of copies to add
     """
-    book = get_book_or_404(book_id)
-    book["stock"] += quantity
-    book["in_stock"] = True
-    book["updated_at"] = datetime.utcnow()
-    return book
+    with books_db.lock:
+        book = get_book_or_404(book_id)
+        return books_db.update(book_id, {
+            "stock": book["stock"] + quantity,
+            "in_stock": True,
+            "updated_at": datetime.utcnow()
+        })
 
 
 @app.get("/books/stats/summary", tags=["stats"])
 def get_stats():
-    """Get book store statistics."""
-    books = list(books_db.values())
+    """
+    Get book store statistics.
     
-    if not books:
-        return {"message": "No books in the store"}
+    Served from aggregates the store keeps up to date on every write, so
+    this is cheap enough to poll.
+    """
+    return books_db.stats()
+
+
+@app.get("/books/stats/verify", tags=["stats"])
+def verify_stats():
+    """
+    Check the maintained statistics against a full recompute.
     
-    total_books = len(books)
-    total_stock = sum(b["stock"] for b in books)
-    in_stock_count = sum(1 for b in books if b["in_stock"])
-    avg_price = sum(b["price"] for b in books) / total_books
+    Walks every book, so use it for debugging rather than polling.
+    """
+    mismatches = books_db.verify_stats()
+    return {
+        "consistent": not mismatches,
+        "mismatches": {field: {"kept": kept, "actual": actual}
+                       for field, (kept, actual) in mismatches.items()}
+    }
+
+
+# ========== BENCHMARK ==========
+
+def run_benchmark(num_books: int = 1_000_000):
+    """Compare the indexed store with the old full scans on generated books."""
+    words = [f"{a}{b}{c}" for a in "bcdfghklmnprst" for b in "aeiou" for c in "lmnrst"]
+    genres = list(Genre)
+    rng = random.Random(42)
     
-    genre_counts = {}
+    print(f"Generating {num_books:,} books...")
+    books = [
+        {
+            "id": i,
+            "title": " ".join(rng.choice(words) for _ in range(3)).title(),
+            "author": f"{rng.choice(words)} {rng.choice(words)}".title(),
+            "genre": rng.choice(genres),
+            "price": round(rng.uniform(5, 100), 2),
+            "isbn": None,
+            "description": None,
+            "stock": rng.choice((0, 0, 5, 20)),
+            "in_stock": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": None
+        }
+        for i in range(1, num_books + 1)
+    ]
     for book in books:
-        genre = book["genre"]
-        genre_counts[genre] = genre_counts.get(genre, 0) + 1
+        book["in_stock"] = book["stock"] > 0
+    plain = {book["id"]: book for book in books}
     
-    return {
-        "total_books": total_books,
-        "total_stock": total_stock,
-        "in_stock_count": in_stock_count,
-        "out_of_stock_count": total_books - in_stock_count,
-        "average_price": round(avg_price, 2),
-        "books_by_genre": genre_counts
-    }
+    start = time.perf_counter()
+    store = BookStore()
+    store.bulk_load(books)
+    print(f"Indexed in {time.perf_counter() - start:.1f}s")
+    
+    def scan_list(genre=None, in_stock=None, min_price=None, max_price=None, page=1):
+        # The original get_books body
+        found = list(plain.values())
+        if genre:
+            found = [b for b in found if b["genre"] == genre]
+        if in_stock is not None:
+            found = [b for b in found if b["in_stock"] == in_stock]
+        if min_price is not None:
+            found = [b for b in found if b["price"] >= min_price]
+        if max_price is not None:
+            found = [b for b in found if b["price"] <= max_price]
+        start = (page - 1) * 10
+        return len(found), found[start:start + 10]
+    
+    def scan_search(q, limit=10):
+        # The original search_books body
+        query = q.lower()
+        found = [b for b in plain.values()
+                 if query in b["title"].lower() or query in b["author"].lower()]
+        return found[:limit]
+    
+    rare = rng.choice(words)
+    cases = [
+        ("page 1, no filters", {}),
+        ("page 500, no filters", {"page": 500}),
+        ("genre", {"genre": Genre.science}),
+        ("genre + in_stock", {"genre": Genre.science, "in_stock": True}),
+        ("price 10.00-10.50", {"min_price": 10.0, "max_price": 10.5}),
+        ("genre + price 20-40", {"genre": Genre.history, "min_price": 20, "max_price": 40}),
+    ]
+    
+    def timed(fn, repeat=3):
+        best = math.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        return result, best * 1000
+    
+    print(f"\n{'query':28} {'scan':>10} {'indexed':>10}")
+    for name, filters in cases:
+        page = filters.pop("page", 1)
+        expected, scan_ms = timed(lambda: scan_list(page=page, **filters))
+        actual, index_ms = timed(lambda: store.query(offset=(page - 1) * 10, limit=10, **filters))
+        assert expected == actual, name
+        print(f"{name:28} {scan_ms:>8.2f}ms {index_ms:>8.3f}ms")
+    
+    for q in (rare, rare[:2], "zzz"):
+        expected, scan_ms = timed(lambda: scan_search(q))
+        actual, index_ms = timed(lambda: store.search(q, limit=10))
+        assert expected == actual, q
+        print(f"{'search ' + repr(q):28} {scan_ms:>8.2f}ms {index_ms:>8.3f}ms")
+    
+    expected, scan_ms = timed(store.recompute_stats)
+    actual, index_ms = timed(store.stats)
+    assert expected == actual
+    print(f"{'stats summary':28} {scan_ms:>8.2f}ms {index_ms:>8.3f}ms")
+    
+    # Deep pages: offset walks past every earlier book, a cursor bisects
+    paginator = KeysetPaginator("books.id")
+    print(f"\n{'deep page':28} {'offset':>10} {'cursor':>10}")
+    for page in (1, num_books // 100, num_books // 25):
+        filters = {"in_stock": True}
+        offset = (page - 1) * 10
+        expected, offset_ms = timed(lambda: store.query(offset=offset, limit=10, **filters)[1])
+        cursor = None if page == 1 else paginator.encode_cursor(expected[0]["id"] - 1)
+        predicate = store.matcher(**filters)
+        result, cursor_ms = timed(lambda: paginator.paginate(store.ids, cursor, 10, predicate))
+        assert [book["id"] for book in expected] == result.ids
+        print(f"{f'in_stock page {page:,}':28} {offset_ms:>8.2f}ms {cursor_ms:>8.3f}ms")
 
 
 # Run with: uvicorn 03_bookstore_api:app --reload
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        run_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,161 @@
+"""
+Keyset (cursor) pagination for the in-memory FastAPI mini projects
+===================================================================
+The FastAPI version of ArticleCursorPagination from
+Week3/Day16/03_filtering_pagination.py, shared by 02_user_api.py and
+03_bookstore_api.py.
+
+Offset pagination (?skip=5000 / ?page=500) has to walk past every earlier
+item, so deep pages get slower and shift when rows are inserted. Keyset
+pagination remembers the last key it returned instead:
+
+    GET /books/                     -> page 1 + next cursor
+    GET /books/?cursor=eyJvIjoi...  -> the items after that key
+
+- Cursors are opaque (base64 JSON) but only carry the sort key, so a
+  client can't use them to jump to arbitrary positions
+- Finding the start of a page is a binary search: page N costs the same
+  as page 1
+- New items get larger ids, so inserts never shift or repeat a page
+
+Usage:
+    ids = SortedIds()                  # keep in sync on insert/delete
+    paginator = KeysetPaginator("id")
+    page = paginator.paginate(ids, cursor, limit=10, predicate=None)
+    page.ids, page.next_cursor, page.previous_cursor
+"""
+
+import base64
+import binascii
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, List, NamedTuple, Optional
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that are malformed or belong to another endpoint."""
+
+
+class SortedIds:
+    """
+    Ascending ids in a compact array, for binary searching a cursor position.
+
+    Ids are handed out in increasing order, so add() is normally an append.
+    """
+
+    def __init__(self, ids=()):
+        self._ids = array("q", sorted(ids))
+
+    def add(self, item_id: int) -> None:
+        ids = self._ids
+        if not ids or item_id > ids[-1]:
+            ids.append(item_id)
+            return
+        i = bisect_left(ids, item_id)
+        if i == len(ids) or ids[i] != item_id:
+            ids.insert(i, item_id)
+
+    def discard(self, item_id: int) -> None:
+        i = bisect_left(self._ids, item_id)
+        if i < len(self._ids) and self._ids[i] == item_id:
+            del self._ids[i]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, position: int) -> int:
+        return self._ids[position]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, item_id: int) -> bool:
+        i = bisect_left(self._ids, item_id)
+        return i < len(self._ids) and self._ids[i] == item_id
+
+
+class Page(NamedTuple):
+    ids: List[int]
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+
+class KeysetPaginator:
+    """
+    Forward/backward pages over a SortedIds index.
+
+    ordering names the endpoint's sort key and is written into every
+    cursor, so a cursor from /users/ is rejected by /books/.
+    """
+
+    def __init__(self, ordering: str = "id"):
+        self.ordering = ordering
+
+    def encode_cursor(self, key: int, reverse: bool = False) -> str:
+        payload = {"o": self.ordering, "k": key}
+        if reverse:
+            payload["r"] = 1
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str):
+        """Return (key, reverse) or raise InvalidCursor"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            key = payload["k"]
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            raise InvalidCursor("Invalid cursor") from None
+        if payload.get("o") != self.ordering or type(key) is not int:
+            raise InvalidCursor("Invalid cursor")
+        return key, bool(payload.get("r"))
+
+    def paginate(self, index: SortedIds, cursor: Optional[str], limit: int,
+                 predicate: Optional[Callable[[int], bool]] = None) -> Page:
+        """
+        Up to `limit` ids after (or, for a previous cursor, before) the
+        cursor's key, skipping ids for which predicate(id) is false.
+
+        Cost is a binary search plus the ids walked to fill the page.
+        """
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        key, reverse = (None, False) if cursor is None else self.decode_cursor(cursor)
+        ids = index._ids
+        found = []
+
+        if not reverse:
+            start = 0 if key is None else bisect_right(ids, key)
+            for position in range(start, len(ids)):
+                item_id = ids[position]
+                if predicate is None or predicate(item_id):
+                    found.append(item_id)
+                    if len(found) > limit:
+                        break
+            has_more = len(found) > limit
+            found = found[:limit]
+            next_key = found[-1] if has_more else None
+            previous_key = found[0] if key is not None and found else None
+            if key is not None and not found:
+                # Walked off the end: going back should return the last page
+                previous_key = key + 1
+        else:
+            end = bisect_left(ids, key)
+            for position in range(end - 1, -1, -1):
+                item_id = ids[position]
+                if predicate is None or predicate(item_id):
+                    found.append(item_id)
+                    if len(found) > limit:
+                        break
+            has_more = len(found) > limit
+            found = found[:limit][::-1]
+            previous_key = found[0] if has_more else None
+            next_key = found[-1] if found else key - 1
+
+        return Page(
+            ids=found,
+            next_cursor=None if next_key is None else self.encode_cursor(next_key),
+            previous_cursor=(None if previous_key is None
+                             else self.encode_cursor(previous_key, reverse=True))
+        )
@@ -7,6 +7,8 @@ Key Concepts:
 - Documents and collections
 - CRUD operations
 - Query operators
+- Indexes and query plans
+- Journaling and compaction for fast restarts
 - When to use MongoDB vs SQL
 
 Note: This tutorial simulates MongoDB concepts using Python dicts.
@@ -14,6 +16,11 @@ Note: This tutorial simulates MongoDB concepts using Python dicts.
 """
 
 import json
+import math
+import os
+import random
+import time
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
 from typing import Any
 
@@ -53,66 +60,374 @@ print("\n" + "=" * 60)
 print("MONGODB OPERATIONS (Simulated)")
 print("=" * 60)
 
+class HashIndex:
+    """Secondary index for equality and $in: value -> set of _ids"""
+    
+    def __init__(self, field: str):
+        self.field = field
+        self.name = f"{field}_hash"
+        self._ids = {}             # value -> set of _ids
+        self._unhashable = set()   # _ids whose value can't be a dict key
+    
+    def add(self, doc: dict) -> None:
+        if self.field not in doc:
+            return
+        try:
+            self._ids.setdefault(doc[self.field], set()).add(doc["_id"])
+        except TypeError:
+            self._unhashable.add(doc["_id"])
+    
+    def remove(self, doc: dict) -> None:
+        if self.field not in doc:
+            return
+        try:
+            ids = self._ids.get(doc[self.field])
+        except TypeError:
+            self._unhashable.discard(doc["_id"])
+            return
+        if ids is not None:
+            ids.discard(doc["_id"])
+            if not ids:
+                del self._ids[doc[self.field]]
+    
+    def estimate(self, condition) -> int | None:
+        """Number of candidate documents, None if the index can't help"""
+        values = self._lookup_values(condition)
+        if values is None:
+            return None
+        return sum(len(ids) for ids in self._matching_sets(values)) + len(self._unhashable)
+    
+    def lookup(self, condition) -> set:
+        ids = set(self._unhashable)
+        for matching in self._matching_sets(self._lookup_values(condition)):
+            ids |= matching
+        return ids
+    
+    @staticmethod
+    def _lookup_values(condition) -> list | None:
+        if not isinstance(condition, dict):
+            return [condition]
+        if "$eq" in condition:
+            return [condition["$eq"]]
+        if "$in" in condition:
+            return list(condition["$in"])
+        return None
+    
+    def _matching_sets(self, values: list) -> list:
+        sets = []
+        for value in values:
+            try:
+                ids = self._ids.get(value)
+            except TypeError:
+                continue  # Unhashable values are covered by _unhashable
+            if ids:
+                sets.append(ids)
+        return sets
+
+
+class SortedIndex:
+    """Secondary index for ranges: sorted list of (value, _id) pairs"""
+    
+    RANGE_OPS = ("$eq", "$gt", "$gte", "$lt", "$lte")
+    
+    def __init__(self, field: str):
+        self.field = field
+        self.name = f"{field}_sorted"
+        self._keys = []            # sorted (value, _id)
+        self._unsortable = set()   # _ids whose value doesn't compare
+    
+    def add(self, doc: dict) -> None:
+        if self.field not in doc:
+            return
+        try:
+            insort(self._keys, (doc[self.field], doc["_id"]))
+        except TypeError:
+            self._unsortable.add(doc["_id"])
+    
+    def build(self, docs) -> None:
+        """Bulk load in O(n log n) instead of n insertions"""
+        keys = [(doc[self.field], doc["_id"]) for doc in docs if self.field in doc]
+        try:
+            self._keys = sorted(keys)
+        except TypeError:
+            self._keys = []
+            for doc in docs:
+                self.add(doc)
+    
+    def remove(self, doc: dict) -> None:
+        if self.field not in doc:
+            return
+        key = (doc[self.field], doc["_id"])
+        try:
+            i = bisect_left(self._keys, key)
+        except TypeError:
+            self._unsortable.discard(doc["_id"])
+            return
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+    
+    def estimate(self, condition) -> int | None:
+        bounds = self._bounds(condition)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        return max(hi - lo, 0) + len(self._unsortable)
+    
+    def lookup(self, condition) -> set:
+        lo, hi = self._bounds(condition)
+        ids = {_id for _, _id in self._keys[lo:hi]}
+        return ids | self._unsortable
+    
+    def _bounds(self, condition) -> tuple[int, int] | None:
+        """Slice of self._keys that can satisfy condition"""
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if not any(op in condition for op in self.RANGE_OPS):
+            return None
+        keys = self._keys
+        lo, hi = 0, len(keys)
+        try:
+            for op, value in condition.items():
+                if op in ("$eq", "$gte"):
+                    lo = max(lo, bisect_left(keys, (value,)))
+                if op == "$gt":
+                    lo = max(lo, bisect_right(keys, (value, math.inf)))
+                if op in ("$eq", "$lte"):
+                    hi = min(hi, bisect_right(keys, (value, math.inf)))
+                if op == "$lt":
+                    hi = min(hi, bisect_left(keys, (value,)))
+        except TypeError:
+            return None
+        return lo, hi
+
+
 class SimpleCollection:
-    """Simulates MongoDB collection for learning"""
+    """Simulates MongoDB collection for learning
+    
+    Documents are stored in a dict keyed by _id (insertion ordered), so
+    deletes are O(1). Queries use the most selective secondary index (see
+    create_index) and fall back to a full collection scan.
     
-    def __init__(self, name: str):
+    With journal_path, every write is appended to a JSON-lines journal
+    that is replayed on startup and compacted once it holds mostly
+    superseded records.
+    """
+    
+    INDEX_TYPES = {"hash": HashIndex, "sorted": SortedIndex}
+    COMPACT_MIN_RECORDS = 1000  # Don't bother compacting tiny journals
+    
+    def __init__(self, name: str, journal_path: str | None = None):
         self.name = name
-        self.documents = []
+        self.documents = {}  # _id -> document
+        self._indexes = {}   # index name -> HashIndex | SortedIndex
         self._id_counter = 1
+        self.journal_path = journal_path
+        self._journal = None
+        self._journal_records = 0
+        if journal_path:
+            self._replay()
+            self._journal = open(journal_path, "a", encoding="utf-8")
     
     def insert_one(self, document: dict) -> dict:
         """Insert a single document"""
+        doc = self._insert(document)
+        self._log({"op": "put", "doc": doc})
+        return {"inserted_id": doc["_id"]}
+    
+    def insert_many(self, documents: list) -> dict:
+        """Insert multiple documents"""
+        docs = [self._insert(document) for document in documents]
+        self._log(*({"op": "put", "doc": doc} for doc in docs))
+        return {"inserted_ids": [doc["_id"] for doc in docs]}
+    
+    def _insert(self, document: dict) -> dict:
         doc = document.copy()
         doc["_id"] = self._id_counter
         self._id_counter += 1
         doc["created_at"] = datetime.now().isoformat()
-        self.documents.append(doc)
-        return {"inserted_id": doc["_id"]}
+        self.documents[doc["_id"]] = doc
+        self._index_doc(doc)
+        return doc
     
-    def insert_many(self, documents: list) -> dict:
-        """Insert multiple documents"""
-        ids = []
-        for doc in documents:
-            result = self.insert_one(doc)
-            ids.append(result["inserted_id"])
-        return {"inserted_ids": ids}
+    def create_index(self, field: str, kind: str = "hash") -> str:
+        """Index a field: 'hash' for equality/$in, 'sorted' for ranges"""
+        if kind not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {kind}")
+        index = self.INDEX_TYPES[kind](field)
+        if index.name not in self._indexes:
+            if isinstance(index, SortedIndex):
+                index.build(self.documents.values())
+            else:
+                for doc in self.documents.values():
+                    index.add(doc)
+            self._indexes[index.name] = index
+        return index.name
+    
+    def drop_index(self, name: str) -> None:
+        del self._indexes[name]
+    
+    def list_indexes(self) -> list:
+        return ["_id_", *self._indexes]
     
     def find_one(self, query: dict = None) -> dict | None:
         """Find first matching document"""
-        for doc in self.documents:
-            if self._matches(doc, query):
-                return doc
-        return None
+        return next(self._iter_matches(query), None)
     
     def find(self, query: dict = None) -> list:
         """Find all matching documents"""
         if query is None:
-            return self.documents.copy()
-        return [doc for doc in self.documents if self._matches(doc, query)]
+            return list(self.documents.values())
+        return list(self._iter_matches(query))
     
     def update_one(self, query: dict, update: dict) -> dict:
         """Update first matching document"""
-        for doc in self.documents:
-            if self._matches(doc, query):
-                if "$set" in update:
-                    for key, value in update["$set"].items():
-                        doc[key] = value
-                doc["updated_at"] = datetime.now().isoformat()
-                return {"modified_count": 1}
-        return {"modified_count": 0}
+        doc = self.find_one(query)
+        if doc is None:
+            return {"modified_count": 0}
+        self._unindex_doc(doc)
+        if "$set" in update:
+            for key, value in update["$set"].items():
+                doc[key] = value
+        doc["updated_at"] = datetime.now().isoformat()
+        self._index_doc(doc)
+        self._log({"op": "put", "doc": doc})
+        return {"modified_count": 1}
     
     def delete_one(self, query: dict) -> dict:
         """Delete first matching document"""
-        for i, doc in enumerate(self.documents):
-            if self._matches(doc, query):
-                self.documents.pop(i)
-                return {"deleted_count": 1}
-        return {"deleted_count": 0}
+        doc = self.find_one(query)
+        if doc is None:
+            return {"deleted_count": 0}
+        del self.documents[doc["_id"]]
+        self._unindex_doc(doc)
+        self._log({"op": "del", "_id": doc["_id"]})
+        return {"deleted_count": 1}
     
     def count_documents(self, query: dict = None) -> int:
         """Count matching documents"""
-        return len(self.find(query))
+        if query is None:
+            return len(self.documents)
+        return sum(1 for _ in self._iter_matches(query))
+    
+    def explain(self, query: dict = None) -> dict:
+        """Report the chosen plan and how many documents it examined"""
+        stage, index_name, candidates = self._plan(query)
+        examined = returned = 0
+        for doc in candidates:
+            examined += 1
+            if self._matches(doc, query):
+                returned += 1
+        return {
+            "stage": stage,
+            "index": index_name,
+            "docs_examined": examined,
+            "n_returned": returned
+        }
+    
+    def compact(self) -> None:
+        """Rewrite the journal as one record per live document
+        
+        The snapshot is written to a temp file and renamed over the
+        journal, so a crash mid-compaction leaves the old journal intact.
+        """
+        if not self.journal_path:
+            return
+        if self._journal is None:
+            raise ValueError(f"Collection {self.name!r} is closed")
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for doc in self.documents.values():
+                f.write(json.dumps({"op": "put", "doc": doc}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_records = len(self.documents)
+    
+    def close(self) -> None:
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+    
+    def _log(self, *records: dict) -> None:
+        """Append write records to the journal, compacting when it bloats"""
+        if self._journal is None:
+            return
+        lines = [json.dumps(record, default=str) for record in records]
+        if not lines:
+            return
+        self._journal.write("\n".join(lines) + "\n")
+        self._journal.flush()
+        self._journal_records += len(lines)
+        if (self._journal_records > self.COMPACT_MIN_RECORDS
+                and self._journal_records > 2 * len(self.documents)):
+            self.compact()
+    
+    def _replay(self) -> None:
+        """Rebuild documents from the journal, if one exists"""
+        if not os.path.exists(self.journal_path):
+            return
+        documents = self.documents
+        good_bytes = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash. Truncate it below, or
+                    # the next append would land on the same broken line.
+                    print("⚠️ Warning: Ignoring incomplete journal record")
+                    break
+                if record["op"] == "put":
+                    doc = record["doc"]
+                    documents[doc["_id"]] = doc
+                else:
+                    documents.pop(record["_id"], None)
+                good_bytes += len(line)
+                self._journal_records += 1
+        if good_bytes < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_bytes)
+        if documents:
+            self._id_counter = max(documents) + 1
+    
+    def _plan(self, query: dict | None) -> tuple[str, str | None, list]:
+        """Pick the access path: _id lookup, the most selective index, or a scan"""
+        if query and "_id" in query and not isinstance(query["_id"], dict):
+            doc = self.documents.get(query["_id"])
+            return "IDHACK", "_id_", [doc] if doc is not None else []
+        
+        best, best_estimate = None, None
+        if query:
+            for index in self._indexes.values():
+                if index.field not in query:
+                    continue
+                estimate = index.estimate(query[index.field])
+                if estimate is not None and (best is None or estimate < best_estimate):
+                    best, best_estimate = index, estimate
+        
+        if best is None:
+            return "COLLSCAN", None, self.documents.values()
+        # Sort ids to return documents in insertion order, like a scan would
+        ids = sorted(best.lookup(query[best.field]))
+        return "IXSCAN", best.name, [self.documents[_id] for _id in ids]
+    
+    def _iter_matches(self, query: dict | None):
+        _, _, candidates = self._plan(query)
+        for doc in candidates:
+            if self._matches(doc, query):
+                yield doc
+    
+    def _index_doc(self, doc: dict) -> None:
+        for index in self._indexes.values():
+            index.add(doc)
+    
+    def _unindex_doc(self, doc: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(doc)
     
     def _matches(self, doc: dict, query: dict | None) -> bool:
         """Check if document matches query"""
@@ -126,12 +441,16 @@ class SimpleCollection:
                 return False
             if isinstance(value, dict):  # Operators
                 for op, val in value.items():
+                    if op == "$eq" and doc[key] != val:
+                        return False
                     if op == "$gt" and not doc[key] > val:
                         return False
                     if op == "$lt" and not doc[key] < val:
                         return False
                     if op == "$gte" and not doc[key] >= val:
                         return False
+                    if op == "$lte" and not doc[key] <= val:
+                        return False
                     if op == "$in" and doc[key] not in val:
                         return False
             elif doc[key] != value:
@@ -245,6 +564,81 @@ print(f"Deleted {result['deleted_count']} document(s)")
 
 print(f"After delete: {users.count_documents()} documents")
 
+# ========== INDEXES AND QUERY PLANS ==========
+print("\n" + "=" * 60)
+print("INDEXES AND QUERY PLANS")
+print("=" * 60)
+
+orders = SimpleCollection("orders")
+statuses = ["pending", "shipped", "delivered", "cancelled"]
+orders.insert_many([
+    {
+        "customer": f"customer{i % 5000}",
+        "status": random.choice(statuses),
+        "amount": round(random.uniform(5, 500), 2)
+    }
+    for i in range(50_000)
+])
+print(f"\nCreated {orders.count_documents()} orders")
+
+query = {"customer": "customer42", "amount": {"$gte": 100, "$lt": 200}}
+
+def time_find(collection, query, runs=20) -> float:
+    start = time.time()
+    for _ in range(runs):
+        collection.find(query)
+    return (time.time() - start) / runs * 1000
+
+print(f"\nQuery: {query}")
+print(f"Without indexes: {orders.explain(query)}")
+print(f"   {time_find(orders, query):.2f}ms per find()")
+
+orders.create_index("customer")                 # hash: equality and $in
+orders.create_index("amount", kind="sorted")    # sorted: range queries
+print(f"\nIndexes: {orders.list_indexes()}")
+print(f"With indexes:    {orders.explain(query)}")
+print(f"   {time_find(orders, query):.2f}ms per find()")
+
+# The planner picks whichever index yields the fewest candidates
+narrow_range = {"customer": {"$in": ["customer1", "customer2"]},
+                "amount": {"$gt": 495}}
+print(f"\nNarrow range: {orders.explain(narrow_range)}")
+print(f"By _id:       {orders.explain({'_id': 123})}")
+
+# ========== PERSISTENCE ==========
+print("\n" + "=" * 60)
+print("JOURNALING AND FAST RESTARTS")
+print("=" * 60)
+
+journal_file = "events.journal"
+if os.path.exists(journal_file):
+    os.remove(journal_file)
+
+events = SimpleCollection("events", journal_path=journal_file)
+start = time.time()
+events.insert_many([{"type": "click", "n": i} for i in range(100_000)])
+print(f"\nInserted 100,000 journaled documents in {(time.time() - start)*1000:.0f}ms")
+
+start = time.time()
+for _id in range(1, 20_001):
+    events.delete_one({"_id": _id})
+print(f"Deleted 20,000 from the front in {(time.time() - start)*1000:.0f}ms (O(1) each)")
+events.update_one({"_id": 50_000}, {"$set": {"type": "purchase"}})
+events.close()
+
+start = time.time()
+events = SimpleCollection("events", journal_path=journal_file)
+elapsed = (time.time() - start) * 1000
+print(f"Reloaded {events.count_documents()} documents from the journal in {elapsed:.0f}ms")
+print(f"   _id 50000 type: {events.find_one({'_id': 50_000})['type']}")
+
+size_before = os.path.getsize(journal_file)
+events.compact()
+size_after = os.path.getsize(journal_file)
+print(f"Compaction: {size_before // 1024} KB -> {size_after // 1024} KB")
+events.close()
+os.remove(journal_file)
+
 # ========== MONGODB QUERY OPERATORS ==========
 print("\n" + "=" * 60)
 print("MONGODB QUERY OPERATORS (Reference)")
@@ -276,6 +670,11 @@ $all      - All elements      {"tags": {"$all": ["a", "b"]}}
 $elemMatch - Match element    {"results": {"$elemMatch": {...}}}
 $size     - Array size        {"tags": {"$size": 3}}
 
+INDEXES:
+users.create_index("email", unique=True)     # Equality lookups
+users.create_index([("age", 1)])              # Range queries and sorting
+users.find({"age": {"$gt": 25}}).explain()    # IXSCAN vs COLLSCAN
+
 REAL MONGODB EXAMPLE:
 from pymongo import MongoClient
 
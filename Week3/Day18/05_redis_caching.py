@@ -17,9 +17,15 @@ import time
 import json
 import sqlite3
 import os
+import random
+from collections import deque
 from datetime import datetime, timedelta
+from itertools import islice
 from typing import Any, Callable
 
+from mini_projects.key_index import KeyIndex
+from rate_limiting import SlidingWindowLimiter
+
 # ========== WHAT IS REDIS ==========
 print("=" * 60)
 print("REDIS CACHING BASICS")
@@ -58,16 +64,188 @@ print("\n" + "=" * 60)
 print("SIMULATED REDIS CLIENT")
 print("=" * 60)
 
+class SortedSet:
+    """Sorted set: a skip list ordered by (score, member) plus a score dict
+    
+    Like Redis' zset, each link stores its span (how many nodes it skips),
+    so add, remove, rank and locating a range start are all O(log n).
+    """
+    
+    MAX_LEVEL = 32
+    P = 0.25
+    
+    class _Node:
+        __slots__ = ("member", "score", "forward", "span", "backward")
+        
+        def __init__(self, member, score: float, level: int):
+            self.member = member
+            self.score = score
+            self.forward = [None] * level
+            self.span = [0] * level
+            self.backward = None
+    
+    def __init__(self):
+        self._scores = {}  # member -> score
+        self._head = self._Node(None, float("-inf"), self.MAX_LEVEL)
+        self._tail = None
+        self._level = 1
+    
+    def __len__(self) -> int:
+        return len(self._scores)
+    
+    def score(self, member) -> float | None:
+        return self._scores.get(member)
+    
+    def add(self, member, score: float) -> bool:
+        """Add or re-score a member, returns True if it is new"""
+        old = self._scores.get(member)
+        if old is not None:
+            if old == score:
+                return False
+            self._unlink(member, old)
+        self._insert(member, score)
+        self._scores[member] = score
+        return old is None
+    
+    def remove(self, member) -> bool:
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        self._unlink(member, score)
+        return True
+    
+    def rank(self, member, reverse: bool = False) -> int | None:
+        """0-based position of member in score order"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        target = (score, member)
+        rank = 0
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) <= target:
+                rank += x.span[i]
+                x = x.forward[i]
+            if x is not self._head and x.member == member:
+                break
+        rank -= 1
+        return len(self) - 1 - rank if reverse else rank
+    
+    def range(self, start: int, stop: int, reverse: bool = False) -> list:
+        """(member, score) pairs by position, stop inclusive, negatives allowed"""
+        length = len(self)
+        if start < 0:
+            start = max(start + length, 0)
+        if stop < 0:
+            stop += length
+        stop = min(stop, length - 1)
+        if start > stop:
+            return []
+        
+        if reverse:
+            x = self._node_at(length - start)
+        else:
+            x = self._node_at(start + 1)
+        result = []
+        for _ in range(stop - start + 1):
+            result.append((x.member, x.score))
+            x = x.backward if reverse else x.forward[0]
+        return result
+    
+    def _node_at(self, rank: int):
+        """Node at 1-based rank, following spans down the levels"""
+        traversed = 0
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] and traversed + x.span[i] <= rank:
+                traversed += x.span[i]
+                x = x.forward[i]
+            if traversed == rank:
+                return x
+        return None
+    
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+    
+    def _insert(self, member, score: float) -> None:
+        target = (score, member)
+        update = [None] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) < target:
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+        
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = len(self._scores)
+            self._level = level
+        
+        node = self._Node(member, score, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        
+        node.backward = None if update[0] is self._head else update[0]
+        if node.forward[0]:
+            node.forward[0].backward = node
+        else:
+            self._tail = node
+    
+    def _unlink(self, member, score: float) -> None:
+        target = (score, member)
+        update = [None] * self.MAX_LEVEL
+        x = self._head
+        for i in range(self._level - 1, -1, -1):
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) < target:
+                x = x.forward[i]
+            update[i] = x
+        
+        node = x.forward[0]
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+        if node.forward[0]:
+            node.forward[0].backward = node.backward
+        else:
+            self._tail = node.backward
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+
+
 class SimpleRedis:
-    """Simulates Redis for learning purposes"""
+    """Simulates Redis for learning purposes
+    
+    Besides plain values it supports sorted sets (skip list), lists
+    (deque) and hashes (dict) with the same complexity as real Redis.
+    """
     
     def __init__(self):
         self._data = {}
         self._expires = {}
+        self._index = KeyIndex()  # Lets KEYS visit only matching namespaces
         self.stats = {"hits": 0, "misses": 0}
     
     def set(self, key: str, value: Any, ex: int = None) -> bool:
         """Set a key-value pair with optional expiration (seconds)"""
+        if key not in self._data:
+            self._index.add(key)
         self._data[key] = value
         if ex:
             self._expires[key] = datetime.now() + timedelta(seconds=ex)
@@ -89,6 +267,7 @@ class SimpleRedis:
             del self._data[key]
             if key in self._expires:
                 del self._expires[key]
+            self._index.discard(key)
             return 1
         return 0
     
@@ -118,20 +297,199 @@ class SimpleRedis:
         """Increment value by 1"""
         if key not in self._data:
             self._data[key] = 0
+            self._index.add(key)
         self._data[key] += 1
         return self._data[key]
     
     def keys(self, pattern: str = "*") -> list:
-        """Get all keys (simplified, pattern not fully implemented)"""
-        self._cleanup_all_expired()
-        if pattern == "*":
-            return list(self._data.keys())
-        return [k for k in self._data.keys() if pattern.strip("*") in k]
+        """Get keys matching a glob pattern (*, ?, [...])"""
+        matched = []
+        for key in self._index.match(pattern):
+            self._cleanup_expired(key)
+            if key in self._data:
+                matched.append(key)
+        return matched
+    
+    # ----- Sorted sets -----
+    def zadd(self, key: str, mapping: dict) -> int:
+        """Add members with scores, returns number of new members"""
+        zset = self._typed(key, SortedSet, create=True)
+        return sum(zset.add(member, score) for member, score in mapping.items())
+    
+    def zincrby(self, key: str, amount: float, member: str) -> float:
+        zset = self._typed(key, SortedSet, create=True)
+        score = (zset.score(member) or 0) + amount
+        zset.add(member, score)
+        return score
+    
+    def zscore(self, key: str, member: str) -> float | None:
+        zset = self._typed(key, SortedSet)
+        return zset.score(member) if zset else None
+    
+    def zrank(self, key: str, member: str) -> int | None:
+        zset = self._typed(key, SortedSet)
+        return zset.rank(member) if zset else None
+    
+    def zrevrank(self, key: str, member: str) -> int | None:
+        zset = self._typed(key, SortedSet)
+        return zset.rank(member, reverse=True) if zset else None
+    
+    def zrange(self, key: str, start: int, stop: int, withscores: bool = False) -> list:
+        return self._zrange(key, start, stop, withscores, reverse=False)
+    
+    def zrevrange(self, key: str, start: int, stop: int, withscores: bool = False) -> list:
+        return self._zrange(key, start, stop, withscores, reverse=True)
+    
+    def zrem(self, key: str, *members: str) -> int:
+        zset = self._typed(key, SortedSet)
+        if not zset:
+            return 0
+        removed = sum(zset.remove(member) for member in members)
+        self._delete_if_empty(key, zset)
+        return removed
+    
+    def zcard(self, key: str) -> int:
+        zset = self._typed(key, SortedSet)
+        return len(zset) if zset else 0
+    
+    def _zrange(self, key, start, stop, withscores, reverse) -> list:
+        zset = self._typed(key, SortedSet)
+        if not zset:
+            return []
+        items = zset.range(start, stop, reverse=reverse)
+        return items if withscores else [member for member, _ in items]
+    
+    # ----- Lists -----
+    def lpush(self, key: str, *values) -> int:
+        items = self._typed(key, deque, create=True)
+        items.extendleft(values)
+        return len(items)
+    
+    def rpush(self, key: str, *values) -> int:
+        items = self._typed(key, deque, create=True)
+        items.extend(values)
+        return len(items)
+    
+    def lpop(self, key: str) -> Any | None:
+        return self._pop(key, left=True)
+    
+    def rpop(self, key: str) -> Any | None:
+        return self._pop(key, left=False)
+    
+    def lrange(self, key: str, start: int, stop: int) -> list:
+        """Items by position, stop inclusive, negatives allowed"""
+        items = self._typed(key, deque)
+        if not items:
+            return []
+        start, stop = self._list_bounds(len(items), start, stop)
+        if start > stop:
+            return []
+        if start > len(items) // 2:
+            # Walk from the right end, which is closer
+            tail = list(islice(reversed(items), len(items) - 1 - stop, len(items) - start))
+            return tail[::-1]
+        return list(islice(items, start, stop + 1))
+    
+    def ltrim(self, key: str, start: int, stop: int) -> bool:
+        """Keep only items in [start, stop], popping from both ends"""
+        items = self._typed(key, deque)
+        if not items:
+            return True
+        start, stop = self._list_bounds(len(items), start, stop)
+        if start > stop:
+            self.delete(key)
+            return True
+        for _ in range(len(items) - 1 - stop):
+            items.pop()
+        for _ in range(start):
+            items.popleft()
+        return True
+    
+    def llen(self, key: str) -> int:
+        items = self._typed(key, deque)
+        return len(items) if items else 0
+    
+    def _pop(self, key: str, left: bool) -> Any | None:
+        items = self._typed(key, deque)
+        if not items:
+            return None
+        value = items.popleft() if left else items.pop()
+        self._delete_if_empty(key, items)
+        return value
+    
+    @staticmethod
+    def _list_bounds(length: int, start: int, stop: int) -> tuple[int, int]:
+        if start < 0:
+            start = max(start + length, 0)
+        if stop < 0:
+            stop += length
+        return start, min(stop, length - 1)
+    
+    # ----- Hashes -----
+    def hset(self, key: str, field: str = None, value: Any = None,
+             mapping: dict = None) -> int:
+        """Set hash fields, returns number of new fields"""
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        hash_ = self._typed(key, dict, create=True)
+        added = sum(1 for f in fields if f not in hash_)
+        hash_.update(fields)
+        return added
+    
+    def hget(self, key: str, field: str) -> Any | None:
+        hash_ = self._typed(key, dict)
+        return hash_.get(field) if hash_ else None
+    
+    def hgetall(self, key: str) -> dict:
+        hash_ = self._typed(key, dict)
+        return dict(hash_) if hash_ else {}
+    
+    def hdel(self, key: str, *fields: str) -> int:
+        hash_ = self._typed(key, dict)
+        if not hash_:
+            return 0
+        removed = sum(hash_.pop(f, None) is not None for f in fields)
+        self._delete_if_empty(key, hash_)
+        return removed
+    
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        hash_ = self._typed(key, dict, create=True)
+        hash_[field] = hash_.get(field, 0) + amount
+        return hash_[field]
+    
+    def hexists(self, key: str, field: str) -> bool:
+        hash_ = self._typed(key, dict)
+        return bool(hash_) and field in hash_
+    
+    def hlen(self, key: str) -> int:
+        hash_ = self._typed(key, dict)
+        return len(hash_) if hash_ else 0
+    
+    def _typed(self, key: str, kind: type, create: bool = False):
+        """Get the container stored at key, checking its type"""
+        self._cleanup_expired(key)
+        value = self._data.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = kind()
+            self._data[key] = value
+            self._index.add(key)
+        elif not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+    
+    def _delete_if_empty(self, key: str, container) -> None:
+        """Redis removes a collection key once it has no elements"""
+        if not container:
+            self.delete(key)
     
     def flushall(self) -> bool:
         """Clear all data"""
         self._data.clear()
         self._expires.clear()
+        self._index.clear()
         self.stats = {"hits": 0, "misses": 0}
         return True
     
@@ -139,15 +497,14 @@ class SimpleRedis:
         """Remove key if expired"""
         if key in self._expires:
             if datetime.now() > self._expires[key]:
-                del self._data[key]
-                del self._expires[key]
+                self.delete(key)
     
     def _cleanup_all_expired(self):
         """Remove all expired keys"""
-        expired = [k for k, v in self._expires.items() if datetime.now() > v]
+        now = datetime.now()
+        expired = [k for k, v in self._expires.items() if now > v]
         for key in expired:
-            del self._data[key]
-            del self._expires[key]
+            self.delete(key)
 
 # Create Redis client
 redis = SimpleRedis()
@@ -185,6 +542,14 @@ for _ in range(5):
     count = redis.incr("page:home:views")
 print(f"   After 5 increments: {count}")
 
+# KEYS with glob patterns
+print("\n5. KEYS (glob patterns):")
+redis.set("user:2:name", "Bob")
+redis.set("user:10:name", "Carol")
+print(f"   KEYS user:*:name = {sorted(redis.keys('user:*:name'))}")
+print(f"   KEYS user:?:*   = {sorted(redis.keys('user:?:*'))}")
+print(f"   KEYS page:*     = {redis.keys('page:*')}")
+
 # ========== CACHE-ASIDE PATTERN ==========
 print("\n" + "=" * 60)
 print("CACHE-ASIDE PATTERN")
@@ -392,13 +757,18 @@ print("""
 
 3. RATE LIMITING
    def check_rate_limit(user_id, limit=100):
-       key = f"ratelimit:{user_id}:{current_minute}"
-       count = redis.incr(key)
+       # Sliding log: one sorted-set member per request, scored by time
+       key = f"ratelimit:{user_id}"
+       now = time.time()
+       redis.zremrangebyscore(key, 0, now - 60)
+       if redis.zcard(key) >= limit:
+           return False
+       redis.zadd(key, {str(now): now})
        redis.expire(key, 60)
-       return count <= limit
+       return True
 
 4. LEADERBOARD
-   # Using sorted sets (not in our simple implementation)
+   # Using sorted sets
    redis.zadd("leaderboard", {user_id: score})
    top_10 = redis.zrevrange("leaderboard", 0, 9)
 
@@ -411,19 +781,55 @@ print("""
 # Rate limiting example
 print("\n📊 Rate Limiting Example:")
 
-def check_rate_limit(user_id: str, limit: int = 5) -> tuple[bool, int]:
-    """Simple rate limiter - max requests per minute"""
-    key = f"ratelimit:{user_id}"
-    count = redis.incr(key)
-    if count == 1:
-        redis.expire(key, 60)  # Reset after 1 minute
-    return count <= limit, count
+rate_limiter = SlidingWindowLimiter(limit=5, period=60)
+
+def check_rate_limit(user_id: str) -> bool:
+    """Max 5 requests per rolling minute (sliding window counter)"""
+    return rate_limiter.allow(f"ratelimit:{user_id}")
 
 user = "user123"
 for i in range(7):
-    allowed, count = check_rate_limit(user, limit=5)
-    status = "✅ Allowed" if allowed else "❌ Rate limited"
-    print(f"   Request {i+1}: {status} (count: {count}/5)")
+    status = "✅ Allowed" if check_rate_limit(user) else "❌ Rate limited"
+    print(f"   Request {i+1}: {status}")
+
+print("""
+   A plain INCR + EXPIRE counter would let 2x the limit through around
+   the window boundary. See 06_rate_limiting.py for why, and
+   rate_limiting.py for the limiters.""")
+
+# Leaderboard example
+print("\n📊 Leaderboard Example (sorted set):")
+
+redis.zadd("leaderboard", {"alice": 100, "bob": 85, "charlie": 92, "dave": 78})
+redis.zincrby("leaderboard", 20, "bob")
+print(f"   Top 3: {redis.zrevrange('leaderboard', 0, 2, withscores=True)}")
+print(f"   bob's rank: #{redis.zrevrank('leaderboard', 'bob') + 1}")
+
+# Ranks come from the skip list's spans, no re-sorting on each read
+for i in range(100_000):
+    redis.zadd("big_board", {f"player{i}": random.randint(0, 1_000_000)})
+start = time.time()
+for _ in range(1000):
+    redis.zrevrange("big_board", 0, 9)
+    redis.zrevrank("big_board", "player50000")
+elapsed = (time.time() - start) * 1000
+print(f"   100k players: 1000 x (top 10 + rank lookup) in {elapsed:.1f}ms")
+redis.delete("big_board")
+
+# Recent items example
+print("\n📊 Recent Items Example (list):")
+for item_id in range(1, 16):
+    redis.lpush("recent:user123", f"item:{item_id}")
+    redis.ltrim("recent:user123", 0, 9)  # Keep last 10
+print(f"   Last 3 viewed: {redis.lrange('recent:user123', 0, 2)}")
+print(f"   Length after trimming: {redis.llen('recent:user123')}")
+
+# Hash example
+print("\n📊 User Profile Example (hash):")
+redis.hset("user:42", mapping={"name": "Alice", "email": "alice@example.com"})
+redis.hincrby("user:42", "logins")
+redis.hincrby("user:42", "logins")
+print(f"   HGETALL user:42 = {redis.hgetall('user:42')}")
 
 # ========== REAL REDIS CONNECTION ==========
 print("\n" + "=" * 60)
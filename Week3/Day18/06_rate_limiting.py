@@ -0,0 +1,183 @@
+"""
+Day 18 - Rate Limiting
+======================
+Learn: Rate limiting algorithms beyond the fixed-window counter
+
+Key Concepts:
+- Why fixed windows allow 2x bursts at the boundary
+- Sliding log, sliding window counter and token bucket
+- Compact per-key state with __slots__
+- Plugging a limiter into FastAPI and DRF as middleware
+"""
+
+from rate_limiting import (
+    SlidingLogLimiter,
+    SlidingWindowLimiter,
+    TokenBucketLimiter,
+    benchmark,
+)
+
+# ========== WHY NOT FIXED WINDOWS ==========
+print("=" * 60)
+print("RATE LIMITING ALGORITHMS")
+print("=" * 60)
+
+print("""
+The classic Redis rate limiter is a FIXED WINDOW counter: INCR a key,
+EXPIRE it after 60 seconds.
+
+Problem - bursts at the window boundary (limit = 100/minute):
+
+   window 1                 window 2
+   |----------------------|----------------------|
+                   100 req ^ 100 req
+                  (0:59)   (1:00)
+
+   200 requests pass within 2 seconds!
+
+Better algorithms:
+┌──────────────────────┬──────────────────┬──────────────────────────┐
+│ Algorithm            │ Memory per key   │ Behaviour                │
+├──────────────────────┼──────────────────┼──────────────────────────┤
+│ Sliding log          │ O(limit)         │ Exact, no bursts         │
+│ Sliding window count │ O(1) - 3 numbers │ Weighted estimate        │
+│ Token bucket         │ O(1) - 2 numbers │ Smooth rate + burst size │
+└──────────────────────┴──────────────────┴──────────────────────────┘
+""")
+
+# ========== LIMITERS ==========
+print("\n" + "=" * 60)
+print("RATE LIMITER IMPLEMENTATIONS")
+print("=" * 60)
+
+print("""
+The limiters live in rate_limiting.py so apps can import them:
+
+   RateLimiter            allow(), allow_many(), purge_idle()
+   ├── SlidingLogLimiter     deque of timestamps per key
+   ├── SlidingWindowLimiter  (window, current, previous) per key
+   └── TokenBucketLimiter    (tokens, updated) per key
+
+Per-key state uses __slots__ classes: no per-instance __dict__.
+""")
+print("✅ SlidingLogLimiter, SlidingWindowLimiter, TokenBucketLimiter ready")
+
+# ========== BOUNDARY BURST DEMO ==========
+print("\n" + "=" * 60)
+print("BOUNDARY BURST COMPARISON")
+print("=" * 60)
+
+
+def fixed_window_allow(counters: dict, key: str, limit: int, now: float) -> bool:
+    """Fixed-window counter, like INCR + EXPIRE in Redis"""
+    window_key = (key, int(now // 60))
+    counters[window_key] = counters.get(window_key, 0) + 1
+    return counters[window_key] <= limit
+
+
+# 100 requests at 0:59 and 100 more at 1:00, limit 100 per minute
+burst = [59.0] * 100 + [60.0] * 100
+fixed_counters = {}
+limiters = {
+    "Fixed window": None,
+    "Sliding log": SlidingLogLimiter(100, 60),
+    "Sliding window": SlidingWindowLimiter(100, 60),
+    "Token bucket": TokenBucketLimiter(100, 60),
+}
+
+print("\n📊 200 requests in 1 second across a window boundary (limit 100/min):")
+for name, limiter in limiters.items():
+    if limiter is None:
+        allowed = sum(fixed_window_allow(fixed_counters, "user", 100, t) for t in burst)
+    else:
+        allowed = sum(limiter.allow("user", now=t) for t in burst)
+    print(f"   {name:15} allowed {allowed}")
+
+# ========== BATCHED CHECKS ==========
+print("\n" + "=" * 60)
+print("BATCHED CHECKS")
+print("=" * 60)
+
+limiter = TokenBucketLimiter(limit=3, period=1)
+batch = ["alice", "bob", "alice", "alice", "alice", "bob"]
+results = limiter.allow_many(batch, now=0.0)
+for key, allowed in zip(batch, results):
+    print(f"   {key:6} {'✅ Allowed' if allowed else '❌ Rate limited'}")
+print(f"   Tracked keys: {len(limiter)}, idle after 5s: {limiter.purge_idle(now=5.0)}")
+
+# ========== BENCHMARK ==========
+print("\n" + "=" * 60)
+print("BENCHMARK (single core)")
+print("=" * 60)
+
+benchmark()
+
+# ========== FASTAPI MIDDLEWARE ==========
+print("\n" + "=" * 60)
+print("FASTAPI MIDDLEWARE")
+print("=" * 60)
+
+fastapi_code = '''
+# main.py - with rate_limiting.py next to it
+from fastapi import FastAPI
+from rate_limiting import RateLimitMiddleware, TokenBucketLimiter
+
+app = FastAPI()
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=TokenBucketLimiter(limit=100, period=60),
+)
+
+# RateLimitMiddleware is plain ASGI: it answers 429 itself (with a
+# Retry-After header) and never builds a Request object for allowed
+# calls. Key by something other than the client IP with key_func:
+#   app.add_middleware(RateLimitMiddleware, limiter=...,
+#                      key_func=lambda scope: dict(scope["headers"]).get(b"x-api-key", b"").decode())
+# Used by Week3/Day17/mini_projects/02_user_api.py and 03_bookstore_api.py
+'''
+
+print(fastapi_code)
+
+# ========== DRF MIDDLEWARE ==========
+print("\n" + "=" * 60)
+print("DJANGO REST FRAMEWORK")
+print("=" * 60)
+
+drf_code = '''
+# api/middleware.py - with rate_limiting.py on the Python path
+from rate_limiting import DjangoRateLimitMiddleware, SlidingWindowLimiter
+
+
+class RateLimitMiddleware(DjangoRateLimitMiddleware):
+    # Keys by user:<pk> when authenticated, else ip:<REMOTE_ADDR>
+    limiter = SlidingWindowLimiter(limit=100, period=60)
+    path_prefix = "/api/"
+
+
+# settings.py - after AuthenticationMiddleware so request.user is set
+MIDDLEWARE = [
+    ...
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.RateLimitMiddleware',
+]
+
+
+# Or per view, as a DRF throttle class
+from rest_framework.throttling import BaseThrottle
+
+class SlidingWindowThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return RateLimitMiddleware.limiter.allow(self.get_ident(request))
+'''
+
+print(drf_code)
+
+print("""
+NOTE: These limiters keep state in process memory, so each worker
+process has its own counters. With several workers or servers, keep
+the state in Redis (e.g. sorted sets for a sliding log).
+""")
+
+print("\n" + "=" * 60)
+print("✅ Rate Limiting - Complete!")
+print("=" * 60)
@@ -0,0 +1,391 @@
+"""
+Day 18 - Query Profiler
+=======================
+Learn: Finding slow queries automatically instead of guessing
+
+Key Concepts:
+- Wrapping a connection to record every statement
+- Normalizing SQL so repeated queries group together
+- Detecting full table SCANs with EXPLAIN QUERY PLAN
+- Detecting N+1 query patterns
+- Suggesting CREATE INDEX statements
+
+This turns the manual time_query() / EXPLAIN demos from
+03_query_optimization.py into a reusable tool.
+"""
+
+import sqlite3
+import os
+import re
+import time
+import random
+
+# ========== INTRODUCTION ==========
+print("=" * 60)
+print("SQLITE QUERY PROFILER")
+print("=" * 60)
+
+print("""
+In 03_query_optimization.py we timed queries and ran EXPLAIN by hand.
+In a real service you don't know WHICH queries to look at. A profiler:
+
+1. Records every statement: calls, total/max time, rows returned
+2. Groups statements by their normalized SQL (literals -> ?)
+3. Runs EXPLAIN QUERY PLAN once per statement and flags SCANs
+4. Spots N+1 patterns: the same query repeated many times in a row
+5. Suggests indexes for the columns in WHERE clauses of scanned tables
+""")
+
+# ========== PROFILER ==========
+print("\n" + "=" * 60)
+print("PROFILER IMPLEMENTATION")
+print("=" * 60)
+
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_KEYWORDS = ("WHERE|JOIN|ON|LEFT|RIGHT|INNER|OUTER|CROSS|NATURAL|ORDER|GROUP"
+                "|LIMIT|HAVING|UNION|USING|SET|VALUES")
+TABLE_REF = re.compile(
+    rf"\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:{SQL_KEYWORDS})\b)(\w+))?",
+    re.IGNORECASE
+)
+WHERE_CLAUSE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)",
+                          re.IGNORECASE | re.DOTALL)
+CONDITION = re.compile(r"(?:(\w+)\.)?(\w+)\s*(==|=|<=|>=|<|>|\bIN\b|\bBETWEEN\b)",
+                       re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals with ? and collapse whitespace"""
+    return " ".join(LITERAL.sub("?", sql).split())
+
+
+class QueryStats:
+    """Aggregated timings for one normalized statement"""
+
+    __slots__ = ("sql", "calls", "total_ms", "max_ms", "rows", "plan",
+                 "full_scans", "suggestions")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.plan = []          # EXPLAIN QUERY PLAN detail lines
+        self.full_scans = []    # tables read with a full SCAN
+        self.suggestions = []   # CREATE INDEX statements
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class ProfiledCursor:
+    """sqlite3 cursor wrapper that charges execute and fetch time to a statement"""
+
+    def __init__(self, profiler: "QueryProfiler", cursor: sqlite3.Cursor):
+        self._profiler = profiler
+        self._cursor = cursor
+        self._stats = None
+        self._call_ms = 0.0
+
+    def execute(self, sql: str, params=()) -> "ProfiledCursor":
+        self._stats = self._profiler._begin(sql, params)
+        self._call_ms = 0.0
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._charge(start, 0)
+        return self
+
+    def executemany(self, sql: str, seq_of_params) -> "ProfiledCursor":
+        self._stats = self._profiler._begin(sql, None)
+        self._call_ms = 0.0
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        self._charge(start, 0)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._charge(start, row is not None)
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list:
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size or self._cursor.arraysize)
+        self._charge(start, len(rows))
+        return rows
+
+    def fetchall(self) -> list:
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._charge(start, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(100)
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description, close, ...
+        return getattr(self._cursor, name)
+
+    def _charge(self, start: float, rows: int) -> None:
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = self._stats
+        stats.total_ms += elapsed
+        stats.rows += rows
+        self._call_ms += elapsed
+        if self._call_ms > stats.max_ms:
+            stats.max_ms = self._call_ms
+
+
+class QueryProfiler:
+    """Wrap a sqlite3 connection and record every statement run through it
+
+    Use profiler.execute(...) / profiler.cursor() wherever the code used
+    conn.execute(...) / conn.cursor().
+    """
+
+    EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+    def __init__(self, conn: sqlite3.Connection, n_plus_1_threshold: int = 10):
+        self.conn = conn
+        self.n_plus_1_threshold = n_plus_1_threshold
+        self._stats = {}        # normalized sql -> QueryStats
+        self._n_plus_1 = {}     # normalized sql -> (parent sql, longest run)
+        self._previous = None   # normalized sql of the statement before the run
+        self._current = None
+        self._run = 0
+
+    def cursor(self) -> ProfiledCursor:
+        return ProfiledCursor(self, self.conn.cursor())
+
+    def execute(self, sql: str, params=()) -> ProfiledCursor:
+        return self.cursor().execute(sql, params)
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self._n_plus_1.clear()
+        self._previous = self._current = None
+        self._run = 0
+
+    def _begin(self, sql: str, params) -> QueryStats:
+        key = normalize_sql(sql)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = QueryStats(key)
+            if params is not None and key.upper().startswith(self.EXPLAINABLE):
+                self._explain(stats, sql, params)
+        stats.calls += 1
+        self._track_runs(key)
+        return stats
+
+    def _track_runs(self, key: str) -> None:
+        """Count back-to-back repeats of a statement (the N in N+1)"""
+        if key == self._current:
+            self._run += 1
+        else:
+            self._previous, self._current, self._run = self._current, key, 1
+        if self._run >= self.n_plus_1_threshold:
+            parent, longest = self._n_plus_1.get(key, (self._previous, 0))
+            self._n_plus_1[key] = (parent, max(longest, self._run))
+
+    def _explain(self, stats: QueryStats, sql: str, params) -> None:
+        try:
+            rows = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error:
+            return
+        aliases = {}
+        for table, alias in TABLE_REF.findall(sql):
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+        stats.plan = [row[-1] for row in rows]
+        for detail in stats.plan:
+            match = FULL_SCAN.match(detail)
+            if match:
+                table, alias = match.groups()
+                if not alias:
+                    table = aliases.get(table, table)
+                stats.full_scans.append(table)
+                suggestion = self._suggest_index(sql, table, aliases)
+                if suggestion:
+                    stats.suggestions.append(suggestion)
+
+    def _suggest_index(self, sql: str, table: str, aliases: dict) -> str | None:
+        """Index the WHERE columns of a scanned table: equality first, then ranges"""
+        where = WHERE_CLAUSE.search(sql)
+        if not where:
+            return None
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        equality, ranges = [], []
+        for qualifier, column, op in CONDITION.findall(where.group(1)):
+            if qualifier and aliases.get(qualifier) != table:
+                continue
+            if column not in columns:
+                continue
+            target = equality if op.upper() in ("=", "==", "IN") else ranges
+            if column not in equality and column not in ranges:
+                target.append(column)
+        index_columns = equality + ranges[:1]  # Only one range column is usable
+        if not index_columns:
+            return None
+        name = f"idx_{table}_{'_'.join(index_columns)}"
+        return f"CREATE INDEX {name} ON {table}({', '.join(index_columns)})"
+
+    def report(self, top: int = 10) -> list:
+        """Statements ranked by total time, with detected problems"""
+        ranked = sorted(self._stats.values(), key=lambda s: s.total_ms, reverse=True)
+        results = []
+        for stats in ranked[:top]:
+            problems = [f"FULL SCAN {table}" for table in stats.full_scans]
+            if stats.sql in self._n_plus_1:
+                problems.append(f"N+1 (x{self._n_plus_1[stats.sql][1]} in a row)")
+            if any("TEMP B-TREE" in detail for detail in stats.plan):
+                problems.append("SORT WITHOUT INDEX")
+            results.append({
+                "sql": stats.sql,
+                "calls": stats.calls,
+                "total_ms": round(stats.total_ms, 3),
+                "avg_ms": round(stats.avg_ms, 4),
+                "max_ms": round(stats.max_ms, 4),
+                "rows": stats.rows,
+                "problems": problems
+            })
+        return results
+
+    def n_plus_1(self) -> list:
+        """Repeated statements and the query each loop followed"""
+        return [
+            {"sql": sql, "repeats": run, "after": parent}
+            for sql, (parent, run) in self._n_plus_1.items()
+        ]
+
+    def suggest_indexes(self) -> list:
+        """CREATE INDEX statements, most expensive scans first"""
+        suggestions = []
+        for stats in sorted(self._stats.values(), key=lambda s: s.total_ms, reverse=True):
+            for statement in stats.suggestions:
+                if statement not in suggestions:
+                    suggestions.append(statement)
+        return suggestions
+
+    def print_report(self, top: int = 10) -> None:
+        for rank, entry in enumerate(self.report(top), 1):
+            sql = entry["sql"] if len(entry["sql"]) <= 70 else entry["sql"][:67] + "..."
+            print(f"\n   #{rank} {sql}")
+            print(f"      calls={entry['calls']} total={entry['total_ms']:.2f}ms "
+                  f"avg={entry['avg_ms']:.3f}ms max={entry['max_ms']:.3f}ms "
+                  f"rows={entry['rows']}")
+            for problem in entry["problems"]:
+                print(f"      ⚠️  {problem}")
+
+
+print("✅ QueryProfiler ready")
+
+# ========== SAMPLE DATABASE ==========
+print("\n" + "=" * 60)
+print("SAMPLE WORKLOAD")
+print("=" * 60)
+
+db_file = "profiler_demo.db"
+conn = sqlite3.connect(db_file)
+conn.executescript("""
+DROP TABLE IF EXISTS orders;
+DROP TABLE IF EXISTS customers;
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    city TEXT
+);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total REAL NOT NULL
+);
+""")
+cities = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
+conn.executemany(
+    "INSERT INTO customers (name, email, city) VALUES (?, ?, ?)",
+    [(f"Customer_{i}", f"customer{i}@example.com", random.choice(cities))
+     for i in range(5000)]
+)
+conn.executemany(
+    "INSERT INTO orders (customer_id, status, total) VALUES (?, ?, ?)",
+    [(random.randint(1, 5000), random.choice(["new", "paid", "shipped"]),
+      round(random.uniform(5, 500), 2)) for _ in range(50_000)]
+)
+conn.commit()
+print("✅ Created 5000 customers and 50,000 orders (no secondary indexes)")
+
+
+def run_workload(db: QueryProfiler) -> None:
+    """A typical request mix for an order dashboard"""
+    for city in cities:
+        db.execute("SELECT id, name FROM customers WHERE city = ?", (city,)).fetchall()
+    for customer_id in range(1, 51):
+        db.execute(
+            "SELECT * FROM orders WHERE customer_id = ? AND total > ? ORDER BY total",
+            (customer_id, 100)
+        ).fetchall()
+    # N+1: one query for the orders, then one per order for its customer
+    cursor = db.execute("SELECT id, customer_id FROM orders WHERE status = 'new' LIMIT 100")
+    for order_id, customer_id in cursor.fetchall():
+        db.execute("SELECT name FROM customers WHERE id = ?", (customer_id,)).fetchone()
+
+
+profiler = QueryProfiler(conn)
+run_workload(profiler)
+
+print("\n📊 Ranked report (before):")
+profiler.print_report()
+
+print("\n🔁 N+1 patterns:")
+for pattern in profiler.n_plus_1():
+    print(f"   {pattern['repeats']}x {pattern['sql']}")
+    print(f"      after: {pattern['after']}")
+    print(f"      fix: fetch them in one JOIN or WHERE id IN (...) query")
+
+print("\n💡 Suggested indexes:")
+suggestions = profiler.suggest_indexes()
+for statement in suggestions:
+    print(f"   {statement};")
+
+# ========== APPLY SUGGESTIONS ==========
+print("\n" + "=" * 60)
+print("AFTER APPLYING SUGGESTIONS")
+print("=" * 60)
+
+for statement in suggestions:
+    conn.execute(statement)
+conn.commit()
+
+profiler = QueryProfiler(conn)
+run_workload(profiler)
+print("\n📊 Ranked report (after):")
+profiler.print_report()
+
+# ========== CLEANUP ==========
+print("\n" + "=" * 60)
+print("CLEANUP")
+print("=" * 60)
+
+conn.close()
+if os.path.exists(db_file):
+    os.remove(db_file)
+print("✅ Database closed and removed")
+
+print("\n" + "=" * 60)
+print("✅ Query Profiler - Complete!")
+print("=" * 60)
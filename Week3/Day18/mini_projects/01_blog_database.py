@@ -8,12 +8,15 @@ Features:
 2. One-to-many and many-to-many relationships
 3. Complex queries with JOINs
 4. Full CRUD operations
+5. Full-text search with FTS5 (BM25 ranking, prefixes, snippets)
 
 Run this to see a complete blog database implementation!
 """
 
 import sqlite3
 import os
+import re
+import time
 from datetime import datetime, timedelta
 import random
 
@@ -31,7 +34,7 @@ cursor = conn.cursor()
 print("\n📝 Creating database schema...")
 
 # Drop existing tables
-for table in ["post_tags", "comments", "posts", "tags", "users"]:
+for table in ["posts_fts", "post_tags", "comments", "posts", "tags", "users"]:
     cursor.execute(f"DROP TABLE IF EXISTS {table}")
 
 # Users table
@@ -92,6 +95,36 @@ CREATE TABLE post_tags (
 )
 """)
 
+# Full-text index over posts (external content: text stays in posts)
+cursor.execute("""
+CREATE VIRTUAL TABLE posts_fts USING fts5(
+    title, content,
+    content='posts', content_rowid='id',
+    tokenize='porter unicode61',
+    prefix='2 3'
+)
+""")
+
+# Triggers keep the index in sync with every insert, update and delete
+cursor.executescript("""
+CREATE TRIGGER posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts(rowid, title, content)
+    VALUES (new.id, new.title, new.content);
+END;
+
+CREATE TRIGGER posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+END;
+
+CREATE TRIGGER posts_au AFTER UPDATE OF title, content ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, title, content)
+    VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO posts_fts(rowid, title, content)
+    VALUES (new.id, new.title, new.content);
+END;
+""")
+
 conn.commit()
 print("✅ Schema created successfully!")
 
@@ -234,18 +267,62 @@ class BlogDB:
         """, (limit,))
         return self.cursor.fetchall()
     
-    def search_posts(self, query):
-        """Search posts by title or content"""
-        search = f"%{query}%"
+    def search_posts(self, query, mode="like", prefix=False, limit=None):
+        """Search published posts by title or content
+        
+        mode="like" (default) is a LIKE '%query%' substring scan, by views.
+        mode="fts" uses the FTS5 index instead: all terms must match, rows
+        are ranked by BM25 (title matches weigh more) and end with a
+        highlighted content snippet. prefix=True also matches words
+        starting with the last term (fts only).
+        """
+        limit = -1 if limit is None else limit  # LIMIT -1 means no limit
+        if mode == "like":
+            search = f"%{query}%"
+            self.cursor.execute("""
+                SELECT p.id, p.title, p.views, u.username
+                FROM posts p
+                JOIN users u ON p.author_id = u.id
+                WHERE p.status = 'published' 
+                  AND (p.title LIKE ? OR p.content LIKE ?)
+                ORDER BY p.views DESC
+                LIMIT ?
+            """, (search, search, limit))
+            return self.cursor.fetchall()
+        
+        match = self._fts_query(query, prefix)
+        if not match:
+            return []
         self.cursor.execute("""
-            SELECT p.id, p.title, p.views, u.username
-            FROM posts p
+            SELECT p.id, p.title, p.views, u.username,
+                   snippet(posts_fts, 1, '[', ']', '...', 12) as snippet
+            FROM posts_fts
+            JOIN posts p ON p.id = posts_fts.rowid
             JOIN users u ON p.author_id = u.id
-            WHERE p.status = 'published' 
-              AND (p.title LIKE ? OR p.content LIKE ?)
-            ORDER BY p.views DESC
-        """, (search, search))
+            WHERE posts_fts MATCH ?
+              AND p.status = 'published'
+            ORDER BY bm25(posts_fts, 10.0, 1.0)
+            LIMIT ?
+        """, (match, limit))
         return self.cursor.fetchall()
+    
+    @staticmethod
+    def _fts_query(query, prefix=False):
+        """Turn user input into a safe FTS5 query: quoted terms, ANDed
+        
+        'pyth*' keeps its prefix star; other FTS5 syntax is ignored.
+        """
+        terms = re.findall(r"\w+\*?", query)
+        parts = []
+        for i, term in enumerate(terms):
+            is_prefix = term.endswith("*") or (prefix and i == len(terms) - 1)
+            parts.append(f'"{term.rstrip("*")}"' + ("*" if is_prefix else ""))
+        return " ".join(parts)
+    
+    def rebuild_search_index(self):
+        """Re-index every post (e.g. after bulk loads with triggers off)"""
+        self.cursor.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+        self.conn.commit()
 
 # ========== DEMO ==========
 blog = BlogDB(conn)
@@ -343,11 +420,57 @@ for tag, count in blog.get_popular_tags(5):
     print(f"  #{tag}: {count} posts")
 
 # Search
-print("\n🔍 Search 'python':")
+print("\n🔍 Search 'python' (LIKE, by views):")
 print("-" * 60)
 for post in blog.search_posts("python"):
     print(f"  [{post[2]} views] {post[1]} by {post[3]}")
 
+print("\n🔍 Search 'python' (FTS5, by BM25 relevance):")
+print("-" * 60)
+for post in blog.search_posts("python", mode="fts"):
+    print(f"  {post[1]} by {post[3]}")
+    print(f"    {post[4]}")
+
+print("\n🔍 Prefix search 'ques' (search-as-you-type):")
+print("-" * 60)
+for post in blog.search_posts("ques", mode="fts", prefix=True):
+    print(f"  {post[1]}: {post[4]}")
+
+# Updates are re-indexed by the triggers
+cursor.execute("UPDATE posts SET content = ? WHERE id = ?",
+               ("Machine learning with Python and numpy...", post_ids[3]))
+conn.commit()
+print(f"\n🔍 'numpy' after editing a post: "
+      f"{[post[1] for post in blog.search_posts('numpy', mode='fts')]}")
+
+# ========== SEARCH PERFORMANCE ==========
+print("\n" + "=" * 60)
+print("SEARCH PERFORMANCE")
+print("=" * 60)
+
+topics = ("python sql database api rest web data model query index cache "
+          "server client async test deploy docker cloud security token").split()
+words = topics + [f"word{i}" for i in range(5000)]
+bulk_posts = [
+    (f"Post about {random.choice(topics)} {i}",
+     " ".join(random.choices(words, k=60)),
+     random.choice(user_ids), "published")
+    for i in range(20_000)
+]
+cursor.executemany(
+    "INSERT INTO posts (title, content, author_id, status) VALUES (?, ?, ?, ?)",
+    bulk_posts
+)
+conn.commit()
+print(f"\nAdded {len(bulk_posts):,} posts (indexed by the insert trigger)")
+
+for mode in ("like", "fts"):
+    start = time.time()
+    for _ in range(20):
+        results = blog.search_posts("docker security", mode=mode, limit=20)
+    elapsed = (time.time() - start) / 20 * 1000
+    print(f"  {mode.upper():5} 'docker security': {elapsed:.2f}ms per search")
+
 # ========== CLEANUP ==========
 print("\n" + "=" * 60)
 conn.close()
@@ -5,9 +5,11 @@ A caching layer for database operations
 
 Features:
 1. Cache-aside pattern implementation
-2. TTL (Time To Live) support
-3. Cache invalidation strategies
-4. Performance metrics
+2. TTL (Time To Live) support with heap-indexed expiry
+3. Bounded memory with LRU/LFU eviction
+4. Cache invalidation strategies
+5. Stampede protection (single-flight, early refresh, stale-while-revalidate)
+6. Performance metrics
 
 Run this to see a complete caching implementation!
 """
@@ -16,162 +18,580 @@ import sqlite3
 import os
 import time
 import json
-from datetime import datetime, timedelta
-from typing import Any, Callable
+import heapq
+import math
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
 import random
 
+from key_index import KeyIndex
+
 print("=" * 60)
 print("DATABASE CACHING LAYER")
 print("=" * 60)
 
 # ========== CACHE IMPLEMENTATION ==========
 class Cache:
-    """In-memory cache with TTL support"""
+    """In-memory cache with TTL support, size limits and LRU/LFU eviction
     
-    def __init__(self):
-        self._data = {}
-        self._expires = {}
+    Expiry deadlines use time.monotonic() and are indexed in a min-heap, so
+    expired keys are reclaimed by an amortized sweep on every write instead
+    of waiting for someone to read that exact key. Keys are also indexed by
+    namespace and by tag for cheap bulk invalidation.
+    """
+    
+    SWEEP_BATCH = 16  # Max expired keys reclaimed per set() call
+    
+    def __init__(self, max_entries: int | None = None,
+                 max_bytes: int | None = None, eviction: str = "lru"):
+        if eviction not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        
+        self._data = OrderedDict()   # key -> value (oldest access first)
+        self._expires = {}           # key -> monotonic deadline
+        self._expiry_heap = []       # (deadline, key), may hold stale entries
+        self._sizes = {}             # key -> estimated bytes (max_bytes only)
+        self._bytes = 0
+        self._freq = {}              # key -> access count (LFU only)
+        self._freq_buckets = {}      # count -> OrderedDict of keys (LFU only)
+        self._min_freq = 0
+        self._index = KeyIndex()     # namespace trie for delete_pattern()
+        self._tags = {}              # tag -> set of keys
+        self._key_tags = {}          # key -> tags attached at set() time
+        self._lock = threading.RLock()
         self._stats = {
             "hits": 0,
             "misses": 0,
             "sets": 0,
-            "deletes": 0
+            "deletes": 0,
+            "expired": 0,
+            "evictions": 0
         }
     
     def get(self, key: str) -> Any | None:
         """Get value, return None if expired or missing"""
-        self._cleanup_expired(key)
+        with self._lock:
+            self._cleanup_expired(key)
         
-        if key in self._data:
-            self._stats["hits"] += 1
-            return self._data[key]
+            if key in self._data:
+                self._stats["hits"] += 1
+                self._touch(key)
+                return self._data[key]
         
-        self._stats["misses"] += 1
-        return None
+            self._stats["misses"] += 1
+            return None
     
-    def set(self, key: str, value: Any, ttl: int = 300) -> None:
-        """Set value with TTL (default 5 minutes)"""
-        self._data[key] = value
-        self._expires[key] = datetime.now() + timedelta(seconds=ttl)
-        self._stats["sets"] += 1
+    def set(self, key: str, value: Any, ttl: float = 300,
+            tags: Iterable[str] | None = None) -> None:
+        """Set value with TTL (default 5 minutes) and optional tags"""
+        with self._lock:
+            now = time.monotonic()
+            self._sweep_expired(now, limit=self.SWEEP_BATCH)
+        
+            if key in self._data:
+                self._data[key] = value
+                self._touch(key)
+                self._untag(key)
+            else:
+                self._data[key] = value
+                self._index.add(key)
+                if self.eviction == "lfu":
+                    self._freq_add(key, 1)
+        
+            if tags:
+                self._key_tags[key] = tags = frozenset(tags)
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+        
+            if self.max_bytes is not None:
+                size = self._estimate_size(value)
+                self._bytes += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+        
+            deadline = now + ttl
+            self._expires[key] = deadline
+            heapq.heappush(self._expiry_heap, (deadline, key))
+            if len(self._expiry_heap) > 2 * len(self._expires) + 64:
+                self._rebuild_expiry_heap()
+        
+            self._stats["sets"] += 1
+            self._enforce_limits(now)
     
     def delete(self, key: str) -> bool:
         """Delete a key"""
-        if key in self._data:
-            del self._data[key]
-            if key in self._expires:
-                del self._expires[key]
-            self._stats["deletes"] += 1
-            return True
-        return False
+        with self._lock:
+            if self._remove(key):
+                self._stats["deletes"] += 1
+                return True
+            return False
     
     def delete_pattern(self, pattern: str) -> int:
-        """Delete all keys matching pattern (simple wildcard)"""
-        prefix = pattern.rstrip("*")
-        keys_to_delete = [k for k in self._data if k.startswith(prefix)]
-        for key in keys_to_delete:
-            self.delete(key)
-        return len(keys_to_delete)
+        """Delete all keys matching a glob pattern, e.g. 'products:*'"""
+        with self._lock:
+            keys_to_delete = self._index.match(pattern)
+            for key in keys_to_delete:
+                self.delete(key)
+            return len(keys_to_delete)
+    
+    def delete_tag(self, tag: str) -> int:
+        """Delete every key that was set with this tag"""
+        with self._lock:
+            keys_to_delete = list(self._tags.get(tag, ()))
+            for key in keys_to_delete:
+                self.delete(key)
+            return len(keys_to_delete)
     
     def clear(self) -> None:
         """Clear all cached data"""
-        self._data.clear()
-        self._expires.clear()
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self._expiry_heap.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._freq.clear()
+            self._freq_buckets.clear()
+            self._min_freq = 0
+            self._index.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+    
+    def ttl(self, key: str) -> float | None:
+        """Seconds until key expires, or None if missing"""
+        with self._lock:
+            self._cleanup_expired(key)
+            deadline = self._expires.get(key)
+            if deadline is None:
+                return None
+            return deadline - time.monotonic()
+    
+    def purge_expired(self) -> int:
+        """Remove every expired key now (e.g. from a periodic timer)"""
+        with self._lock:
+            return self._sweep_expired(time.monotonic())
     
     def _cleanup_expired(self, key: str) -> None:
         """Remove key if expired"""
-        if key in self._expires:
-            if datetime.now() > self._expires[key]:
-                del self._data[key]
-                del self._expires[key]
+        deadline = self._expires.get(key)
+        if deadline is not None and time.monotonic() >= deadline:
+            self._remove(key)
+            self._stats["expired"] += 1
+    
+    def _sweep_expired(self, now: float, limit: int | None = None) -> int:
+        """Pop due entries off the expiry heap, skipping stale ones"""
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now and (limit is None or removed < limit):
+            deadline, key = heapq.heappop(heap)
+            # A key that was re-set has a newer deadline; this entry is stale
+            if self._expires.get(key) == deadline:
+                self._remove(key)
+                self._stats["expired"] += 1
+                removed += 1
+        return removed
+    
+    def _rebuild_expiry_heap(self) -> None:
+        """Drop stale heap entries left behind by repeated sets"""
+        self._expiry_heap = [(d, k) for k, d in self._expires.items()]
+        heapq.heapify(self._expiry_heap)
+    
+    def _remove(self, key: str) -> bool:
+        """Remove a key from every internal structure"""
+        if key not in self._data:
+            return False
+        del self._data[key]
+        self._expires.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+        self._index.discard(key)
+        self._untag(key)
+        if self.eviction == "lfu":
+            self._freq_discard(key)
+        return True
+    
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+    
+    def _touch(self, key: str) -> None:
+        """Record an access for the eviction policy"""
+        if self.eviction == "lru":
+            self._data.move_to_end(key)
+        else:
+            count = self._freq_discard(key)
+            self._freq_add(key, count + 1)
+    
+    def _freq_add(self, key: str, count: int) -> None:
+        self._freq[key] = count
+        self._freq_buckets.setdefault(count, OrderedDict())[key] = None
+        if count == 1 or count < self._min_freq:
+            self._min_freq = count
+    
+    def _freq_discard(self, key: str) -> int:
+        count = self._freq.pop(key)
+        bucket = self._freq_buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[count]
+            if count == self._min_freq:
+                # Every other key counts at least count + 1; exact on touch
+                self._min_freq = count + 1
+        return count
+    
+    def _over_limit(self) -> bool:
+        if self.max_entries is not None and len(self._data) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+    
+    def _enforce_limits(self, now: float) -> None:
+        """Evict entries until the cache fits within its limits"""
+        if not self._over_limit():
+            return
+        # Reclaim expired keys before evicting live ones
+        self._sweep_expired(now)
+        while self._data and self._over_limit():
+            self._remove(self._pick_victim())
+            self._stats["evictions"] += 1
+    
+    def _pick_victim(self) -> str:
+        if self.eviction == "lru":
+            return next(iter(self._data))
+        if self._min_freq not in self._freq_buckets:
+            # Only after delete/expiry emptied the lowest bucket and the next
+            # count up is unused: one scan over the distinct counts
+            self._min_freq = min(self._freq_buckets)
+        return next(iter(self._freq_buckets[self._min_freq]))
+    
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Approximate memory cost of a value by its JSON length"""
+        return len(json.dumps(value, default=str))
     
     @property
     def stats(self) -> dict:
         """Get cache statistics"""
         total = self._stats["hits"] + self._stats["misses"]
         hit_rate = (self._stats["hits"] / total * 100) if total > 0 else 0
-        return {
+        stats = {
             **self._stats,
             "hit_rate": f"{hit_rate:.1f}%",
             "size": len(self._data)
         }
+        if self.max_bytes is not None:
+            stats["bytes"] = self._bytes
+        return stats
+
+# ========== REQUEST COALESCING ==========
+class SingleFlight:
+    """Run at most one call per key; concurrent callers share its result"""
+    
+    class _Call:
+        __slots__ = ("done", "result", "error")
+        
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in progress
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+    
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight"""
+    
+    def __init__(self):
+        self._calls = {}  # key -> Future of the call in progress
+    
+    async def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            # Shield so a cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+    
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
 
 # ========== CACHED DATABASE ==========
 class CachedDatabase:
-    """Database with caching layer"""
+    """Database with caching layer
+    
+    Product lookups are protected against cache stampedes: concurrent misses
+    for the same key share one database query, hot keys are refreshed early
+    with probability rising as expiry nears (XFetch), and with stale_ttl > 0
+    an expired product is served stale while one background load refreshes it.
+    """
     
-    def __init__(self, db_path: str, cache: Cache):
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
+    MAX_QUERY_PARAMS = 500  # Stay under SQLite's bound-parameter limit
+    
+    def __init__(self, db_path: str, cache: Cache, product_ttl: float = 300,
+                 stale_ttl: float = 0, beta: float = 1.0,
+                 query_delay: float = 0.0):
+        # Shared with single-flight leader threads: every query holds
+        # _db_lock and reads its results from its own cursor
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.cache = cache
+        self.product_ttl = product_ttl
+        self.stale_ttl = stale_ttl      # Extra seconds a stale product may be served
+        self.beta = beta                # Early refresh aggressiveness, 0 disables
+        self.query_delay = query_delay  # Simulated network latency per query
         self._db_calls = 0
+        self._db_lock = threading.Lock()
+        self._load_time = 0.0           # Moving average of product load time
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self._background_tasks = set()
     
     def setup_schema(self):
         """Create tables"""
-        self.cursor.execute("DROP TABLE IF EXISTS products")
-        self.cursor.execute("""
-        CREATE TABLE products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            price REAL NOT NULL,
-            category TEXT,
-            stock INTEGER DEFAULT 0
-        )
-        """)
-        self.conn.commit()
+        with self._db_lock, self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS products")
+            self.conn.execute("""
+            CREATE TABLE products (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price REAL NOT NULL,
+                category TEXT,
+                stock INTEGER DEFAULT 0
+            )
+            """)
     
     def insert_product(self, name: str, price: float, category: str, stock: int) -> int:
         """Insert product (no caching for writes)"""
-        self.cursor.execute(
-            "INSERT INTO products (name, price, category, stock) VALUES (?, ?, ?, ?)",
-            (name, price, category, stock)
-        )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self._db_lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO products (name, price, category, stock) VALUES (?, ?, ?, ?)",
+                (name, price, category, stock)
+            )
+        return cursor.lastrowid
+    
+    def insert_products(self, rows: Iterable[tuple]) -> list[int]:
+        """Insert (name, price, category, stock) rows in one transaction
+        
+        The new products are written to the cache, and cached lists for
+        their categories are invalidated.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        with self._db_lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO products (name, price, category, stock) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            # AUTOINCREMENT ids of rows inserted in one transaction are consecutive
+            last_id = self.conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'products'"
+            ).fetchone()[0]
+        
+        first_id = last_id - len(rows) + 1
+        ids = list(range(first_id, last_id + 1))
+        for product_id, row in zip(ids, rows):
+            product = self._row_to_product((product_id, *row))
+            self.cache.set(f"product:{product_id}", product,
+                           ttl=self.product_ttl + self.stale_ttl)
+        for category in {row[2] for row in rows}:
+            self.cache.delete(f"products:category:{category}")
+        return ids
     
     def get_product(self, product_id: int, use_cache: bool = True) -> dict | None:
         """Get product by ID with caching"""
+        if not use_cache:
+            return self._fetch_product(product_id)
+        
         cache_key = f"product:{product_id}"
+        load = lambda: self._load_product(product_id)
+        
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            fresh_for = (self.cache.ttl(cache_key) or 0) - self.stale_ttl
+            if fresh_for <= 0:
+                # Stale-while-revalidate: serve it, refresh in the background
+                if not self._flight.in_flight(cache_key):
+                    threading.Thread(
+                        target=self._flight.do, args=(cache_key, load), daemon=True
+                    ).start()
+            elif (self._should_refresh_early(fresh_for)
+                  and not self._flight.in_flight(cache_key)):
+                return self._flight.do(cache_key, load)
+            return cached
+        
+        # Cache miss - one caller queries the database, the others wait for it.
+        # A caller arriving just after the previous leader finished becomes
+        # a new leader, so it re-checks the cache before querying.
+        return self._flight.do(
+            cache_key, lambda: self._cached_or_load(cache_key, load))
+    
+    def get_products(self, product_ids: Iterable[int], use_cache: bool = True) -> list:
+        """Get many products; cache misses are loaded with one IN (...) query
         
+        Returns a list aligned with product_ids, with None for unknown ids.
+        """
+        product_ids = list(product_ids)
+        found = {}
         if use_cache:
+            for product_id in product_ids:
+                cached = self.cache.get(f"product:{product_id}")
+                if cached is not None:
+                    found[product_id] = cached
+        
+        misses = list(dict.fromkeys(i for i in product_ids if i not in found))
+        for start in range(0, len(misses), self.MAX_QUERY_PARAMS):
+            chunk = misses[start:start + self.MAX_QUERY_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._db_lock:
+                self._db_calls += 1
+                rows = self.conn.execute(
+                    f"SELECT * FROM products WHERE id IN ({placeholders})",
+                    chunk
+                ).fetchall()
+            for row in rows:
+                product = self._row_to_product(row)
+                found[product["id"]] = product
+                if use_cache:
+                    self.cache.set(f"product:{product['id']}", product,
+                                   ttl=self.product_ttl + self.stale_ttl)
+        
+        return [found.get(product_id) for product_id in product_ids]
+    
+    async def get_product_async(self, product_id: int) -> dict | None:
+        """asyncio version of get_product (queries run in a worker thread)"""
+        cache_key = f"product:{product_id}"
+        load = lambda: asyncio.to_thread(self._load_product, product_id)
+        
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            fresh_for = (self.cache.ttl(cache_key) or 0) - self.stale_ttl
+            if fresh_for <= 0:
+                if not self._async_flight.in_flight(cache_key):
+                    task = asyncio.create_task(self._async_flight.do(cache_key, load))
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+            elif (self._should_refresh_early(fresh_for)
+                  and not self._async_flight.in_flight(cache_key)):
+                return await self._async_flight.do(cache_key, load)
+            return cached
+        
+        async def cached_or_load():
             cached = self.cache.get(cache_key)
-            if cached is not None:
-                return cached
+            return cached if cached is not None else await load()
+        
+        return await self._async_flight.do(cache_key, cached_or_load)
+    
+    def _cached_or_load(self, cache_key: str, load: Callable[[], Any]) -> Any:
+        """Single-flight miss loader: use a value cached since the miss"""
+        cached = self.cache.get(cache_key)
+        return cached if cached is not None else load()
+    
+    def _should_refresh_early(self, fresh_for: float) -> bool:
+        """XFetch: refresh with probability rising as expiry approaches"""
+        if self.beta <= 0 or self._load_time <= 0:
+            return False
+        jitter = -math.log(1.0 - random.random())
+        return self._load_time * self.beta * jitter >= fresh_for
+    
+    def _load_product(self, product_id: int) -> dict | None:
+        """Fetch a product from the database and cache it"""
+        start = time.monotonic()
+        product = self._fetch_product(product_id)
+        elapsed = time.monotonic() - start
+        if self._load_time:
+            self._load_time = 0.8 * self._load_time + 0.2 * elapsed
+        else:
+            self._load_time = elapsed
         
-        # Cache miss - fetch from database
-        self._db_calls += 1
-        self.cursor.execute(
-            "SELECT * FROM products WHERE id = ?",
-            (product_id,)
-        )
-        row = self.cursor.fetchone()
-        
-        if row:
-            product = {
-                "id": row[0],
-                "name": row[1],
-                "price": row[2],
-                "category": row[3],
-                "stock": row[4]
-            }
-            if use_cache:
-                self.cache.set(cache_key, product, ttl=300)
-            return product
-        return None
+        if product:
+            self.cache.set(f"product:{product_id}", product,
+                           ttl=self.product_ttl + self.stale_ttl)
+        return product
+    
+    def _fetch_product(self, product_id: int) -> dict | None:
+        if self.query_delay:
+            time.sleep(self.query_delay)
+        with self._db_lock:
+            self._db_calls += 1
+            row = self.conn.execute(
+                "SELECT * FROM products WHERE id = ?",
+                (product_id,)
+            ).fetchone()
+        return self._row_to_product(row) if row else None
+    
+    @staticmethod
+    def _row_to_product(row: tuple) -> dict:
+        return {
+            "id": row[0],
+            "name": row[1],
+            "price": row[2],
+            "category": row[3],
+            "stock": row[4]
+        }
     
     def update_product(self, product_id: int, **updates) -> bool:
         """Update product and invalidate cache"""
         set_clause = ", ".join(f"{k} = ?" for k in updates.keys())
-        self.cursor.execute(
-            f"UPDATE products SET {set_clause} WHERE id = ?",
-            (*updates.values(), product_id)
-        )
-        self.conn.commit()
+        with self._db_lock, self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE products SET {set_clause} WHERE id = ?",
+                (*updates.values(), product_id)
+            )
         
-        # Invalidate cache
+        # Invalidate the product and every cached list that contains it
         self.cache.delete(f"product:{product_id}")
+        self.cache.delete_tag(f"product:{product_id}")
         
-        return self.cursor.rowcount > 0
+        return cursor.rowcount > 0
     
     def get_products_by_category(self, category: str, use_cache: bool = True) -> list:
         """Get products by category with caching"""
@@ -182,24 +602,19 @@ class CachedDatabase:
             if cached is not None:
                 return cached
         
-        self._db_calls += 1
-        self.cursor.execute(
-            "SELECT * FROM products WHERE category = ?",
-            (category,)
-        )
-        
-        products = []
-        for row in self.cursor.fetchall():
-            products.append({
-                "id": row[0],
-                "name": row[1],
-                "price": row[2],
-                "category": row[3],
-                "stock": row[4]
-            })
+        with self._db_lock:
+            self._db_calls += 1
+            rows = self.conn.execute(
+                "SELECT * FROM products WHERE category = ?",
+                (category,)
+            ).fetchall()
+        
+        products = [self._row_to_product(row) for row in rows]
         
         if use_cache and products:
-            self.cache.set(cache_key, products, ttl=60)  # Shorter TTL for lists
+            # Shorter TTL for lists; tag with member ids for invalidation
+            tags = [f"product:{p['id']}" for p in products]
+            self.cache.set(cache_key, products, ttl=60, tags=tags)
         
         return products
     
@@ -208,10 +623,10 @@ class CachedDatabase:
         # Get category before delete for cache invalidation
         product = self.get_product(product_id, use_cache=False)
         
-        self.cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-        self.conn.commit()
+        with self._db_lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
         
-        if self.cursor.rowcount > 0:
+        if cursor.rowcount > 0:
             # Invalidate both product and category cache
             self.cache.delete(f"product:{product_id}")
             if product:
@@ -359,6 +774,145 @@ print(f"With cache:    {with_cache_time*1000:.1f}ms, {with_cache_calls} DB calls
 print(f"Speedup:       {no_cache_time/with_cache_time:.1f}x faster")
 print(f"DB call reduction: {(1 - with_cache_calls/no_cache_calls)*100:.1f}%")
 
+print("\n📊 Test 6: Bounded memory and expiry sweeping")
+print("-" * 40)
+
+# Write-heavy keyspace: keys are written once and never read again
+bounded = Cache(max_entries=100)
+for i in range(1000):
+    bounded.set(f"event:{i}", {"id": i}, ttl=300)
+print(f"LRU, max_entries=100, 1000 writes: size={bounded.stats['size']}, "
+      f"evictions={bounded.stats['evictions']}")
+
+lfu = Cache(max_entries=3, eviction="lfu")
+for key in ("a", "b", "c"):
+    lfu.set(key, key.upper())
+for _ in range(3):
+    lfu.get("a")
+    lfu.get("c")
+lfu.set("d", "D")  # "b" has the fewest hits, so it is evicted
+print(f"LFU, max_entries=3: b evicted={lfu.get('b') is None}, "
+      f"a kept={lfu.get('a') is not None}")
+
+by_size = Cache(max_bytes=2_000)
+for i in range(100):
+    by_size.set(f"blob:{i}", "x" * 100)
+print(f"max_bytes=2000, 100 x ~100B values: size={by_size.stats['size']}, "
+      f"bytes={by_size.stats['bytes']}")
+
+# Expired keys are reclaimed without anyone reading them
+short_lived = Cache()
+for i in range(500):
+    short_lived.set(f"temp:{i}", i, ttl=0.01)
+time.sleep(0.02)
+short_lived.set("trigger", 1)  # Each write sweeps a small batch
+print(f"500 expired keys, after 1 write:  size={short_lived.stats['size']}")
+print(f"After purge_expired(): removed={short_lived.purge_expired()}, "
+      f"size={short_lived.stats['size']}")
+
+print("\n📊 Test 7: Pattern and tag invalidation")
+print("-" * 40)
+
+cache.clear()
+for category in categories:
+    db.get_products_by_category(category)
+for product_id in product_ids:
+    db.get_product(product_id)
+print(f"Cached keys: {cache.stats['size']}")
+
+removed = cache.delete_pattern("products:category:*")
+print(f"delete_pattern('products:category:*') removed {removed} list keys")
+removed = cache.delete_pattern("product:?")
+print(f"delete_pattern('product:?') removed {removed} product keys")
+
+books = db.get_products_by_category("Books")
+db.update_product(books[0]["id"], price=29.99)
+print(f"Updating '{books[0]['name']}' dropped the cached Books list: "
+      f"{cache.get('products:category:Books') is None}")
+
+# Prefix lookups only visit keys under the matching namespace
+big = Cache()
+for i in range(100_000):
+    big.set(f"session:{i}", i)
+for i in range(100):
+    big.set(f"products:category:c{i}", i)
+start = time.time()
+removed = big.delete_pattern("products:category:*")
+elapsed = (time.time() - start) * 1000
+print(f"100 of 100,100 keys invalidated in {elapsed:.3f}ms")
+
+print("\n📊 Test 8: Cache stampede protection")
+print("-" * 40)
+
+slow_db = CachedDatabase(db_file, Cache(), query_delay=0.05)
+
+def hammer(n_threads: int) -> float:
+    """Fire n concurrent lookups for one hot key, return wall time in ms"""
+    threads = [threading.Thread(target=slow_db.get_product, args=(1,))
+               for _ in range(n_threads)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return (time.time() - start) * 1000
+
+elapsed = hammer(50)
+print(f"50 threads miss on product:1 together: {slow_db.db_calls} DB call, {elapsed:.0f}ms")
+
+async def hammer_async(n_tasks: int) -> list:
+    return await asyncio.gather(*(slow_db.get_product_async(2) for _ in range(n_tasks)))
+
+slow_db._db_calls = 0
+results = asyncio.run(hammer_async(50))
+print(f"50 asyncio tasks miss on product:2 together: {slow_db.db_calls} DB call, "
+      f"{len(results)} results")
+
+# Stale-while-revalidate: expired keys are served instantly while one
+# background load refreshes them
+swr_db = CachedDatabase(db_file, Cache(), product_ttl=0.05, stale_ttl=30,
+                        query_delay=0.05)
+swr_db.get_product(3)
+time.sleep(0.1)  # product:3 is now stale
+swr_db._db_calls = 0
+start = time.time()
+for _ in range(20):
+    swr_db.get_product(3)
+elapsed = (time.time() - start) * 1000
+time.sleep(0.1)  # Let the background refresh finish
+print(f"20 reads of a stale key: {elapsed:.2f}ms total, "
+      f"{swr_db.db_calls} background refresh")
+
+slow_db.close()
+swr_db.close()
+
+print("\n📊 Test 9: Batched reads and writes")
+print("-" * 40)
+
+bulk_rows = [(f"Item {i}", round(random.uniform(1, 100), 2),
+              random.choice(categories), random.randint(0, 500))
+             for i in range(5000)]
+
+start = time.time()
+for row in bulk_rows:
+    db.insert_product(*row)
+row_by_row = (time.time() - start) * 1000
+
+start = time.time()
+new_ids = db.insert_products(bulk_rows)
+batched = (time.time() - start) * 1000
+print(f"Insert 5000 rows: one by one {row_by_row:.0f}ms, batched {batched:.0f}ms")
+
+cache.clear()
+db._db_calls = 0
+page_ids = new_ids[:50] + [999_999]
+for product_id in page_ids[:25]:
+    db.get_product(product_id)  # Half the page is already cached
+db._db_calls = 0
+page = db.get_products(page_ids)
+print(f"get_products(51 ids, 25 cached): {db.db_calls} DB call, "
+      f"{sum(p is not None for p in page)} found, last={page[-1]}")
+
 # ========== BEST PRACTICES ==========
 print("\n" + "=" * 60)
 print("CACHING BEST PRACTICES")
@@ -380,6 +934,7 @@ print("""
 3. INVALIDATION STRATEGIES
    - Update/Delete: Always invalidate related keys
    - Pattern matching: Delete all related keys
+   - Tags: Attach tags at set time, drop every tagged key at once
    - Version keys: Append version number
 
 4. HANDLE CACHE FAILURES
@@ -391,6 +946,7 @@ print("""
    - Track hit/miss rates
    - Adjust TTL based on usage patterns
    - Watch for cache stampede (many misses at once)
+   - Coalesce concurrent misses, refresh hot keys early, serve stale on expiry
 """)
 
 # ========== CLEANUP ==========
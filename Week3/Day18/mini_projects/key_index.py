@@ -0,0 +1,105 @@
+"""
+Namespace index for the Day 18 caches
+=====================================
+Shared by 05_redis_caching.py (SimpleRedis.keys) and
+02_caching_layer.py (Cache.delete_pattern).
+
+Matching a glob like "user:42:*" against every key is a scan of the whole
+keyspace. KeyIndex keeps the keys in a trie over their ':'-separated
+segments instead, so a lookup only visits the namespace the pattern's
+literal prefix points at:
+
+    user ── 42 ── profile     "user:42:*"  -> walks user -> 42, then
+         │     └─ orders                      collects what is below it
+         └─ 43 ── profile
+
+Usage:
+    index = KeyIndex()
+    index.add("user:42:profile")        # keep in sync on set/delete
+    index.discard("user:42:profile")
+    index.prefix("user:4")              # keys starting with "user:4"
+    index.match("user:*:profile")       # glob: *, ?, [...]
+"""
+
+from fnmatch import fnmatchcase
+
+
+class KeyIndex:
+    """Trie over ':'-separated key segments for prefix and glob lookups
+    
+    A lookup walks one node per segment of the literal prefix, so its cost
+    depends on the number of matching keys, not the size of the keyspace.
+    """
+    
+    class _Node:
+        __slots__ = ("children", "key")
+        
+        def __init__(self):
+            self.children = {}
+            self.key = None  # Full key if one ends at this node
+    
+    def __init__(self, separator: str = ":"):
+        self.separator = separator
+        self._root = self._Node()
+    
+    def add(self, key: str) -> None:
+        node = self._root
+        for part in key.split(self.separator):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = self._Node()
+            node = child
+        node.key = key
+    
+    def discard(self, key: str) -> None:
+        parts = key.split(self.separator)
+        path = [self._root]
+        for part in parts:
+            child = path[-1].children.get(part)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].key = None
+        # Prune nodes that no longer lead to any key
+        for i in range(len(parts) - 1, -1, -1):
+            node = path[i + 1]
+            if node.key is not None or node.children:
+                break
+            del path[i].children[parts[i]]
+    
+    def clear(self) -> None:
+        self._root = self._Node()
+    
+    def prefix(self, prefix: str) -> list:
+        """All keys starting with prefix"""
+        *parts, last = prefix.split(self.separator)
+        node = self._root
+        for part in parts:
+            node = node.children.get(part)
+            if node is None:
+                return []
+        keys = []
+        for name, child in node.children.items():
+            if name.startswith(last):
+                self._collect(child, keys)
+        return keys
+    
+    def match(self, pattern: str) -> list:
+        """All keys matching a glob pattern (*, ?, [...])"""
+        cut = next((i for i, ch in enumerate(pattern) if ch in "*?[\\"),
+                   len(pattern))
+        if cut == len(pattern):
+            return [k for k in self.prefix(pattern) if k == pattern]
+        candidates = self.prefix(pattern[:cut])
+        if pattern[cut:] == "*":
+            return candidates
+        return [k for k in candidates if fnmatchcase(k, pattern)]
+    
+    @staticmethod
+    def _collect(node, keys: list) -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.key is not None:
+                keys.append(node.key)
+            stack.extend(node.children.values())
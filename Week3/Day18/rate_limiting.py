@@ -0,0 +1,301 @@
+"""
+Rate limiters and web middleware
+================================
+The limiters from 06_rate_limiting.py as an importable module. Used by
+05_redis_caching.py (check_rate_limit) and the Day 17 FastAPI apps.
+
+- SlidingLogLimiter     exact, remembers every accepted request
+- SlidingWindowLimiter  weighted estimate, 3 numbers per key
+- TokenBucketLimiter    smooth rate plus a burst of up to `limit`
+
+Usage:
+    limiter = TokenBucketLimiter(limit=100, period=60)
+    limiter.allow("user:42")           # True / False
+    limiter.allow_many(keys)           # one clock read for a batch
+    limiter.purge_idle()               # drop state for quiet keys
+
+    # FastAPI / Starlette (pure ASGI, no extra imports needed)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    # Django / DRF: subclass, set `limiter`, add it to MIDDLEWARE
+    class ApiRateLimit(DjangoRateLimitMiddleware):
+        limiter = SlidingWindowLimiter(limit=100, period=60)
+
+Run this file to benchmark the limiters against a fixed-window counter.
+"""
+
+import json
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+
+class RateLimiter(ABC):
+    """Base class: allow `limit` requests per `period` seconds per key"""
+
+    def __init__(self, limit: int, period: float,
+                 clock: Callable[[], float] = time.monotonic):
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit and period must be positive")
+        self.limit = limit
+        self.period = period
+        self.clock = clock
+        self._states = {}  # key -> per-key state object
+
+    def allow(self, key: str, now: float | None = None) -> bool:
+        """Record a request for key, return True if it is within the limit"""
+        return self._allow(key, self.clock() if now is None else now)
+
+    def allow_many(self, keys: Iterable[str], now: float | None = None) -> list[bool]:
+        """Check a batch of requests, reading the clock only once"""
+        if now is None:
+            now = self.clock()
+        check = self._allow
+        return [check(key, now) for key in keys]
+
+    def purge_idle(self, now: float | None = None) -> int:
+        """Drop state for keys that have been quiet for a full period"""
+        if now is None:
+            now = self.clock()
+        idle = [key for key, state in self._states.items()
+                if self._is_idle(state, now)]
+        for key in idle:
+            del self._states[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @abstractmethod
+    def _allow(self, key: str, now: float) -> bool:
+        """Record a request for key at time now, return True if allowed"""
+
+    @abstractmethod
+    def _is_idle(self, state, now: float) -> bool:
+        """Return True if state holds nothing that still affects a decision"""
+
+
+class _LogState:
+    __slots__ = ("hits",)
+
+    def __init__(self):
+        self.hits = deque()  # timestamps of accepted requests
+
+
+class SlidingLogLimiter(RateLimiter):
+    """Exact: remember the timestamp of every accepted request in the window"""
+
+    def _allow(self, key: str, now: float) -> bool:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _LogState()
+        hits = state.hits
+        cutoff = now - self.period
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+        if len(hits) < self.limit:
+            hits.append(now)
+            return True
+        return False
+
+    def _is_idle(self, state: _LogState, now: float) -> bool:
+        return not state.hits or state.hits[-1] <= now - self.period
+
+
+class _WindowState:
+    __slots__ = ("window", "current", "previous")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.current = 0
+        self.previous = 0
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """Approximate: weight the previous window's count by how much of it
+    still overlaps the sliding window"""
+
+    def _allow(self, key: str, now: float) -> bool:
+        window, offset = divmod(now, self.period)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _WindowState(window)
+        elif state.window != window:
+            state.previous = state.current if window == state.window + 1 else 0
+            state.current = 0
+            state.window = window
+
+        weight = 1.0 - offset / self.period
+        if state.previous * weight + state.current < self.limit:
+            state.current += 1
+            return True
+        return False
+
+    def _is_idle(self, state: _WindowState, now: float) -> bool:
+        return now // self.period > state.window + 1
+
+
+class _BucketState:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBucketLimiter(RateLimiter):
+    """Refill limit/period tokens per second up to `limit`; each request
+    spends one token, so bursts are capped at the bucket size"""
+
+    def __init__(self, limit: int, period: float,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(limit, period, clock)
+        self.rate = limit / period
+
+    def _allow(self, key: str, now: float) -> bool:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _BucketState(self.limit, now)
+        else:
+            tokens = state.tokens + (now - state.updated) * self.rate
+            state.tokens = tokens if tokens < self.limit else self.limit
+            state.updated = now
+
+        if state.tokens >= 1:
+            state.tokens -= 1
+            return True
+        return False
+
+    def _is_idle(self, state: _BucketState, now: float) -> bool:
+        # A full bucket behaves exactly like a missing one
+        return state.tokens + (now - state.updated) * self.rate >= self.limit
+
+
+# ========== MIDDLEWARE ==========
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware for FastAPI / Starlette: answer 429 once a client
+    goes over the limit.
+
+    Requests are keyed by client IP; pass key_func(scope) to key by API
+    key or user instead. The limiter is only touched from the event loop,
+    so it needs no lock.
+    """
+
+    def __init__(self, app, limiter: RateLimiter,
+                 key_func: Callable[[dict], str] | None = None):
+        self.app = app
+        self.limiter = limiter
+        self.key_func = key_func or self.client_ip
+
+    @staticmethod
+    def client_ip(scope: dict) -> str:
+        client = scope.get("client")
+        return client[0] if client else "anonymous"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.limiter.allow(self.key_func(scope)):
+            await self.app(scope, receive, send)
+            return
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(self.limiter.period)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class DjangoRateLimitMiddleware:
+    """
+    Django middleware (works for DRF views too): 429 for requests under
+    path_prefix once a user or IP goes over the limit.
+
+    Subclass it to set `limiter`. Django may serve requests from several
+    threads, so checks are serialised with a lock.
+    """
+
+    limiter: RateLimiter | None = None
+    path_prefix = "/api/"
+
+    def __init__(self, get_response):
+        from django.http import JsonResponse  # Django is optional here
+
+        if self.limiter is None:
+            raise TypeError(f"{type(self).__name__} must set a limiter")
+        self.get_response = get_response
+        self._json_response = JsonResponse
+        self._lock = threading.Lock()
+
+    def get_key(self, request) -> str:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+    def __call__(self, request):
+        if request.path.startswith(self.path_prefix):
+            with self._lock:
+                allowed = self.limiter.allow(self.get_key(request))
+            if not allowed:
+                response = self._json_response({"detail": "Too many requests"}, status=429)
+                response["Retry-After"] = str(math.ceil(self.limiter.period))
+                return response
+        return self.get_response(request)
+
+
+# ========== BENCHMARK ==========
+
+def fixed_window_datetime(store: dict, key: str, limit: int = 100) -> bool:
+    """Dict + datetime per request, as in the SimpleRedis incr/expire version"""
+    count_key = f"ratelimit:{key}"
+    expires = store.get(count_key)
+    now = datetime.now()
+    if expires is None or now > expires[1]:
+        store[count_key] = [0, now + timedelta(seconds=60)]
+        expires = store[count_key]
+    expires[0] += 1
+    return expires[0] <= limit
+
+
+def benchmark(n_checks: int = 300_000, n_keys: int = 10_000) -> None:
+    """Checks per second for each limiter, one key at a time and batched"""
+    keys = [f"user:{i % n_keys}" for i in range(n_checks)]
+
+    store = {}
+    start = time.perf_counter()
+    for key in keys:
+        fixed_window_datetime(store, key)
+    baseline = n_checks / (time.perf_counter() - start)
+    print(f"\n   {'Fixed window (datetime)':28} {baseline:>12,.0f} checks/sec")
+
+    for name, cls in [("Sliding log", SlidingLogLimiter),
+                      ("Sliding window", SlidingWindowLimiter),
+                      ("Token bucket", TokenBucketLimiter)]:
+        limiter = cls(limit=100, period=60)
+        start = time.perf_counter()
+        for key in keys:
+            limiter.allow(key)
+        single = n_checks / (time.perf_counter() - start)
+
+        limiter = cls(limit=100, period=60)
+        start = time.perf_counter()
+        for i in range(0, n_checks, 1000):
+            limiter.allow_many(keys[i:i + 1000])
+        batched = n_checks / (time.perf_counter() - start)
+        print(f"   {name + ' (allow)':28} {single:>12,.0f} checks/sec")
+        print(f"   {name + ' (allow_many)':28} {batched:>12,.0f} checks/sec")
+
+
+if __name__ == "__main__":
+    print("BENCHMARK (single core)")
+    benchmark()
@@ -16,79 +16,485 @@ Features to implement:
 - Send notifications to specific users
 - Broadcast notifications to all users
 - Handle disconnections gracefully
+
+Production concerns handled below:
+- Each message is serialized ONCE, then fanned out
+- Every connection has its own sender task, so one slow socket never
+  blocks the others
+- Bounded per-connection queues: overflow drops the oldest message, and
+  messages with a coalesce key (e.g. "unread count") replace older ones
+- channel -> users and user -> channels indexes, so unsubscribe and
+  disconnect cost O(subscriptions), not O(channels)
 """
 
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
 print("=" * 60)
 print("REAL-TIME NOTIFICATION SYSTEM")
 print("=" * 60)
 
-# TODO: Implement the notification system
-
-# Suggested structure:
-
-# 1. ConnectionManager class
-# --------------------------
-# class ConnectionManager:
-#     def __init__(self):
-#         self.active_connections: Dict[str, WebSocket] = {}  # user_id -> websocket
-#         self.channels: Dict[str, Set[str]] = {}  # channel -> set of user_ids
-#
-#     async def connect(self, user_id: str, websocket: WebSocket):
-#         pass
-#
-#     def disconnect(self, user_id: str):
-#         pass
-#
-#     async def send_to_user(self, user_id: str, message: dict):
-#         pass
-#
-#     async def broadcast(self, message: dict):
-#         pass
-#
-#     async def send_to_channel(self, channel: str, message: dict):
-#         pass
-
-
-# 2. Notification message format
-# ------------------------------
-# {
-#     "type": "notification",
-#     "data": {
-#         "title": "New Message",
-#         "body": "You have a new message from Alice",
-#         "timestamp": "2024-01-15T10:30:00Z",
-#         "priority": "high"
-#     }
-# }
-
-
-# 3. FastAPI WebSocket endpoint
-# -----------------------------
-# @app.websocket("/ws/notifications/{user_id}")
-# async def notification_websocket(websocket: WebSocket, user_id: str):
-#     await manager.connect(user_id, websocket)
-#     try:
-#         while True:
-#             data = await websocket.receive_json()
-#             # Handle different message types (subscribe, unsubscribe, etc.)
-#     except WebSocketDisconnect:
-#         manager.disconnect(user_id)
-
-
-# 4. REST API to send notifications
-# ---------------------------------
-# @app.post("/notify/{user_id}")
-# async def send_notification(user_id: str, notification: Notification):
-#     await manager.send_to_user(user_id, notification.dict())
-#     return {"status": "sent"}
-
-
-# BONUS: Add these features
-# -------------------------
-# - Notification history storage
-# - Read/unread status tracking
-# - Notification preferences
-# - Rate limiting on notifications
-
-
-print("\nImplement your notification system above!")
+# ========== CONNECTION ==========
+print("\n" + "=" * 60)
+print("CONNECTION MANAGER")
+print("=" * 60)
+
+
+class Connection:
+    """
+    One WebSocket plus its bounded send queue.
+
+    The queue holds already-serialized payloads. Keys are a sequence number,
+    or the message's coalesce key so a newer message can replace a pending
+    one in place instead of queueing behind it.
+    """
+
+    __slots__ = ("user_id", "websocket", "max_queue", "overflow", "_keys",
+                 "_payloads", "_seq", "_wakeup", "_task", "_sending", "sent",
+                 "dropped", "coalesced", "closed")
+
+    def __init__(self, user_id: str, websocket, max_queue: int = 100,
+                 overflow: str = "drop_oldest"):
+        if overflow not in ("drop_oldest", "drop_newest"):
+            raise ValueError("overflow must be 'drop_oldest' or 'drop_newest'")
+        self.user_id = user_id
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._keys = deque()        # send order
+        self._payloads = {}         # key -> serialized message
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._sending = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+
+    def enqueue(self, payload: str, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a payload without blocking; False if it was dropped"""
+        if self.closed:
+            return False
+        if coalesce_key is not None:
+            key = ("c", coalesce_key)
+            if key in self._payloads:
+                self._payloads[key] = payload  # keeps its place in the queue
+                self.coalesced += 1
+                return True
+        else:
+            self._seq += 1
+            key = self._seq
+
+        if len(self._keys) >= self.max_queue:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return False
+            del self._payloads[self._keys.popleft()]
+            self.dropped += 1
+
+        self._keys.append(key)
+        self._payloads[key] = payload
+        self._wakeup.set()
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Queued messages, plus the one being written right now"""
+        return len(self._keys) + self._sending
+
+    async def run(self, on_error) -> None:
+        """Sender loop: drain the queue to the socket, one message at a time"""
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._keys and not self.closed:
+                    payload = self._payloads.pop(self._keys.popleft())
+                    self._sending = True
+                    await self.websocket.send_text(payload)
+                    self._sending = False
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Broken socket: let the manager drop the connection
+            self._sending = False
+            on_error(self)
+
+
+class ConnectionManager:
+    """
+    Tracks connections and channel subscriptions, and fans messages out.
+
+    Sending never awaits a socket: the message is serialized once and put on
+    each target's queue, and the per-connection sender tasks do the writes
+    concurrently.
+    """
+
+    def __init__(self, max_queue: int = 100, overflow: str = "drop_oldest"):
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.user_connections: Dict[str, Set[Connection]] = {}  # user -> sockets
+        self.channel_users: Dict[str, Set[str]] = {}            # channel -> users
+        self.user_channels: Dict[str, Set[str]] = {}            # user -> channels
+        self.serializations = 0
+
+    # ----- connections -----
+
+    async def connect(self, user_id: str, websocket) -> Connection:
+        if hasattr(websocket, "accept"):
+            await websocket.accept()
+        connection = Connection(user_id, websocket, self.max_queue, self.overflow)
+        connection._task = asyncio.create_task(connection.run(self._on_send_error))
+        self.user_connections.setdefault(user_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection) -> None:
+        """Drop one socket; the user's subscriptions go with their last one"""
+        if connection.closed:
+            return
+        connection.closed = True
+        connection._wakeup.set()
+        if connection._task is not None and connection._task is not asyncio.current_task():
+            connection._task.cancel()
+
+        user_id = connection.user_id
+        connections = self.user_connections.get(user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.user_connections[user_id]
+            for channel in self.user_channels.pop(user_id, ()):
+                self._remove_member(channel, user_id)
+
+    def _on_send_error(self, connection: Connection) -> None:
+        self.disconnect(connection)
+
+    async def close(self) -> None:
+        """Disconnect everyone and wait for the sender tasks to finish"""
+        tasks = []
+        for connections in list(self.user_connections.values()):
+            for connection in list(connections):
+                tasks.append(connection._task)
+                self.disconnect(connection)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ----- subscriptions -----
+
+    def subscribe(self, user_id: str, channel: str) -> None:
+        self.channel_users.setdefault(channel, set()).add(user_id)
+        self.user_channels.setdefault(user_id, set()).add(channel)
+
+    def unsubscribe(self, user_id: str, channel: str) -> None:
+        channels = self.user_channels.get(user_id)
+        if channels is None or channel not in channels:
+            return
+        channels.discard(channel)
+        if not channels:
+            del self.user_channels[user_id]
+        self._remove_member(channel, user_id)
+
+    def _remove_member(self, channel: str, user_id: str) -> None:
+        users = self.channel_users.get(channel)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self.channel_users[channel]
+
+    # ----- sending -----
+
+    def encode(self, message: Any) -> str:
+        self.serializations += 1
+        return message if isinstance(message, str) else json.dumps(message, default=str)
+
+    def _fan_out(self, connections, payload: str, coalesce_key: Optional[str]) -> int:
+        queued = 0
+        for connection in connections:
+            queued += connection.enqueue(payload, coalesce_key)
+        return queued
+
+    async def send_to_user(self, user_id: str, message: Any,
+                           coalesce_key: Optional[str] = None) -> int:
+        connections = self.user_connections.get(user_id)
+        if not connections:
+            return 0
+        return self._fan_out(connections, self.encode(message), coalesce_key)
+
+    async def broadcast(self, message: Any, coalesce_key: Optional[str] = None) -> int:
+        payload = self.encode(message)
+        return sum(self._fan_out(connections, payload, coalesce_key)
+                   for connections in self.user_connections.values())
+
+    async def send_to_channel(self, channel: str, message: Any,
+                              coalesce_key: Optional[str] = None) -> int:
+        users = self.channel_users.get(channel)
+        if not users:
+            return 0
+        payload = self.encode(message)
+        queued = 0
+        for user_id in users:
+            connections = self.user_connections.get(user_id)
+            if connections:
+                queued += self._fan_out(connections, payload, coalesce_key)
+        return queued
+
+    def stats(self) -> dict:
+        connections = [c for group in self.user_connections.values() for c in group]
+        return {
+            "users": len(self.user_connections),
+            "connections": len(connections),
+            "channels": len(self.channel_users),
+            "serializations": self.serializations,
+            "sent": sum(c.sent for c in connections),
+            "pending": sum(c.pending for c in connections),
+            "dropped": sum(c.dropped for c in connections),
+            "coalesced": sum(c.coalesced for c in connections),
+        }
+
+
+def notification(title: str, body: str, priority: str = "normal") -> dict:
+    """Build a message in the notification format"""
+    return {
+        "type": "notification",
+        "data": {
+            "title": title,
+            "body": body,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "priority": priority
+        }
+    }
+
+
+print("✅ Connection and ConnectionManager ready")
+
+
+# ========== SIMULATED CLIENTS ==========
+
+class SimulatedSocket:
+    """Stands in for fastapi.WebSocket: records what the server sends"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail_after: Optional[int] = None):
+        self.name = name
+        self.delay = delay
+        self.fail_after = fail_after
+        self.received = []
+
+    async def send_text(self, text: str) -> None:
+        if self.fail_after is not None and len(self.received) >= self.fail_after:
+            raise ConnectionResetError(f"{self.name} went away")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(text)
+
+
+async def drain(manager: ConnectionManager, timeout: float = 5.0) -> None:
+    """Wait until every queue is empty (demo/benchmark helper)"""
+    deadline = time.perf_counter() + timeout
+    while manager.stats()["pending"] and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+
+
+# ========== DEMO ==========
+print("\n" + "=" * 60)
+print("DEMO")
+print("=" * 60)
+
+
+async def demo():
+    manager = ConnectionManager(max_queue=5)
+    alice_phone = SimulatedSocket("alice-phone")
+    alice_laptop = SimulatedSocket("alice-laptop")
+    bob = SimulatedSocket("bob")
+    slow = SimulatedSocket("carol (slow)", delay=0.05)
+    broken = SimulatedSocket("dave (broken)", fail_after=0)
+
+    await manager.connect("alice", alice_phone)
+    await manager.connect("alice", alice_laptop)
+    await manager.connect("bob", bob)
+    carol = await manager.connect("carol", slow)
+    await manager.connect("dave", broken)
+    for user in ("alice", "bob", "carol", "dave"):
+        manager.subscribe(user, "announcements")
+    manager.subscribe("bob", "orders")
+
+    await manager.send_to_user("alice", notification("Hi", "Both of your devices get this"))
+    await manager.send_to_channel("orders", notification("Order shipped", "#1042 is on its way"))
+    await manager.broadcast(notification("Maintenance", "Tonight at 22:00", "high"))
+    await drain(manager)
+
+    print("\n📬 Delivered:")
+    for sock in (alice_phone, alice_laptop, bob, slow):
+        titles = [json.loads(m)["data"]["title"] for m in sock.received]
+        print(f"   {sock.name:14} {titles}")
+    print(f"   dave's send failed -> disconnected: "
+          f"{'dave' not in manager.user_connections}")
+    print(f"   dave's subscriptions removed: "
+          f"{'dave' not in manager.channel_users['announcements']}")
+
+    print("\n🐢 Slow consumer, queue size 5:")
+    for i in range(20):
+        await manager.send_to_user("carol", notification("Chat", f"message {i}"))
+    for count in range(1, 21):
+        await manager.send_to_user("carol", {"type": "unread", "count": count},
+                                   coalesce_key="unread")
+    print(f"   queued {carol.pending}, dropped {carol.dropped}, coalesced {carol.coalesced}")
+    await drain(manager)
+    print(f"   carol finally received {len(slow.received)} messages, last: {slow.received[-1]}")
+
+    manager.unsubscribe("bob", "orders")
+    print(f"\n   After bob unsubscribes, 'orders' exists: {'orders' in manager.channel_users}")
+    await manager.close()
+    print(f"   After close: {manager.stats()}")
+
+
+asyncio.run(demo())
+
+# ========== LOAD BENCHMARK ==========
+print("\n" + "=" * 60)
+print("LOAD BENCHMARK: 10,000 SIMULATED CLIENTS")
+print("=" * 60)
+
+N_CLIENTS = 10_000
+N_MESSAGES = 20
+SLOW_FRACTION = 0.01
+SLOW_DELAY = 0.002
+
+
+def make_sockets():
+    rng = random.Random(7)
+    return [
+        SimulatedSocket(f"user{i}", delay=SLOW_DELAY if rng.random() < SLOW_FRACTION else 0.0)
+        for i in range(N_CLIENTS)
+    ]
+
+
+async def naive_broadcast_benchmark() -> float:
+    """The sketch above: serialize per socket, await each send in turn"""
+    sockets = make_sockets()
+    start = time.perf_counter()
+    for i in range(N_MESSAGES):
+        message = notification("Load test", f"message {i}")
+        for sock in sockets:
+            await sock.send_text(json.dumps(message))
+    return time.perf_counter() - start
+
+
+async def manager_broadcast_benchmark():
+    sockets = make_sockets()
+    manager = ConnectionManager(max_queue=N_MESSAGES)
+    for i, sock in enumerate(sockets):
+        await manager.connect(f"user{i}", sock)
+        manager.subscribe(f"user{i}", f"room{i % 100}")
+
+    start = time.perf_counter()
+    for i in range(N_MESSAGES):
+        await manager.broadcast(notification("Load test", f"message {i}"))
+    enqueue_time = time.perf_counter() - start
+    fast = [sock for sock in sockets if not sock.delay]
+    while any(len(sock.received) < N_MESSAGES for sock in fast):
+        await asyncio.sleep(0.001)
+    fast_time = time.perf_counter() - start
+    await drain(manager, timeout=30)
+    all_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(100):
+        await manager.send_to_channel(f"room{i}", notification("Room", "hello"))
+    channel_time = time.perf_counter() - start
+    await drain(manager, timeout=30)
+
+    start = time.perf_counter()
+    for i in range(N_CLIENTS):
+        for connection in list(manager.user_connections[f"user{i}"]):
+            manager.disconnect(connection)
+    disconnect_time = time.perf_counter() - start
+    stats = manager.stats()
+    await manager.close()
+    return enqueue_time, fast_time, all_time, channel_time, disconnect_time, stats
+
+
+naive_time = asyncio.run(naive_broadcast_benchmark())
+enqueue_time, fast_time, all_time, channel_time, disconnect_time, stats = \
+    asyncio.run(manager_broadcast_benchmark())
+
+deliveries = N_CLIENTS * N_MESSAGES
+print(f"\n{N_MESSAGES} broadcasts to {N_CLIENTS:,} clients "
+      f"({SLOW_FRACTION:.0%} slow, {SLOW_DELAY * 1000:.0f}ms per send):")
+print(f"   Naive loop (serialize + await each):  {naive_time:.2f}s "
+      f"({deliveries / naive_time:,.0f} msgs/s, {deliveries:,} json.dumps)")
+print(f"   Manager, broadcast calls return:      {enqueue_time:.3f}s "
+      f"({N_MESSAGES} json.dumps)")
+print(f"   Manager, all fast clients delivered:  {fast_time:.2f}s "
+      f"({deliveries / fast_time:,.0f} msgs/s)")
+print(f"   Manager, slow clients drained too:    {all_time:.2f}s")
+print(f"   100 channel sends (100 users each):   {channel_time * 1000:.1f}ms")
+print(f"   Disconnect {N_CLIENTS:,} users:             {disconnect_time * 1000:.1f}ms")
+
+# ========== FASTAPI INTEGRATION ==========
+print("\n" + "=" * 60)
+print("FASTAPI INTEGRATION")
+print("=" * 60)
+
+fastapi_code = '''
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+
+app = FastAPI()
+manager = ConnectionManager(max_queue=100)
+
+
+class Notification(BaseModel):
+    title: str
+    body: str
+    priority: str = "normal"
+
+
+@app.websocket("/ws/notifications/{user_id}")
+async def notification_websocket(websocket: WebSocket, user_id: str):
+    connection = await manager.connect(user_id, websocket)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if data.get("action") == "subscribe":
+                manager.subscribe(user_id, data["channel"])
+            elif data.get("action") == "unsubscribe":
+                manager.unsubscribe(user_id, data["channel"])
+    except WebSocketDisconnect:
+        manager.disconnect(connection)
+
+
+@app.post("/notify/{user_id}")
+async def send_notification(user_id: str, n: Notification):
+    queued = await manager.send_to_user(user_id, notification(n.title, n.body, n.priority))
+    return {"status": "queued", "connections": queued}
+
+
+@app.post("/notify/channel/{channel}")
+async def notify_channel(channel: str, n: Notification):
+    queued = await manager.send_to_channel(channel, notification(n.title, n.body, n.priority))
+    return {"status": "queued", "connections": queued}
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await manager.close()
+'''
+
+print(fastapi_code)
+
+print("""
+NOTE: The manager lives in one process. With several workers, publish
+notifications through Redis pub/sub (or similar) and let each worker's
+manager fan out to its own sockets.
+""")
+
+print("\n" + "=" * 60)
+print("✅ Notification System - Complete!")
+print("=" * 60)
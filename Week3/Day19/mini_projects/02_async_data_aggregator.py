@@ -15,6 +15,13 @@ Simulated data sources:
 - News API
 - Stock API
 - Social Media API
+
+Tail-latency techniques used below:
+- Request coalescing: identical (source, key) fetches share one call
+- Hedged requests: if a call is slower than the source's p95, fire a
+  second one and take whichever answers first
+- Adaptive timeouts from each source's observed p99
+- TTL cache that can serve stale data when a source is failing
 """
 
 print("=" * 60)
@@ -22,115 +29,482 @@ print("ASYNC DATA AGGREGATOR")
 print("=" * 60)
 
 import asyncio
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-
-# TODO: Implement the data aggregator
-
-# 1. Cache class for storing results
-# ----------------------------------
-# class SimpleCache:
-#     def __init__(self, ttl_seconds: int = 300):
-#         self.cache: Dict[str, tuple] = {}  # key -> (value, expiry_time)
-#         self.ttl = ttl_seconds
-#
-#     def get(self, key: str) -> Optional[Any]:
-#         pass
-#
-#     def set(self, key: str, value: Any):
-#         pass
-
-
-# 2. Individual data fetchers (simulate API calls)
-# ------------------------------------------------
-# async def fetch_weather(city: str, timeout: float = 5.0) -> dict:
-#     """Fetch weather data for a city."""
-#     await asyncio.sleep(0.5)  # Simulate API latency
-#     return {
-#         "source": "weather",
-#         "city": city,
-#         "temperature": 72,
-#         "conditions": "sunny"
-#     }
-#
-# async def fetch_news(topic: str, timeout: float = 5.0) -> dict:
-#     """Fetch news for a topic."""
-#     pass
-#
-# async def fetch_stocks(symbol: str, timeout: float = 5.0) -> dict:
-#     """Fetch stock data for a symbol."""
-#     pass
-#
-# async def fetch_social(hashtag: str, timeout: float = 5.0) -> dict:
-#     """Fetch social media data for a hashtag."""
-#     pass
-
-
-# 3. Aggregator class
-# -------------------
-# class DataAggregator:
-#     def __init__(self):
-#         self.cache = SimpleCache(ttl_seconds=300)
-#         self.semaphore = asyncio.Semaphore(5)  # Max 5 concurrent requests
-#
-#     async def fetch_with_timeout(self, coro, timeout: float) -> Optional[dict]:
-#         """Fetch data with timeout, return None on failure."""
-#         try:
-#             async with self.semaphore:
-#                 return await asyncio.wait_for(coro, timeout=timeout)
-#         except asyncio.TimeoutError:
-#             return None
-#         except Exception as e:
-#             return {"error": str(e)}
-#
-#     async def aggregate(self, params: dict) -> dict:
-#         """Aggregate data from all sources."""
-#         results = await asyncio.gather(
-#             self.fetch_with_timeout(fetch_weather(params.get("city")), 5.0),
-#             self.fetch_with_timeout(fetch_news(params.get("topic")), 5.0),
-#             self.fetch_with_timeout(fetch_stocks(params.get("symbol")), 5.0),
-#             self.fetch_with_timeout(fetch_social(params.get("hashtag")), 5.0),
-#             return_exceptions=True
-#         )
-#         
-#         return {
-#             "weather": results[0],
-#             "news": results[1],
-#             "stocks": results[2],
-#             "social": results[3],
-#             "timestamp": datetime.now().isoformat()
-#         }
-
-
-# 4. FastAPI integration
-# ----------------------
-# from fastapi import FastAPI
-# 
-# app = FastAPI()
-# aggregator = DataAggregator()
-#
-# @app.get("/aggregate")
-# async def get_aggregated_data(
-#     city: str = "New York",
-#     topic: str = "technology",
-#     symbol: str = "AAPL",
-#     hashtag: str = "tech"
-# ):
-#     result = await aggregator.aggregate({
-#         "city": city,
-#         "topic": topic,
-#         "symbol": symbol,
-#         "hashtag": hashtag
-#     })
-#     return result
-
-
-# BONUS: Add these features
-# -------------------------
-# - Persistent caching with Redis
-# - Retry logic for failed requests
-# - Health check endpoint
-# - Metrics collection (response times, cache hits)
-
-
-print("\nImplement your data aggregator above!")
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable
+from datetime import datetime
+
+# ========== CACHE ==========
+print("\n" + "=" * 60)
+print("BUILDING BLOCKS")
+print("=" * 60)
+
+
+class SimpleCache:
+    """
+    TTL cache that remembers expired values for a while longer.
+
+    get() only returns fresh values. get_stale() also returns values up to
+    stale_seconds past their TTL - good enough when the source is down.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, stale_seconds: float = 3600,
+                 max_entries: int = 10_000):
+        self.cache: Dict[Any, tuple] = {}  # key -> (value, fresh_until, stale_until)
+        self.ttl = ttl_seconds
+        self.stale = stale_seconds
+        self.max_entries = max_entries
+
+    def get(self, key) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            return None
+        return entry[0]
+
+    def get_stale(self, key) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[2]:
+            del self.cache[key]
+            return None
+        return entry[0]
+
+    def set(self, key, value: Any) -> None:
+        if key not in self.cache and len(self.cache) >= self.max_entries:
+            del self.cache[next(iter(self.cache))]  # oldest insert
+        now = time.monotonic()
+        self.cache.pop(key, None)
+        self.cache[key] = (value, now + self.ttl, now + self.ttl + self.stale)
+
+
+class LatencyTracker:
+    """
+    Recent call latencies for one source.
+
+    Timed-out and cancelled calls are recorded at the moment they were
+    abandoned. That is only a lower bound, but without it a source that
+    slows down past its timeout would never widen the timeout again.
+
+    Until `warmup` samples exist there is no hedging and the timeout is
+    `initial_timeout`; afterwards the hedge delay is the p95 and the
+    timeout is a multiple of the p99, clamped to [min_timeout, max_timeout].
+    """
+
+    def __init__(self, window: int = 200, warmup: int = 20,
+                 initial_timeout: float = 5.0, min_timeout: float = 0.05,
+                 max_timeout: float = 5.0, timeout_factor: float = 3.0):
+        self.samples = deque(maxlen=window)
+        self.warmup = warmup
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self._sorted = None  # cached sorted samples, reset on record()
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._sorted = None
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < self.warmup:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        values = self._sorted
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+    def hedge_delay(self) -> Optional[float]:
+        return self.percentile(95)
+
+    def timeout(self) -> float:
+        p99 = self.percentile(99)
+        if p99 is None:
+            return self.initial_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_factor))
+
+
+print("✅ SimpleCache and LatencyTracker ready")
+
+
+# ========== DATA SOURCES ==========
+
+class SimulatedSource:
+    """
+    A fake upstream API: usually fast, occasionally very slow or failing.
+
+    Every call is an independent draw, which is exactly the kind of tail
+    that hedging helps with.
+    """
+
+    def __init__(self, name: str, latency: float = 0.03, jitter: float = 0.02,
+                 slow_probability: float = 0.05, slow_latency: float = 0.4,
+                 error_probability: float = 0.0, seed: int = 0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_probability = slow_probability
+        self.slow_latency = slow_latency
+        self.error_probability = error_probability
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.down = False
+
+    async def __call__(self, key: str) -> dict:
+        self.calls += 1
+        delay = self.latency + self.rng.random() * self.jitter
+        if self.rng.random() < self.slow_probability:
+            delay += self.slow_latency
+        await asyncio.sleep(delay)
+        if self.down or self.rng.random() < self.error_probability:
+            raise ConnectionError(f"{self.name} unavailable")
+        return {"source": self.name, "key": key, "fetched_at": datetime.now().isoformat()}
+
+
+def make_sources(seed: int = 1, **overrides) -> Dict[str, SimulatedSource]:
+    return {
+        name: SimulatedSource(name, seed=seed + i, **overrides)
+        for i, name in enumerate(("weather", "news", "stocks", "social"))
+    }
+
+
+# ========== AGGREGATOR ==========
+print("\n" + "=" * 60)
+print("DATA AGGREGATOR")
+print("=" * 60)
+
+
+class DataAggregator:
+    """
+    Fetch several sources concurrently and merge the results.
+
+    Per (source, key): fresh cache hit -> join an in-flight call -> new
+    hedged call. If the call fails or times out, a stale cached value is
+    served instead, so one bad source doesn't blank the response.
+    """
+
+    PARAMS = {"weather": "city", "news": "topic", "stocks": "symbol", "social": "hashtag"}
+
+    def __init__(self, sources: Dict[str, Callable[[str], Awaitable[dict]]],
+                 cache_ttl: float = 300, stale_ttl: float = 3600,
+                 max_concurrency: int = 20, hedge: bool = True,
+                 initial_timeout: float = 5.0):
+        self.sources = sources
+        self.cache = SimpleCache(ttl_seconds=cache_ttl, stale_seconds=stale_ttl)
+        self.hedge = hedge
+        # Rate limiting: at most max_concurrency calls in flight per source
+        self.semaphores = {name: asyncio.Semaphore(max_concurrency) for name in sources}
+        self.latency = {name: LatencyTracker(initial_timeout=initial_timeout,
+                                             max_timeout=initial_timeout)
+                        for name in sources}
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.stats = {"calls": 0, "cache_hits": 0, "coalesced": 0, "hedges": 0,
+                      "hedge_wins": 0, "timeouts": 0, "errors": 0, "stale_served": 0}
+
+    async def fetch(self, source: str, key: str) -> tuple:
+        """Return (data or None, status) for one source"""
+        cache_key = (source, key)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached, "cache"
+
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(source, key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(cache_key, None)
+                                   if self._inflight.get(cache_key) is t else None)
+        else:
+            self.stats["coalesced"] += 1
+
+        try:
+            # shield: one caller giving up must not cancel the shared call
+            return await asyncio.shield(task), "fresh"
+        except Exception as e:
+            failure = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            stale = self.cache.get_stale(cache_key)
+            if stale is not None:
+                self.stats["stale_served"] += 1
+                return stale, f"stale ({failure})"
+            return None, failure
+
+    async def _fetch_and_store(self, source: str, key: str) -> dict:
+        try:
+            data = await self._hedged_call(source, key)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self.cache.set((source, key), data)
+        return data
+
+    async def _attempt(self, source: str, key: str) -> dict:
+        async with self.semaphores[source]:
+            self.stats["calls"] += 1
+            start = time.perf_counter()
+            try:
+                return await self.sources[source](key)
+            finally:
+                # Also on timeout/cancel: elapsed then stops at the deadline
+                self.latency[source].record(time.perf_counter() - start)
+
+    async def _hedged_call(self, source: str, key: str) -> dict:
+        """
+        Call the source; if it hasn't answered after its p95 latency (or it
+        failed), start one more attempt. First success wins, the loser is
+        cancelled, and the whole thing is bounded by the adaptive timeout.
+        """
+        tracker = self.latency[source]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + tracker.timeout()
+        hedge_at = None
+        if self.hedge and tracker.hedge_delay() is not None:
+            hedge_at = start + tracker.hedge_delay()
+
+        first = asyncio.create_task(self._attempt(source, key))
+        pending = {first}
+        error = None
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    raise asyncio.TimeoutError(f"{source} timed out")
+                wait = deadline - now
+                if hedge_at is not None:
+                    wait = min(wait, max(0.0, hedge_at - now))
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+                if hedge_at is not None and (error is not None or loop.time() >= hedge_at):
+                    hedge_at = None
+                    self.stats["hedges"] += 1
+                    pending.add(asyncio.create_task(self._attempt(source, key)))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aggregate(self, params: dict) -> dict:
+        """Aggregate data from all sources."""
+        names = list(self.sources)
+        results = await asyncio.gather(*(
+            self.fetch(name, params.get(self.PARAMS.get(name, name), ""))
+            for name in names
+        ))
+        response = {name: data for name, (data, _) in zip(names, results)}
+        response["status"] = {name: status for name, (_, status) in zip(names, results)}
+        response["timestamp"] = datetime.now().isoformat()
+        return response
+
+
+class SketchAggregator:
+    """The original design: one semaphore, fixed timeout, no cache reuse"""
+
+    def __init__(self, sources, max_concurrency: int = 80, timeout: float = 5.0):
+        self.sources = sources
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+        self.stats = {"calls": 0}
+
+    async def fetch_with_timeout(self, source: str, key: str) -> Optional[dict]:
+        try:
+            async with self.semaphore:
+                self.stats["calls"] += 1
+                return await asyncio.wait_for(self.sources[source](key), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aggregate(self, params: dict) -> dict:
+        names = list(self.sources)
+        results = await asyncio.gather(*(
+            self.fetch_with_timeout(name, params.get(DataAggregator.PARAMS[name], ""))
+            for name in names
+        ))
+        return {**dict(zip(names, results)), "timestamp": datetime.now().isoformat()}
+
+
+print("✅ DataAggregator ready")
+
+# ========== DEMO ==========
+print("\n" + "=" * 60)
+print("DEMO")
+print("=" * 60)
+
+PARAMS = {"city": "New York", "topic": "technology", "symbol": "AAPL", "hashtag": "tech"}
+
+
+async def demo():
+    sources = make_sources(slow_probability=0.0)
+    aggregator = DataAggregator(sources, cache_ttl=0.2, stale_ttl=60)
+
+    print("\n🔁 10 identical /aggregate requests at once:")
+    await asyncio.gather(*(aggregator.aggregate(PARAMS) for _ in range(10)))
+    print(f"   upstream calls: {aggregator.stats['calls']} "
+          f"(coalesced {aggregator.stats['coalesced']} waiters)")
+
+    result = await aggregator.aggregate(PARAMS)
+    print(f"\n💾 Repeated within TTL: {result['status']}")
+
+    await asyncio.sleep(0.25)
+    sources["stocks"].down = True
+    result = await aggregator.aggregate(PARAMS)
+    print(f"\n🔌 Stocks API down, TTL expired: {result['status']}")
+    print(f"   stocks data still present: {result['stocks'] is not None}")
+
+    result = await aggregator.aggregate({**PARAMS, "symbol": "MSFT"})
+    print(f"   uncached symbol while down: stocks={result['stocks']}, "
+          f"status={result['status']['stocks']}")
+
+    sources["stocks"].down = False
+    for _ in range(30):
+        await aggregator.fetch("weather", f"city{random.random()}")
+    tracker = aggregator.latency["weather"]
+    print(f"\n⏱️  weather after 30+ calls: p95={tracker.hedge_delay() * 1000:.0f}ms "
+          f"(hedge delay), timeout={tracker.timeout() * 1000:.0f}ms")
+
+    sources["weather"].latency = 0.2
+    print("\n🐢 weather slows from ~40ms to ~200ms (5 rounds of 10 fetches):")
+    for round_no in range(1, 6):
+        results = await asyncio.gather(*(
+            aggregator.fetch("weather", f"city{random.random()}") for _ in range(10)))
+        ok = sum(status == "fresh" for _, status in results)
+        print(f"   round {round_no}: {ok}/10 fresh, timeout now {tracker.timeout() * 1000:.0f}ms")
+
+
+asyncio.run(demo())
+
+# ========== BENCHMARK ==========
+print("\n" + "=" * 60)
+print("BENCHMARK: /aggregate LATENCY")
+print("=" * 60)
+
+N_REQUESTS = 300
+CONCURRENCY = 20
+N_KEYS = 40
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def run_load(make_aggregator, repeat_keys: bool, warmup: int = 100) -> dict:
+    sources = make_sources(seed=42, slow_probability=0.02, slow_latency=0.4)
+    aggregator = make_aggregator(sources)
+    rng = random.Random(3)
+
+    def params(i):
+        if repeat_keys:
+            k = min(int(rng.paretovariate(1.2)), N_KEYS)  # a few hot keys
+        else:
+            k = i
+        return {"city": f"city{k}", "topic": f"topic{k}",
+                "symbol": f"SYM{k}", "hashtag": f"tag{k}"}
+
+    # Warm the latency trackers (not measured)
+    for i in range(0, warmup, CONCURRENCY):
+        await asyncio.gather(*(aggregator.aggregate(params(-1 - i - j))
+                               for j in range(CONCURRENCY)))
+    calls_before = sum(source.calls for source in sources.values())
+
+    latencies = []
+    queue = deque(range(N_REQUESTS))
+
+    async def client():
+        while queue:
+            i = queue.popleft()
+            start = time.perf_counter()
+            await aggregator.aggregate(params(i))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(CONCURRENCY)))
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "calls": sum(source.calls for source in sources.values()) - calls_before,
+        "stats": aggregator.stats,
+    }
+
+
+configs = [
+    ("Sketch (fixed 5s timeout)", lambda s: SketchAggregator(s), False),
+    ("Hedged + adaptive timeout", lambda s: DataAggregator(s, cache_ttl=0), False),
+    ("Sketch, hot keys", lambda s: SketchAggregator(s), True),
+    ("Full (cache 1s), hot keys", lambda s: DataAggregator(s, cache_ttl=1.0), True),
+]
+
+print(f"\n{N_REQUESTS} /aggregate requests, {CONCURRENCY} concurrent clients,")
+print("4 sources at ~40ms with a 2% chance of +400ms each\n")
+print(f"   {'configuration':28} {'p50':>8} {'p99':>8} {'upstream calls':>15}")
+for name, factory, hot in configs:
+    result = asyncio.run(run_load(factory, hot))
+    print(f"   {name:28} {result['p50']:>6.0f}ms {result['p99']:>6.0f}ms {result['calls']:>15,}")
+    if isinstance(result["stats"], dict) and "hedges" in result["stats"]:
+        s = result["stats"]
+        print(f"      hedges={s['hedges']} won={s['hedge_wins']} coalesced={s['coalesced']} "
+              f"cache_hits={s['cache_hits']} timeouts={s['timeouts']}")
+
+print("""
+Hedging costs a few percent extra upstream calls (only requests slower
+than p95 get a second attempt) and removes most of the tail.
+""")
+
+# ========== FASTAPI INTEGRATION ==========
+print("\n" + "=" * 60)
+print("FASTAPI INTEGRATION")
+print("=" * 60)
+
+fastapi_code = '''
+from fastapi import FastAPI
+
+app = FastAPI()
+aggregator = DataAggregator(
+    {"weather": fetch_weather, "news": fetch_news,
+     "stocks": fetch_stocks, "social": fetch_social},
+    cache_ttl=300, stale_ttl=3600,
+)
+
+
+@app.get("/aggregate")
+async def get_aggregated_data(
+    city: str = "New York",
+    topic: str = "technology",
+    symbol: str = "AAPL",
+    hashtag: str = "tech"
+):
+    return await aggregator.aggregate({
+        "city": city,
+        "topic": topic,
+        "symbol": symbol,
+        "hashtag": hashtag
+    })
+
+
+@app.get("/aggregate/health")
+async def health():
+    return {
+        "stats": aggregator.stats,
+        "sources": {
+            name: {"p95_ms": (t.hedge_delay() or 0) * 1000, "timeout_s": t.timeout()}
+            for name, t in aggregator.latency.items()
+        },
+    }
+'''
+
+print(fastapi_code)
+
+print("\n" + "=" * 60)
+print("✅ Async Data Aggregator - Complete!")
+print("=" * 60)
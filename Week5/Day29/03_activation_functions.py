@@ -13,6 +13,9 @@ import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+# Overflow-safe sigmoid and softmax, shared with 04/05/06
+from loss_kernels import sigmoid, softmax
+
 # ========== WHY ACTIVATION FUNCTIONS? ==========
 print("=" * 60)
 print("WHY DO WE NEED ACTIVATION FUNCTIONS?")
@@ -101,10 +104,6 @@ print("\n" + "=" * 60)
 print("SIGMOID ACTIVATION")
 print("=" * 60)
 
-def sigmoid(z):
-    """Sigmoid activation function"""
-    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
-
 def sigmoid_derivative(z):
     """Derivative of sigmoid"""
     s = sigmoid(z)
@@ -203,12 +202,6 @@ print("\n" + "=" * 60)
 print("SOFTMAX ACTIVATION")
 print("=" * 60)
 
-def softmax(z):
-    """Softmax activation function (numerically stable)"""
-    z_shifted = z - np.max(z, axis=-1, keepdims=True)
-    exp_z = np.exp(z_shifted)
-    return exp_z / np.sum(exp_z, axis=-1, keepdims=True)
-
 print("""
 📊 Softmax: f(zᵢ) = e^(zᵢ) / Σ(e^(zⱼ))
 
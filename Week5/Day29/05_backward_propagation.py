@@ -11,6 +11,8 @@ Key Concepts:
 
 import numpy as np
 
+from loss_kernels import sigmoid, sigmoid_crossentropy
+
 # ========== WHAT IS BACKPROPAGATION? ==========
 print("=" * 60)
 print("WHAT IS BACKPROPAGATION?")
@@ -65,9 +67,6 @@ print("\n" + "=" * 60)
 print("SIMPLE BACKPROP EXAMPLE: SINGLE NEURON")
 print("=" * 60)
 
-def sigmoid(z):
-    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
-
 def sigmoid_derivative(z):
     s = sigmoid(z)
     return s * (1 - s)
@@ -350,6 +349,214 @@ print(f"Analytical gradient: {analytical_grad:.6f}")
 print(f"Difference: {abs(numerical_grad - analytical_grad):.2e}")
 print(f"{'✓ Gradients match!' if abs(numerical_grad - analytical_grad) < 1e-4 else '✗ Gradients differ!'}")
 
+# ========== MINI-BATCH TRAINING ENGINE ==========
+print("\n" + "=" * 60)
+print("MINI-BATCH TRAINING ENGINE")
+print("=" * 60)
+
+print("""
+SimpleNeuralNetwork is written for clarity: full-batch steps, a dict of
+cached arrays with string keys, and new arrays for every Z, A, dW, db and
+weight update. On real datasets we train on MINI-BATCHES instead, and the
+per-step allocations start to dominate.
+
+TrainingEngine trains the same network, but:
+- Shuffles an index array once per epoch and gathers each batch into a
+  preallocated buffer with np.take(..., out=) (X itself is never copied)
+- Preallocates Z, dZ and gradient buffers for the largest batch
+- Uses np.dot(..., out=) and in-place ufuncs, so a step allocates nothing
+- Stores each layer's [W; b] in one array and adds a ones column to the
+  layer input, so the bias add, the db sum and the b update disappear
+- Gets the loss and output gradient from loss_kernels.sigmoid_crossentropy,
+  straight from the logits (no exp overflow, no probability clipping)
+- Runs in float32 or float64
+""")
+
+
+class TrainingEngine:
+    def __init__(self, network, batch_size=256, dtype=np.float32, seed=None):
+        """
+        Mini-batch gradient descent for a SimpleNeuralNetwork
+        (ReLU hidden layers, sigmoid output, binary cross-entropy)
+        """
+        self.net = network
+        self.batch_size = batch_size
+        self.dtype = np.dtype(dtype)
+        self.rng = np.random.default_rng(seed)
+        
+        # Each layer's W and b live in one (n_in + 1, n_out) array, and each
+        # layer input gets a constant column of ones. Then X·W + b is a single
+        # np.dot, db falls out of the dW product, and W and b update together.
+        # network.weights/biases become views into these arrays.
+        self.Wb = []
+        for i, (w, b) in enumerate(zip(network.weights, network.biases)):
+            Wb = np.vstack([w, b]).astype(self.dtype)
+            self.Wb.append(Wb)
+            network.weights[i] = Wb[:-1]
+            network.biases[i] = Wb[-1:]
+        
+        sizes = [network.weights[0].shape[0]] + [w.shape[1] for w in network.weights]
+        self.sizes = sizes
+        B = batch_size
+        # Layer inputs with the ones column: X, then each hidden activation
+        self.inputs = [np.ones((B, n + 1), dtype=self.dtype) for n in sizes[:-1]]
+        self.Y_batch = np.empty((B, sizes[-1]), dtype=self.dtype)
+        self.Z = [np.empty((B, n), dtype=self.dtype) for n in sizes[1:]]
+        self.dZ = [np.empty((B, n), dtype=self.dtype) for n in sizes[1:]]
+        self.masks = [np.empty((B, n), dtype=bool) for n in sizes[1:-1]]
+        self.dWb = [np.empty_like(Wb) for Wb in self.Wb]
+        self._view_cache = {}
+    
+    def _views(self, m):
+        """Per-layer buffer views for a batch of m rows (cached: at most two sizes)"""
+        views = self._view_cache.get(m)
+        if views is None:
+            L = self.net.num_layers
+            views = self._view_cache[m] = (
+                [self.inputs[i][:m] for i in range(L)],
+                [self.inputs[i][:m, :-1] for i in range(L)],
+                [self.Z[i][:m] for i in range(L)],
+                [self.dZ[i][:m] for i in range(L)],
+                [self.masks[i][:m] for i in range(L - 1)],
+                [self.inputs[i][:m].T for i in range(L)],
+                [Wb[:-1].T for Wb in self.Wb],
+                self.Y_batch[:m],
+            )
+        return views
+    
+    def _forward(self, m):
+        """Forward pass over the first m rows, returns the output-layer logits"""
+        inputs, activations, Zs = self._views(m)[:3]
+        last = self.net.num_layers - 1
+        for i, Wb in enumerate(self.Wb):
+            Z = np.dot(inputs[i], Wb, out=Zs[i])
+            if i < last:
+                # ReLU straight into the next layer's input (Z is kept for the mask)
+                np.maximum(Z, 0, out=activations[i + 1])
+        return Z
+    
+    def _step(self, m, learning_rate, compute_loss):
+        _, _, Zs, dZs, masks, inputs_T, W_T, Y = self._views(m)
+        Z = self._forward(m)
+        
+        # Output layer (sigmoid + BCE): dZ = σ(Z) - Y. Backprop is linear in dZ,
+        # so scaling it by learning_rate / m here scales every dW and db.
+        if compute_loss:
+            # The kernel averages over all m·n_out outputs; the loss here is
+            # summed over outputs and averaged over samples, as in 06
+            n_out = Z.shape[1]
+            loss, dZ = sigmoid_crossentropy(Y, Z, out=dZs[-1])
+            loss *= n_out
+            dZ *= learning_rate * n_out
+        else:
+            loss = None
+            dZ = sigmoid(Z, out=dZs[-1])
+            dZ -= Y
+            dZ *= learning_rate / m
+        for i in range(self.net.num_layers - 1, -1, -1):
+            dWb = np.dot(inputs_T[i], dZ, out=self.dWb[i])  # [dW; db]
+            
+            if i > 0:
+                # Propagate before W changes: dZ_prev = (dZ · Wᵀ) ⊙ relu'(Z_prev)
+                dZ_prev = np.dot(dZ, W_T[i], out=dZs[i - 1])
+                mask = np.greater(Zs[i - 1], 0, out=masks[i - 1])
+                np.multiply(dZ_prev, mask, out=dZ_prev)
+                dZ = dZ_prev
+            
+            self.Wb[i] -= dWb
+        return loss
+
+    def fit(self, X, Y, epochs=1, learning_rate=0.1, shuffle=True, track_loss=True):
+        """Train for some epochs, return the mean batch loss of each epoch"""
+        X = np.ascontiguousarray(X, dtype=self.dtype)  # no copy if already right
+        Y = np.ascontiguousarray(Y, dtype=self.dtype).reshape(len(X), -1)
+        n = len(X)
+        order = np.arange(n)
+        history = []
+        
+        for epoch in range(epochs):
+            if shuffle:
+                self.rng.shuffle(order)
+            total = 0.0
+            for start in range(0, n, self.batch_size):
+                batch = order[start:start + self.batch_size]  # a view, not a copy
+                m = len(batch)
+                # Gather the batch into the preallocated buffers
+                views = self._views(m)
+                np.take(X, batch, axis=0, out=views[1][0], mode="clip")
+                np.take(Y, batch, axis=0, out=views[7], mode="clip")
+                loss = self._step(m, learning_rate, track_loss)
+                if track_loss:
+                    total += loss * m
+            history.append(total / n if track_loss else None)
+        return history
+
+
+# Check: one engine step matches one SimpleNeuralNetwork step (float64)
+np.random.seed(0)
+X_check = np.random.randn(64, 5)
+Y_check = (X_check[:, :1] * X_check[:, 1:2] > 0).astype(float)
+reference = SimpleNeuralNetwork([5, 8, 4, 1])
+engine_net = SimpleNeuralNetwork([5, 8, 4, 1])
+engine_net.weights = [w.copy() for w in reference.weights]
+engine_net.biases = [b.copy() for b in reference.biases]
+
+reference.train_step(X_check, Y_check, learning_rate=0.5)
+engine = TrainingEngine(engine_net, batch_size=64, dtype=np.float64)
+engine.fit(X_check, Y_check, epochs=1, learning_rate=0.5, shuffle=False)
+max_diff = max(np.abs(a - b).max() for a, b in zip(reference.weights, engine_net.weights))
+print(f"Engine vs SimpleNeuralNetwork after one step: max weight difference {max_diff:.1e}")
+
+# ========== THROUGHPUT BENCHMARK ==========
+print("\n" + "=" * 60)
+print("THROUGHPUT: 100K-SAMPLE TABULAR DATASET")
+print("=" * 60)
+
+import time
+
+n_samples, n_features = 100_000, 20
+rng = np.random.default_rng(0)
+X_big = rng.standard_normal((n_samples, n_features))
+Y_big = ((X_big[:, 0] * X_big[:, 1] + np.sin(X_big[:, 2])) > 0).astype(float).reshape(-1, 1)
+layers = [n_features, 64, 32, 1]
+batch_size = 128
+
+
+def naive_minibatch_epoch(network, X, Y, batch_size, learning_rate):
+    """Mini-batches with the original class: fancy-index copies + train_step"""
+    order = np.random.permutation(len(X))
+    for start in range(0, len(X), batch_size):
+        batch = order[start:start + batch_size]
+        network.train_step(X[batch], Y[batch], learning_rate)
+
+
+np.random.seed(1)
+baseline_net = SimpleNeuralNetwork(layers)
+start = time.perf_counter()
+naive_minibatch_epoch(baseline_net, X_big, Y_big, batch_size, 0.1)
+baseline_time = time.perf_counter() - start
+baseline_rate = n_samples / baseline_time
+
+print(f"\n1 epoch, network {layers}, batch size {batch_size}:")
+print(f"{'Naive (train_step on X[idx])':36} {baseline_rate:>10,.0f} samples/s")
+
+for dtype in (np.float64, np.float32):
+    np.random.seed(1)
+    engine = TrainingEngine(SimpleNeuralNetwork(layers), batch_size=batch_size,
+                            dtype=dtype, seed=1)
+    X_typed = X_big.astype(dtype)  # convert once, outside the timed loop
+    for track_loss in (True, False):
+        start = time.perf_counter()
+        engine.fit(X_typed, Y_big, epochs=1, learning_rate=0.1, track_loss=track_loss)
+        rate = n_samples / (time.perf_counter() - start)
+        label = f"Engine {np.dtype(dtype).name}" + ("" if track_loss else ", no loss")
+        print(f"{label:36} {rate:>10,.0f} samples/s  ({rate / baseline_rate:.1f}x)")
+
+history = engine.fit(X_typed, Y_big, epochs=3, learning_rate=0.1)
+accuracy = np.mean((engine.net.forward(X_typed) > 0.5) == Y_big) * 100
+print(f"\nfloat32 engine, 3 more epochs: loss {' -> '.join(f'{h:.3f}' for h in history)}, "
+      f"accuracy {accuracy:.1f}%")
+
 # ========== BACKPROP INTUITION ==========
 print("\n" + "=" * 60)
 print("BACKPROPAGATION INTUITION")
@@ -7,10 +7,14 @@ Key Concepts:
 - Loss functions measure how wrong predictions are
 - Optimization algorithms find the best weights
 - Different tasks need different loss functions
+- Stable fused kernels compute loss and gradient from the logits
+- Flat parameter buffers: one optimizer step for the whole network
 """
 
 import numpy as np
 
+from loss_kernels import sigmoid_crossentropy, softmax, softmax_crossentropy
+
 # ========== WHAT ARE LOSS FUNCTIONS? ==========
 print("=" * 60)
 print("WHAT ARE LOSS FUNCTIONS?")
@@ -160,11 +164,6 @@ def categorical_crossentropy(y_true, y_pred):
     y_pred = np.clip(y_pred, epsilon, 1 - epsilon)
     return -np.sum(y_true * np.log(y_pred)) / len(y_true)
 
-def softmax(z):
-    """Softmax activation"""
-    exp_z = np.exp(z - np.max(z, axis=-1, keepdims=True))
-    return exp_z / np.sum(exp_z, axis=-1, keepdims=True)
-
 print("""
 📊 CCE: L = -(1/n) × Σ Σ y_true × log(y_pred)
         (sum over samples and classes)
@@ -208,6 +207,85 @@ print(y_true_cat)
 print(f"\nCCE (good predictions): {categorical_crossentropy(y_true_cat, y_pred_cat_good):.4f}")
 print(f"CCE (bad predictions):  {categorical_crossentropy(y_true_cat, y_pred_cat_bad):.4f}")
 
+# ========== STABLE FUSED LOSS KERNELS ==========
+print("\n" + "=" * 60)
+print("STABLE LOSSES FROM LOGITS (loss_kernels.py)")
+print("=" * 60)
+
+print("""
+Above, the loss is computed from PROBABILITIES (after sigmoid/softmax),
+clipped to [1e-15, 1 - 1e-15] before the log. Two problems:
+- Large logits: 1 / (1 + exp(-z)) overflows, and the clip caps every
+  loss at -log(1e-15) = 34.5 however wrong the prediction is
+- Training also needs the gradient, so the same data is walked again
+  (and new arrays allocated) for (p - y) / n
+
+loss_kernels.py works on the LOGITS z instead:
+    softmax CE = log Σ exp(z - max) - (z_y - max)      (log-sum-exp)
+    sigmoid CE = softplus(z) - y·z                     (via e^-|z|)
+and returns (loss, gradient) together, building the gradient in place
+in an out= buffer (which may be the logits array itself).
+""")
+
+# Confident and wrong: the true loss is 2000 for the softmax row and
+# 800 for each sigmoid output
+huge_logits = np.array([[1000.0, 0.0, -1000.0]])
+huge_binary = np.array([-800.0, 800.0])
+with np.errstate(over='ignore', invalid='ignore'):
+    naive_sigmoid = 1 / (1 + np.exp(-huge_binary))
+    naive_softmax = np.exp(huge_logits) / np.sum(np.exp(huge_logits))
+print("Logits [1000, 0, -1000], true class 2:")
+print(f"  softmax without the max shift: {naive_softmax}")
+print(f"  softmax + clipped CCE:         {categorical_crossentropy(np.array([[0, 0, 1]]), softmax(huge_logits)):.2f}")
+print(f"  softmax_crossentropy:          {softmax_crossentropy([2], huge_logits)[0]:.2f}")
+print("Logits [-800, 800], labels [1, 0]:")
+print(f"  sigmoid + clipped BCE:         {binary_crossentropy(np.array([1, 0]), naive_sigmoid):.2f}")
+print(f"  sigmoid_crossentropy:          {sigmoid_crossentropy([1, 0], huge_binary)[0]:.2f}")
+
+def loss_kernel_benchmark(n_samples=4096, n_classes=10, repeats=200):
+    """Separate softmax -> loss -> gradient passes vs one kernel call"""
+    import time
+    
+    rng = np.random.default_rng(0)
+    logits = rng.standard_normal((n_samples, n_classes))
+    labels = rng.integers(0, n_classes, n_samples)
+    one_hot = np.eye(n_classes)[labels]
+    binary_logits = rng.standard_normal((n_samples, 1))
+    binary_labels = rng.integers(0, 2, (n_samples, 1)).astype(float)
+    grad_buffer = np.empty_like(logits)
+    binary_buffer = np.empty_like(binary_logits)
+    
+    def separate_softmax():
+        p = softmax(logits)
+        return categorical_crossentropy(one_hot, p), (p - one_hot) / n_samples
+    
+    def separate_sigmoid():
+        p = 1 / (1 + np.exp(-binary_logits))
+        return binary_crossentropy(binary_labels, p), (p - binary_labels) / n_samples
+    
+    cases = [
+        ("Softmax CE", separate_softmax,
+         lambda: softmax_crossentropy(labels, logits, out=grad_buffer)),
+        ("Sigmoid CE", separate_sigmoid,
+         lambda: sigmoid_crossentropy(binary_labels, binary_logits, out=binary_buffer)),
+    ]
+    for name, separate, fused in cases:
+        (loss_a, grad_a), (loss_b, grad_b) = separate(), fused()
+        assert np.isclose(loss_a, loss_b) and np.allclose(grad_a, grad_b)
+        
+        timings = []
+        for fn in (separate, fused):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn()
+            timings.append((time.perf_counter() - start) / repeats)
+        print(f"{name}: separate {timings[0] * 1e6:7.1f} µs   fused {timings[1] * 1e6:7.1f} µs"
+              f"   ({timings[0] / timings[1]:.1f}x, same loss and gradient)")
+
+print(f"\nLoss + gradient for a batch of 4096 (10 classes / 1 output):")
+print("-" * 60)
+loss_kernel_benchmark()
+
 # ========== OPTIMIZATION ALGORITHMS ==========
 print("\n" + "=" * 60)
 print("OPTIMIZATION ALGORITHMS")
@@ -374,6 +452,29 @@ def adam_demo():
 
 adam_demo()
 
+# ========== ADAM FOR A WHOLE NETWORK ==========
+print("\n" + "=" * 60)
+print("ADAM FOR A WHOLE NETWORK: ONE FLAT BUFFER")
+print("=" * 60)
+
+print("""
+The Adam class above updates ONE weight array. A network needs one
+instance per W and b, and every step runs ~10 NumPy operations per
+array. For deep, narrow networks the arrays are tiny, so the time goes
+into Python and call overhead rather than arithmetic.
+
+Fix: copy all parameters into one contiguous buffer and replace them
+with VIEWS into it. Then one set of vectorized operations updates the
+whole network, and:
+- Gradient clipping = one dot product over the flat gradient buffer
+- Weight decay     = one multiply over the flat parameter buffer
+
+The Adam update itself stays the same; only where m, v and the weights
+live changes. Implementation (flat SGD, momentum and Adam, clipping,
+weight decay, parameter groups) plus a check and benchmark against
+per-array Adam: see mini_projects/05_optimizer_comparison.py
+""")
+
 # ========== OTHER OPTIMIZERS ==========
 print("\n" + "=" * 60)
 print("OTHER POPULAR OPTIMIZERS")
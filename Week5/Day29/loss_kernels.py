@@ -0,0 +1,148 @@
+"""
+Numerically stable loss kernels for the Day 29 networks
+=======================================================
+Shared by 03_activation_functions.py, 04_forward_propagation.py,
+06_loss_functions.py and the TrainingEngine in 05_backward_propagation.py.
+
+The textbook versions in 03/04/06 compute probabilities first and then
+the loss from them:
+
+    p = softmax(z)                  # or sigmoid(z)
+    loss = -mean(y * log(clip(p, 1e-15, 1)))
+    grad = (p - y) / n
+
+That costs a new array per step and extra passes over the data. It also
+breaks on large logits: exp overflows (inf / NaN) or the clip caps the
+loss at -log(1e-15) = 34.5, however wrong the prediction is.
+
+These kernels start from the LOGITS and return (loss, gradient) together:
+- softmax cross-entropy via log-sum-exp: log p = z - max - log Σexp(z - max)
+- sigmoid cross-entropy via softplus: -log σ(z) = log(1 + e^-z), computed
+  from e^-|z| so it never overflows
+- The gradient is built in place in `out`, which may be the logits array
+  itself; the only other temporaries are one number per row (softmax)
+  or a boolean sign mask (sigmoid)
+
+Usage:
+    loss, dZ = softmax_crossentropy(labels, logits)           # labels: ints or one-hot
+    loss, dZ = sigmoid_crossentropy(y, logits, out=dZ_buffer)  # y: 0/1, logits' shape
+"""
+
+import numpy as np
+
+
+def _float_array(logits):
+    """logits as a float array: integer row sums would be truncated"""
+    logits = np.asarray(logits)
+    return logits.astype(np.result_type(logits.dtype, np.float32), copy=False)
+
+
+def _output_buffer(logits, out):
+    if out is None:
+        return np.empty(logits.shape, dtype=logits.dtype)
+    if out.shape != logits.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {logits.shape}")
+    return out
+
+
+def sigmoid(z, out=None):
+    """σ(z) from e^-|z|, which can't overflow; σ(z) = 1 - σ(-z) for z < 0"""
+    z = _float_array(z)
+    out = _output_buffer(z, out)
+    negative = z < 0
+    np.abs(z, out=out)
+    np.negative(out, out=out)
+    np.exp(out, out=out)
+    out += 1
+    np.reciprocal(out, out=out)
+    np.subtract(1, out, out=out, where=negative)
+    return out
+
+
+def softmax(z, out=None):
+    """Softmax over the last axis (one row per sample), shifted by the row max"""
+    z = _float_array(z)
+    out = _output_buffer(z, out)
+    col = np.maximum.reduce(z, axis=-1, keepdims=True)
+    np.subtract(z, col, out=out)
+    np.exp(out, out=out)
+    np.add.reduce(out, axis=-1, keepdims=True, out=col)
+    out /= col
+    return out
+
+
+def softmax_crossentropy(y_true, logits, out=None):
+    """
+    Mean categorical cross-entropy of softmax(logits), and its gradient.
+
+    y_true is either class indices (n,) - the cheaper path - or one-hot /
+    probability rows (n, k). Returns (loss, dZ) with
+    dZ = (softmax(logits) - y) / n written into out.
+    """
+    logits = _float_array(logits)
+    y_true = np.asarray(y_true)
+    n = logits.shape[0]
+    out = _output_buffer(logits, out)
+
+    # Shift by the row max: every exponent is <= 0, so exp can't overflow
+    col = np.maximum.reduce(logits, axis=1, keepdims=True)
+    np.subtract(logits, col, out=out)
+
+    # Σ y·(z - max) while out still holds the shifted logits
+    if y_true.ndim == 1:
+        rows = np.arange(n)
+        target = out[rows, y_true].sum()
+    elif y_true.shape == logits.shape:
+        target = np.vdot(y_true, out)
+    else:
+        raise ValueError(f"y_true shape {y_true.shape} does not match logits {logits.shape}")
+
+    np.exp(out, out=out)
+    np.add.reduce(out, axis=1, keepdims=True, out=col)
+    # -log p_y = log Σexp(z - max) - (z_y - max)
+    loss = (np.log(col).sum() - target) / n
+
+    if y_true.ndim == 1:
+        col *= n
+        np.reciprocal(col, out=col)
+        out *= col
+        out[rows, y_true] -= 1 / n
+    else:
+        out /= col
+        out -= y_true
+        out *= 1 / n
+    return float(loss), out
+
+
+def sigmoid_crossentropy(y_true, logits, out=None):
+    """
+    Mean binary cross-entropy of sigmoid(logits), and its gradient.
+
+    y_true holds 0/1 targets (or probabilities) with the same number of
+    values as logits. Returns (loss, dZ) with
+    dZ = (sigmoid(logits) - y) / logits.size written into out.
+    """
+    logits = _float_array(logits)
+    y_true = np.reshape(y_true, logits.shape)
+    out = _output_buffer(logits, out)
+
+    # BCE = softplus(z) - y·z with softplus(z) = max(z, 0) + log(1 + e^-|z|),
+    # so exp only ever sees -|z| <= 0. Read z (and keep its sign, 1 byte
+    # per value) before out - which may be logits itself - is overwritten.
+    negative = logits < 0
+    z_sum = logits.sum()
+    yz_sum = np.vdot(y_true, logits)
+    np.abs(logits, out=out)
+    relu_sum = (out.sum() + z_sum) / 2
+    np.negative(out, out=out)
+    np.exp(out, out=out)
+    np.log1p(out, out=out)  # log(1 + e^-|z|)
+    loss = (relu_sum + out.sum() - yz_sum) / logits.size
+
+    # σ(|z|) = 1 / (1 + e^-|z|) = exp(-log(1 + e^-|z|)), σ(z) = 1 - σ(-z)
+    np.negative(out, out=out)
+    np.exp(out, out=out)
+    np.subtract(1, out, out=out, where=negative)
+    out -= y_true
+    out *= 1 / logits.size
+    return float(loss), out
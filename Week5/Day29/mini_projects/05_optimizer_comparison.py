@@ -9,54 +9,154 @@ Requirements:
 3. Track path taken by each optimizer
 4. Compare convergence speed
 5. Visualize paths (as coordinate history)
+6. Optimize a whole network: keep every parameter in one flat buffer
+   and update it with a single vectorized step, with gradient clipping
+   and weight decay
 """
 
+import time
+from abc import ABC, abstractmethod
+
 import numpy as np
 
-# Your code here
 print("=" * 50)
 print("OPTIMIZER COMPARISON")
 print("=" * 50)
 
-# TODO: Implement optimizers
 
-class SGD:
-    """Standard Stochastic Gradient Descent"""
-    def __init__(self, learning_rate=0.1):
+class Optimizer(ABC):
+    """
+    Base class: one flat buffer for all parameters, one for their gradients.
+    
+    params is a list of arrays, or a list of parameter groups such as
+    {"params": [W1, W2], "weight_decay": 1e-4} (e.g. to skip decay on
+    biases). Every array in those lists is REPLACED by a view into the
+    flat buffer - the lists are updated in place - so a model that reads
+    its weights from the same list trains without copying. Write the
+    gradients into the matching views in self.grads.
+    
+    Weight decay is decoupled (as in AdamW): w -= lr * weight_decay * w.
+    max_grad_norm clips the global gradient norm before each step.
+    """
+    def __init__(self, params, learning_rate, weight_decay=0.0, max_grad_norm=None):
+        groups = params if params and isinstance(params[0], dict) else [{"params": params}]
+        arrays = [p for group in groups for p in group["params"]]
+        dtype = np.result_type(np.float32, *arrays)
+        total = sum(np.size(p) for p in arrays)
+        
+        self.data = np.empty(total, dtype=dtype)
+        self.grad = np.zeros(total, dtype=dtype)
+        self.params = []
+        self.grads = []
+        decay = np.empty(total, dtype=dtype)
+        offset = 0
+        for group in groups:
+            for i, p in enumerate(group["params"]):
+                end = offset + np.size(p)
+                view = self.data[offset:end].reshape(np.shape(p))
+                view[...] = p
+                group["params"][i] = view
+                self.params.append(view)
+                self.grads.append(self.grad[offset:end].reshape(np.shape(p)))
+                decay[offset:end] = group.get("weight_decay", weight_decay)
+                offset = end
+        
+        # A single number when every group agrees, else one value per element
+        uniform = total == 0 or (decay == decay[0]).all()
+        self.weight_decay = float(decay[0]) if total and uniform else (0.0 if uniform else decay)
         self.lr = learning_rate
+        self.max_grad_norm = max_grad_norm
+        self._tmp = np.empty_like(self.data)
+        self.t = 0
+    
+    def zero_grad(self):
+        self.grad.fill(0)
+    
+    def clip_gradients(self):
+        """Scale all gradients so their global L2 norm is <= max_grad_norm"""
+        norm = float(np.sqrt(np.dot(self.grad, self.grad)))
+        if self.max_grad_norm is not None and norm > self.max_grad_norm:
+            self.grad *= self.max_grad_norm / (norm + 1e-12)
+        return norm
+    
+    def step(self):
+        """Update every parameter; returns the gradient norm before clipping"""
+        self.t += 1
+        norm = self.clip_gradients() if self.max_grad_norm is not None else None
+        decay = self.weight_decay
+        if isinstance(decay, np.ndarray):
+            np.multiply(decay, -self.lr, out=self._tmp)
+            self._tmp += 1
+            self.data *= self._tmp
+        elif decay:
+            self.data *= 1 - self.lr * decay
+        self._update()
+        return norm
+    
+    @abstractmethod
+    def _update(self):
+        """Apply one step to self.data from the (clipped) self.grad"""
+
+
+class SGD(Optimizer):
+    """Standard Stochastic Gradient Descent"""
+    def __init__(self, params, learning_rate=0.1, **kwargs):
+        super().__init__(params, learning_rate, **kwargs)
     
-    def update(self, params, grads):
-        # new_params = params - lr * grads
-        pass
+    def _update(self):
+        # params = params - lr * grads
+        np.multiply(self.grad, self.lr, out=self._tmp)
+        self.data -= self._tmp
 
 
-class SGDMomentum:
+class SGDMomentum(Optimizer):
     """SGD with Momentum"""
-    def __init__(self, learning_rate=0.1, momentum=0.9):
-        self.lr = learning_rate
+    def __init__(self, params, learning_rate=0.1, momentum=0.9, **kwargs):
+        super().__init__(params, learning_rate, **kwargs)
         self.momentum = momentum
-        self.velocity = None
+        self.velocity = np.zeros_like(self.data)
     
-    def update(self, params, grads):
+    def _update(self):
         # v = momentum * v - lr * grads
         # params = params + v
-        pass
+        self.velocity *= self.momentum
+        np.multiply(self.grad, self.lr, out=self._tmp)
+        self.velocity -= self._tmp
+        self.data += self.velocity
 
 
-class Adam:
+class Adam(Optimizer):
     """Adam Optimizer"""
-    def __init__(self, learning_rate=0.001, beta1=0.9, beta2=0.999, epsilon=1e-8):
-        self.lr = learning_rate
+    def __init__(self, params, learning_rate=0.001, beta1=0.9, beta2=0.999,
+                 epsilon=1e-8, **kwargs):
+        super().__init__(params, learning_rate, **kwargs)
         self.beta1 = beta1
         self.beta2 = beta2
         self.epsilon = epsilon
-        self.m = None
-        self.v = None
-        self.t = 0
+        self.m = np.zeros_like(self.data)
+        self.v = np.zeros_like(self.data)
     
-    def update(self, params, grads):
-        # Implement Adam update rule
-        pass
+    def _update(self):
+        g, m, v, tmp = self.grad, self.m, self.v, self._tmp
+        
+        # m = β₁m + (1 - β₁)g,  v = β₂v + (1 - β₂)g²
+        m *= self.beta1
+        np.multiply(g, 1 - self.beta1, out=tmp)
+        m += tmp
+        v *= self.beta2
+        np.multiply(g, g, out=tmp)
+        tmp *= 1 - self.beta2
+        v += tmp
+        
+        # lr * m_hat / (√v_hat + ε) with both bias corrections folded into
+        # scalars, so no m_hat / v_hat arrays are needed
+        correction1 = 1 - self.beta1 ** self.t
+        correction2 = np.sqrt(1 - self.beta2 ** self.t)
+        np.sqrt(v, out=tmp)
+        tmp += self.epsilon * correction2
+        np.divide(m, tmp, out=tmp)
+        tmp *= self.lr * correction2 / correction1
+        self.data -= tmp
 
 
 # Function to optimize: f(x, y) = x^2 + y^2
@@ -69,16 +169,213 @@ def gradient(params):
     return np.array([2*x, 2*y])
 
 
-# TODO: Run optimization with each method
 def run_optimization(optimizer, start_point, n_iterations=50):
     """
     Run optimization and return path history
+    
+    optimizer is a factory taking the parameter list, e.g.
+    lambda params: Adam(params, learning_rate=0.5)
     """
-    pass
+    opt = optimizer([np.array(start_point, dtype=float)])
+    point, grad = opt.params[0], opt.grads[0]
+    path = [point.copy()]
+    for _ in range(n_iterations):
+        grad[...] = gradient(point)
+        opt.step()
+        path.append(point.copy())
+    return np.array(path)
 
 
 # Starting point
 start = np.array([5.0, 5.0])
 
-# TODO: Compare all three optimizers
-# TODO: Print results and analysis
+# ========== PATH COMPARISON ==========
+optimizers = {
+    "SGD": lambda params: SGD(params, learning_rate=0.05),
+    "SGD + Momentum": lambda params: SGDMomentum(params, learning_rate=0.05, momentum=0.5),
+    "Adam": lambda params: Adam(params, learning_rate=0.5),
+}
+paths = {name: run_optimization(factory, start) for name, factory in optimizers.items()}
+
+print(f"\nMinimizing f(x, y) = x² + y² from ({start[0]:g}, {start[1]:g}), 50 iterations")
+print("-" * 50)
+print(f"{'Optimizer':16} {'f < 1e-3 from':>14} {'final f(x, y)':>14}")
+for name, path in paths.items():
+    losses = np.array([loss_function(p) for p in path])
+    above = np.flatnonzero(losses >= 1e-3)
+    settled = above[-1] + 1 if above.size else 0
+    reached = f"step {settled}" if settled < len(losses) else "not yet"
+    print(f"{name:16} {reached:>14} {losses[-1]:>14.2e}")
+
+print("\nPath (x, y):")
+print(f"{'Step':>5}" + "".join(f" {name:>18}" for name in paths))
+for step in [0, 1, 2, 3, 5, 10, 20, 30, 50]:
+    row = "".join(f" ({p[step][0]:7.3f},{p[step][1]:7.3f})" for p in paths.values())
+    print(f"{step:>5}{row}")
+
+print("""
+Analysis:
+- SGD shrinks x and y by a constant factor (1 - 2·lr) every step
+- Momentum reuses part of the last step, so with the same learning
+  rate it gets there about 3x sooner (too much momentum overshoots
+  and oscillates instead)
+- Adam's steps are ~lr in size whatever the gradient's scale: fast
+  far from the minimum, but it overshoots back and forth near it. Its
+  per-parameter scaling pays off on badly scaled problems, not on a
+  perfectly round bowl like this one
+""")
+
+# ========== OPTIMIZING A WHOLE NETWORK ==========
+print("=" * 50)
+print("FLAT PARAMETER BUFFERS")
+print("=" * 50)
+
+print("""
+A network has many parameter arrays (a W and a b per layer). The usual
+optimizer loops over them, so every step costs ~10 small NumPy calls
+PER ARRAY - on deep but narrow MLPs that Python overhead is most of the
+step time.
+
+The optimizers above pack all parameters into ONE contiguous buffer and
+hand back views of it, so:
+- The Adam update is ~10 NumPy calls per step for the whole network
+- Gradient clipping is one dot product over the flat gradient buffer
+- Weight decay is one multiply (or one per-element vector for groups)
+- The backward pass writes gradients straight into the views
+""")
+
+
+class DeepMLP:
+    """Deep, narrow tanh MLP; its parameters live in one list [W1, b1, W2, b2, ...]"""
+    def __init__(self, layer_sizes, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_layers = len(layer_sizes) - 1
+        self.params = []
+        for n_in, n_out in zip(layer_sizes[:-1], layer_sizes[1:]):
+            self.params.append(rng.standard_normal((n_in, n_out)) / np.sqrt(n_in))
+            self.params.append(np.zeros(n_out))
+    
+    def loss_and_gradients(self, X, Y, grads):
+        """MSE loss; writes dW and db for every layer into grads (shaped like params)"""
+        activations = [X]
+        A = X
+        for layer in range(self.num_layers):
+            W, b = self.params[2 * layer], self.params[2 * layer + 1]
+            A = A @ W + b
+            if layer < self.num_layers - 1:
+                A = np.tanh(A)
+            activations.append(A)
+        
+        error = A - Y
+        loss = float(np.mean(error ** 2))
+        dZ = error * (2 / error.size)
+        for layer in range(self.num_layers - 1, -1, -1):
+            A_prev = activations[layer]
+            np.dot(A_prev.T, dZ, out=grads[2 * layer])
+            np.sum(dZ, axis=0, out=grads[2 * layer + 1])
+            if layer > 0:
+                dZ = (dZ @ self.params[2 * layer].T) * (1 - A_prev ** 2)
+        return loss
+
+
+class PerArrayAdam:
+    """Adam as in 06_loss_functions.py: one (m, v) pair and one update per array"""
+    def __init__(self, params, learning_rate=0.001, beta1=0.9, beta2=0.999,
+                 epsilon=1e-8, weight_decay=0.0, max_grad_norm=None):
+        self.params = params
+        self.grads = [np.zeros_like(p) for p in params]
+        self.lr = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.weight_decay = weight_decay
+        self.max_grad_norm = max_grad_norm
+        self.m = [np.zeros_like(p) for p in params]
+        self.v = [np.zeros_like(p) for p in params]
+        self.t = 0
+    
+    def step(self):
+        self.t += 1
+        if self.max_grad_norm is not None:
+            norm = np.sqrt(sum(np.sum(g ** 2) for g in self.grads))
+            if norm > self.max_grad_norm:
+                for g in self.grads:
+                    g *= self.max_grad_norm / (norm + 1e-12)
+        for i, (w, g) in enumerate(zip(self.params, self.grads)):
+            if self.weight_decay:
+                w -= self.lr * self.weight_decay * w
+            self.m[i] = self.beta1 * self.m[i] + (1 - self.beta1) * g
+            self.v[i] = self.beta2 * self.v[i] + (1 - self.beta2) * (g ** 2)
+            m_hat = self.m[i] / (1 - self.beta1 ** self.t)
+            v_hat = self.v[i] / (1 - self.beta2 ** self.t)
+            w -= self.lr * m_hat / (np.sqrt(v_hat) + self.epsilon)
+
+
+# Regression target from a random "teacher" network
+rng = np.random.default_rng(1)
+layer_sizes = [16] + [16] * 30 + [1]
+X = rng.standard_normal((64, 16))
+Y = np.sin(X[:, :1] * 2) + 0.5 * X[:, 1:2]
+settings = dict(learning_rate=1e-3, weight_decay=1e-4, max_grad_norm=1.0)
+
+# Same network, same data: both optimizers must land on the same weights
+net_ref = DeepMLP(layer_sizes)
+net_flat = DeepMLP(layer_sizes)
+ref = PerArrayAdam(net_ref.params, **settings)
+flat = Adam(net_flat.params, **settings)
+for _ in range(20):
+    net_ref.loss_and_gradients(X, Y, ref.grads)
+    net_flat.loss_and_gradients(X, Y, flat.grads)
+    ref.step()
+    norm = flat.step()
+max_diff = max(np.max(np.abs(a - b)) for a, b in zip(net_ref.params, net_flat.params))
+print(f"{net_flat.num_layers} layers, {len(net_flat.params)} arrays, {flat.data.size:,} parameters")
+print(f"Flat Adam vs per-array Adam after 20 steps: max weight difference {max_diff:.1e}")
+print(f"Last gradient norm before clipping: {norm:.2f} (clipped to {settings['max_grad_norm']})")
+
+# Parameter groups: decay the weights, not the biases
+net = DeepMLP(layer_sizes)
+groups = [{"params": net.params[0::2], "weight_decay": 1e-2},
+          {"params": net.params[1::2], "weight_decay": 0.0}]
+grouped = SGDMomentum(groups, learning_rate=0.01)
+# The slices above were new lists, so put the views back into the network
+net.params[0::2], net.params[1::2] = groups[0]["params"], groups[1]["params"]
+print(f"Grouped SGDMomentum: weight decay values {np.unique(grouped.weight_decay)} "
+      f"across {len(grouped.params)} arrays")
+
+
+def time_steps(optimizer, n_steps):
+    start_time = time.perf_counter()
+    for _ in range(n_steps):
+        optimizer.step()
+    return (time.perf_counter() - start_time) / n_steps
+
+
+def time_training(net, optimizer, n_steps):
+    start_time = time.perf_counter()
+    for _ in range(n_steps):
+        net.loss_and_gradients(X, Y, optimizer.grads)
+        optimizer.step()
+    return (time.perf_counter() - start_time) / n_steps
+
+
+print(f"\nBenchmark ({net_flat.num_layers}-layer MLP, width 16, batch 64):")
+print("-" * 50)
+for label, timer in [("Optimizer step only", time_steps),
+                     ("Full training step", None)]:
+    net_a, net_b = DeepMLP(layer_sizes), DeepMLP(layer_sizes)
+    opt_a, opt_b = PerArrayAdam(net_a.params, **settings), Adam(net_b.params, **settings)
+    if timer is None:
+        per_array = min(time_training(net_a, opt_a, 200) for _ in range(3))
+        fused = min(time_training(net_b, opt_b, 200) for _ in range(3))
+    else:
+        per_array = min(timer(opt_a, 500) for _ in range(3))
+        fused = min(timer(opt_b, 500) for _ in range(3))
+    print(f"{label:20} per-array {per_array * 1e6:8.1f} µs   flat {fused * 1e6:8.1f} µs"
+          f"   ({per_array / fused:.1f}x)")
+
+print("""
+The flat step does the same arithmetic, so it only wins where the per-
+array loop is overhead-bound: many small arrays. For a few huge layers
+the two cost about the same.
+""")